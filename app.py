@@ -2,19 +2,174 @@
 
 import streamlit as st
 import pandas as pd
-from trading_assistant.data_handler import fetch_historical_data, fetch_realtime_data, fetch_news_headlines
-from trading_assistant.analysis import calculate_technical_indicators, determine_market_personality, analyze_sentiment
-from trading_assistant.trading_logic import make_trading_decision, initialize_alpaca_api, check_alpaca_connection, place_order
+from trading_assistant.data_handler import fetch_historical_data, fetch_news_headlines
+from trading_assistant.analysis import calculate_technical_indicators, determine_market_personality
+from trading_assistant.sentiment import aggregate_sentiment, ensure_vader_lexicon
+from trading_assistant.trading_logic import make_trading_decision, get_trading_client, check_alpaca_connection, place_order
 from trading_assistant.risk_management import calculate_position_size, calculate_stop_loss, calculate_target_profit
-from trading_assistant.ml_model import prepare_data_for_ml, train_ml_model, get_ml_prediction, load_ml_model
+from trading_assistant.ml_model import prepare_data_for_ml, train_ml_model, get_stored_prediction, load_ml_model
+from trading_assistant.model_registry import get_model_registry
 from trading_assistant.utils import get_logger
-from trading_assistant.config import FINNHUB_API_KEY
-from alpaca.trading.enums import OrderSide
-import finnhub
-import plotly.graph_objects as go
+from trading_assistant.instrumentation import is_enabled, metrics, profile_run
+from trading_assistant.bar_pyramid import BarPyramid
+from trading_assistant.downsample import downsample_ohlcv
+from trading_assistant.config import FINNHUB_API_KEY, APP_HISTORY_TTL, APP_NEWS_TTL, APP_MAX_CHART_POINTS
 
 logger = get_logger(__name__)
 
+NEUTRAL_SENTIMENT = {'compound': 0}
+INTERVALS = ['1d', '1h', '5m', '1m']
+
+
+class DataUnavailable(Exception):
+    """Raised inside cached loaders so failures are reported but never cached."""
+
+
+@st.cache_resource
+def get_finnhub_client():
+    import finnhub
+    return finnhub.Client(api_key=FINNHUB_API_KEY)
+
+
+@st.cache_resource
+def sentiment_available():
+    return ensure_vader_lexicon()
+
+
+@st.cache_resource
+def get_model(version):
+    """The model for a registry version (None for the legacy file), loaded once per server."""
+    model = load_ml_model(version)
+    if model is None:
+        raise DataUnavailable("No pre-trained model found.")
+    return model
+
+
+def find_model(version):
+    """get_model, or None while no model exists (the miss is not cached, so a new model is seen)."""
+    try:
+        return get_model(version)
+    except DataUnavailable:
+        return None
+
+
+@st.cache_data(ttl=APP_HISTORY_TTL, show_spinner="Fetching data...")
+def load_indicators(ticker, start_date, end_date, interval='1d'):
+    """OHLCV bars with technical indicators for (ticker, date range, interval)."""
+    historical_data = fetch_historical_data(ticker, start_date, end_date, interval=interval)
+    if historical_data is None:
+        raise DataUnavailable("Failed to fetch historical data.")
+    df_with_indicators = calculate_technical_indicators(historical_data)
+    if df_with_indicators.empty:
+        raise DataUnavailable("Failed to calculate technical indicators.")
+    return df_with_indicators
+
+
+@st.cache_resource(ttl=APP_HISTORY_TTL)
+def load_pyramid(ticker, start_date, end_date, interval='1d'):
+    """The analysed bars pre-aggregated at every coarser chart resolution."""
+    return BarPyramid(load_indicators(ticker, start_date, end_date, interval), base=interval)
+
+
+@st.cache_data(ttl=APP_NEWS_TTL, show_spinner="Fetching news...")
+def load_sentiment(ticker):
+    """Time-decayed news sentiment for a ticker, or None when news is unavailable."""
+    news = fetch_news_headlines(get_finnhub_client(), ticker)
+    if news is None or not sentiment_available():
+        return None
+    return aggregate_sentiment(news)
+
+
+@st.cache_data(ttl=APP_HISTORY_TTL, show_spinner="Running ML model...")
+def load_ml_prediction(ticker, start_date, end_date, model_version):
+    """The model's prediction for the last daily bar, read from the feature store."""
+    model = find_model(model_version)
+    if model is None:
+        return None
+    return get_stored_prediction(model, ticker, load_indicators(ticker, start_date, end_date, '1d'))
+
+
+def run_analysis(ticker, start_date, end_date, interval='1d'):
+    """
+    Everything that depends only on (ticker, date range): served from the caches, so widget
+    changes re-render without refetching or recomputing.
+    """
+    df_with_indicators = load_indicators(ticker, start_date, end_date, interval)
+    market_personality = determine_market_personality(df_with_indicators)
+
+    sentiment_scores = load_sentiment(ticker)
+    if sentiment_scores is None:
+        st.warning("Could not fetch news headlines or score sentiment; using neutral sentiment.")
+        sentiment_scores = NEUTRAL_SENTIMENT
+
+    # The model is trained on and predicts daily bars whatever the chart interval, so an
+    # intraday analysis never trains the shared model on intraday bars.
+    model_version = get_model_registry().latest_version()
+    if find_model(model_version) is None:
+        daily = df_with_indicators if interval == '1d' else load_indicators(ticker, start_date, end_date, '1d')
+        with st.spinner("No pre-trained model found. Training a new model..."):
+            train_ml_model(prepare_data_for_ml(daily), tickers=ticker)
+        model_version = get_model_registry().latest_version()
+    ml_prediction = load_ml_prediction(ticker, start_date, end_date, model_version)
+
+    trading_decision = make_trading_decision(df_with_indicators, sentiment_scores, ml_prediction)
+    return df_with_indicators, market_personality, trading_decision
+
+
+def render_chart(pyramid):
+    """Candlesticks at the finest resolution that fits APP_MAX_CHART_POINTS, capped by bucketing."""
+    import plotly.graph_objects as go
+    resolution = st.selectbox("Chart resolution", ['auto'] + pyramid.intervals)
+    interval, bars = pyramid.select(max_bars=APP_MAX_CHART_POINTS, interval=None if resolution == 'auto' else resolution)
+    chart_bars = downsample_ohlcv(bars, APP_MAX_CHART_POINTS)
+    if len(chart_bars) < len(bars):
+        st.caption(f"{len(bars)} {interval} bars merged into {len(chart_bars)} candles.")
+    fig = go.Figure(data=[go.Candlestick(x=chart_bars.index,
+                                           open=chart_bars['Open'],
+                                           high=chart_bars['High'],
+                                           low=chart_bars['Low'],
+                                           close=chart_bars['Close'])])
+    st.plotly_chart(fig)
+
+
+def render_analysis(ticker, df_with_indicators, market_personality, trading_decision, total_capital, risk_percentage,
+                    pyramid):
+    st.header(f"Analysis for {ticker}")
+    st.subheader("Market Personality")
+    st.write(market_personality)
+
+    st.subheader("Trading Signal")
+    st.write(trading_decision)
+
+    st.subheader("Risk Management")
+    entry_price = df_with_indicators['Close'].iloc[-1]
+    stop_loss = calculate_stop_loss(entry_price, risk_percentage, is_long=(trading_decision == 'BUY'))
+    target_profit = calculate_target_profit(entry_price, risk_percentage * 2, is_long=(trading_decision == 'BUY'))
+    position_size = calculate_position_size(total_capital, risk_percentage, stop_loss, entry_price)
+
+    st.write(f"Entry Price: {entry_price:.2f}")
+    st.write(f"Stop-Loss: {stop_loss:.2f}")
+    st.write(f"Target Profit: {target_profit:.2f}")
+    st.write(f"Position Size: {position_size:.2f} shares")
+
+    st.subheader("Price Chart")
+    render_chart(pyramid)
+
+    st.subheader("Data")
+    st.dataframe(df_with_indicators.tail())
+
+    if trading_decision in ["BUY", "SELL"]:
+        if st.button(f"Place {trading_decision} Order"):
+            trading_client = get_trading_client(st.secrets["ALPACA_API_KEY_ID"], st.secrets["ALPACA_API_SECRET_KEY"])
+            if check_alpaca_connection(trading_client):
+                from alpaca.trading.enums import OrderSide
+                side = OrderSide.BUY if trading_decision == "BUY" else OrderSide.SELL
+                place_order(trading_client, ticker, position_size, side)
+                st.success(f"{trading_decision} order placed for {position_size:.2f} shares of {ticker}.")
+            else:
+                st.error("Failed to connect to Alpaca.")
+
+
 def main():
     st.title("AI Trading Assistant")
 
@@ -22,101 +177,48 @@ def main():
     ticker = st.sidebar.text_input("Enter a stock ticker:", "AAPL").upper()
     start_date = st.sidebar.date_input("Start date", pd.to_datetime("2022-01-01"))
     end_date = st.sidebar.date_input("End date", pd.to_datetime("today"))
+    interval = st.sidebar.selectbox("Bar interval", INTERVALS)
     total_capital = st.sidebar.number_input("Total Capital", 10000)
     risk_percentage = st.sidebar.slider("Risk Percentage", 0.01, 0.1, 0.01)
 
+    # The analysed (ticker, range) persists across reruns, so later widget interactions
+    # (risk slider, order button) re-render the same analysis from the caches.
     if st.sidebar.button("Analyze"):
-        with st.spinner("Fetching data..."):
-            historical_data = fetch_historical_data(ticker, start_date, end_date)
-            if historical_data is None:
-                st.error("Failed to fetch historical data.")
-                return
-
-        with st.spinner("Calculating technical indicators..."):
-            df_with_indicators = calculate_technical_indicators(historical_data.copy())
-            if df_with_indicators.empty:
-                st.error("Failed to calculate technical indicators.")
-                return
-
-        with st.spinner("Determining market personality..."):
-            market_personality = determine_market_personality(df_with_indicators.copy())
-
-        with st.spinner("Fetching news..."):
-            finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
-            news = fetch_news_headlines(finnhub_client, ticker)
-            if news is None:
-                st.warning("Could not fetch news headlines.")
-                sentiment_scores = {'compound': 0}
-            else:
-                headlines = [article['headline'] for article in news[:10]]
-                sentiments = [analyze_sentiment(headline) for headline in headlines]
-                sentiment_scores = {'compound': sum(s['compound'] for s in sentiments) / len(sentiments)}
-
-        with st.spinner("Loading ML model..."):
-            model = load_ml_model()
-            features = ['RSI_14', 'MACD_12_26_9', 'MACDH_12_26_9', 'MACDS_12_26_9', 'SMA_20', 'SMA_50']
-            if model is None:
-                st.warning("No pre-trained model found. Training a new model...")
-                df_for_ml = prepare_data_for_ml(df_with_indicators.copy())
-                model, features = train_ml_model(df_for_ml)
-
-        with st.spinner("Making trading decision..."):
-            ml_prediction = None
-            if model is not None:
-                ml_prediction = get_ml_prediction(model, df_with_indicators.tail(1), features)
-
-            trading_decision = make_trading_decision(df_with_indicators, sentiment_scores, ml_prediction)
-
-        st.header(f"Analysis for {ticker}")
-        st.subheader("Market Personality")
-        st.write(market_personality)
-
-        st.subheader("Trading Signal")
-        st.write(trading_decision)
-
-        st.subheader("Risk Management")
-        entry_price = df_with_indicators['Close'].iloc[-1]
-        stop_loss = calculate_stop_loss(entry_price, risk_percentage, is_long=(trading_decision == 'BUY'))
-        target_profit = calculate_target_profit(entry_price, risk_percentage * 2, is_long=(trading_decision == 'BUY'))
-        position_size = calculate_position_size(total_capital, risk_percentage, stop_loss, entry_price)
-
-        st.write(f"Entry Price: {entry_price:.2f}")
-        st.write(f"Stop-Loss: {stop_loss:.2f}")
-        st.write(f"Target Profit: {target_profit:.2f}")
-        st.write(f"Position Size: {position_size:.2f} shares")
-
-        st.subheader("Price Chart")
-        fig = go.Figure(data=[go.Candlestick(x=df_with_indicators.index,
-                                               open=df_with_indicators['Open'],
-                                               high=df_with_indicators['High'],
-                                               low=df_with_indicators['Low'],
-                                               close=df_with_indicators['Close'])])
-        st.plotly_chart(fig)
-
-        st.subheader("Data")
-        st.dataframe(df_with_indicators.tail())
-
-        if trading_decision in ["BUY", "SELL"]:
-            if st.button(f"Place {trading_decision} Order"):
-                trading_client = initialize_alpaca_api(st.secrets["ALPACA_API_KEY_ID"], st.secrets["ALPACA_API_SECRET_KEY"])
-                if check_alpaca_connection(trading_client):
-                    side = OrderSide.BUY if trading_decision == "BUY" else OrderSide.SELL
-                    place_order(trading_client, ticker, position_size, side)
-                    st.success(f"{trading_decision} order placed for {position_size:.2f} shares of {ticker}.")
-                else:
-                    st.error("Failed to connect to Alpaca.")
+        st.session_state['analysis'] = (ticker, start_date, end_date, interval)
+
+    if 'analysis' in st.session_state:
+        analysis_key = st.session_state['analysis']
+        try:
+            with profile_run("analyze"):
+                results = run_analysis(*analysis_key)
+        except DataUnavailable as e:
+            st.error(str(e))
+            del st.session_state['analysis']
+        else:
+            render_analysis(analysis_key[0], *results, total_capital, risk_percentage, load_pyramid(*analysis_key))
 
     if st.sidebar.button("Retrain Model"):
-        with st.spinner("Fetching data..."):
-            historical_data = fetch_historical_data(ticker, start_date, end_date)
-            if historical_data is None:
-                st.error("Failed to fetch historical data.")
-                return
+        try:
+            df_with_indicators = load_indicators(ticker, start_date, end_date, '1d')
+        except DataUnavailable as e:
+            st.error(str(e))
+            return
         with st.spinner("Training new model..."):
-            df_with_indicators = calculate_technical_indicators(historical_data.copy())
-            df_for_ml = prepare_data_for_ml(df_with_indicators.copy())
-            train_ml_model(df_for_ml)
+            from trading_assistant.walk_forward import update_model
+            model, _, fold_metrics = update_model({ticker: df_with_indicators})
+            if model is None:
+                st.error("Failed to train the ML model.")
+                return
+            # New registry version: predictions cached for the old one are no longer used.
+            load_ml_prediction.clear()
             st.success("ML model retrained and saved.")
+            if fold_metrics is not None:
+                st.subheader("Walk-Forward Validation")
+                st.dataframe(fold_metrics)
+
+    if is_enabled():
+        with st.sidebar.expander("Pipeline Latency"):
+            st.json(metrics.summary())
 
 if __name__ == "__main__":
     main()
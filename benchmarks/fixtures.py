@@ -0,0 +1,58 @@
+# benchmarks/fixtures.py
+
+import numpy as np
+import pandas as pd
+
+# name -> (tickers, years)
+SIZES = {
+    'xs': (1, 1),
+    's': (10, 5),
+    'm': (100, 10),
+    'l': (1000, 20),
+}
+BARS_PER_YEAR = 252
+
+_POSITIVE = ["beats", "surges", "upgrade", "record profit", "strong demand", "raises guidance", "wins contract"]
+_NEGATIVE = ["misses", "plunges", "downgrade", "lawsuit", "weak demand", "cuts guidance", "recall"]
+_NEUTRAL = ["reports earnings", "announces dividend", "holds annual meeting", "files quarterly report"]
+
+
+def synthetic_ohlcv(n_bars, seed=0, start="2000-01-03", start_price=100.0):
+    """Deterministic geometric-random-walk OHLCV bars on business days."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, n_bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = close * np.exp(rng.normal(0, 0.005, n_bars))
+    spread = np.abs(rng.normal(0, 0.01, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(100_000, 10_000_000, n_bars).astype(float)
+    index = pd.bdate_range(start, periods=n_bars, name='Date')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def make_universe(size, seed=0):
+    """A dict of ticker to OHLCV frame for a named size (see SIZES)."""
+    n_tickers, years = SIZES[size]
+    n_bars = years * BARS_PER_YEAR
+    return {f"T{i:04d}": synthetic_ohlcv(n_bars, seed=seed + i) for i in range(n_tickers)}
+
+
+def synthetic_headlines(n, seed=0):
+    """Deterministic mix of positive, negative and neutral headlines, with some repeats."""
+    rng = np.random.default_rng(seed)
+    phrases = _POSITIVE + _NEGATIVE + _NEUTRAL
+    companies = [f"Company {i}" for i in range(max(1, n // 4))]
+    return [f"{companies[rng.integers(len(companies))]} {phrases[rng.integers(len(phrases))]}" for _ in range(n)]
+
+
+def load_recorded(directory, tickers, start=None, end=None):
+    """Recorded OHLCV fixtures (``<TICKER>.csv``/``.parquet``) as a dict of ticker to frame."""
+    from trading_assistant.bar_cache import FixtureSource
+    source = FixtureSource(directory)
+    frames = {}
+    for ticker in tickers:
+        df = source(ticker, pd.Timestamp(start or pd.Timestamp.min), pd.Timestamp(end or pd.Timestamp.max))
+        if df is not None and not df.empty:
+            frames[ticker] = df
+    return frames
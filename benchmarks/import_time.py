@@ -0,0 +1,106 @@
+# benchmarks/import_time.py
+"""
+Cold-start import budget check.
+
+    python -m benchmarks.import_time            # fails (exit 1) when a module is over budget
+    python -m benchmarks.import_time --top 15   # also list the slowest imports of each module
+
+Each module is imported in a fresh interpreter with ``-X importtime``. Besides the time
+budget, importing a module must not pull in any of the heavy dependencies that the package
+only loads on first use.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules that must stay out of sys.modules after a cold import of the package's modules.
+LAZY_DEPENDENCIES = ('sklearn', 'yfinance', 'finnhub', 'alpaca', 'nltk', 'plotly', 'joblib')
+
+# Cumulative import time budgets in milliseconds. pandas alone costs a few hundred.
+BUDGETS_MS = {
+    'trading_assistant.utils': 50,
+    'trading_assistant.config': 100,
+    'trading_assistant.sentiment': 150,
+    'trading_assistant.news_store': 150,
+    'trading_assistant.risk_management': 300,
+    'trading_assistant.analysis': 900,
+    'trading_assistant.data_handler': 900,
+    'trading_assistant.trading_logic': 900,
+    'trading_assistant.ml_model': 900,
+    'trading_assistant.order_execution': 150,
+    'trading_assistant.live_runner': 900,
+    'trading_assistant.compiled_forest': 300,
+    'trading_assistant.batch': 1000,
+    'trading_assistant.param_sweep': 1000,
+    'app': 2500,
+}
+# app.py needs streamlit up front, and streamlit itself imports plotly.
+ALLOWED = {'app': ('streamlit', 'plotly')}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module):
+    """
+    Imports ``module`` in a fresh interpreter. Returns ``(cumulative_ms, imports, loaded_heavy)``
+    where imports is a list of ``(cumulative_ms, name)`` for every module imported.
+    """
+    probe = (f"import sys, {module}; "
+             f"print(','.join(m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], capture_output=True, text=True,
+                          cwd=ROOT, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        entries.append((int(cumulative) / 1000.0, name, len(raw_name) - len(raw_name.lstrip()) > 1))
+
+    # -X importtime lists children before their parent, so the module's own subtree is the run
+    # of nested entries right before its top-level line.
+    end = max(i for i, (_, name, nested) in enumerate(entries) if name == module and not nested)
+    start = end
+    while start > 0 and entries[start - 1][2]:
+        start -= 1
+    total = entries[end][0]
+    imports = [(ms, name) for ms, name, _ in entries[start:end + 1]]
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, imports, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold-start import times against budgets.")
+    parser.add_argument('modules', nargs='*', help="Modules to check (default: every budgeted module).")
+    parser.add_argument('--top', type=int, default=0, help="Show the N slowest nested imports per module.")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply budgets, e.g. on slow CI machines.")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for module in args.modules or list(BUDGETS_MS):
+        total, imports, loaded = measure(module)
+        budget = BUDGETS_MS.get(module)
+        heavy = [m for m in loaded if m not in ALLOWED.get(module, ())]
+        status = "ok"
+        if budget is not None and total > budget * args.scale:
+            status = "OVER BUDGET"
+        if heavy:
+            status = f"EAGER IMPORTS: {', '.join(heavy)}"
+        if status != "ok":
+            failures += 1
+        budget_text = f"{budget * args.scale:7.0f} ms" if budget is not None else "      -   "
+        print(f"{module:<36} {total:8.1f} ms  budget {budget_text}  {status}")
+        if args.top:
+            for ms, name in sorted(imports, reverse=True)[1:args.top + 1]:
+                print(f"    {ms:8.1f} ms  {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
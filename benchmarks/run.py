@@ -0,0 +1,410 @@
+# benchmarks/run.py
+"""
+Offline benchmark suite for the analysis pipeline.
+
+    python -m benchmarks.run                       # xs, s and m sizes
+    python -m benchmarks.run --sizes all --save-baseline
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+Each benchmark is timed over several repeats (setup excluded) and its peak traced memory is
+measured in one extra run. Results are written as JSON; comparing against a baseline exits
+with status 1 when any median slows down by more than ``--tolerance``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Keep benchmark runs away from the real model registry and caches.
+_SCRATCH = tempfile.mkdtemp(prefix="ta-bench-")
+os.environ['MODEL_REGISTRY_DIR'] = os.path.join(_SCRATCH, "models")
+os.environ['FEATURE_STORE_DIR'] = os.path.join(_SCRATCH, "features")
+os.environ['BAR_CACHE_ENABLED'] = '0'
+os.environ.pop('SENTIMENT_CACHE_PATH', None)
+
+import numpy as np
+import pandas as pd
+from benchmarks.fixtures import SIZES, make_universe, synthetic_headlines, load_recorded
+
+DEFAULT_SIZES = ['xs', 's', 'm']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+BENCHMARKS = {}
+# Objects built once and reused across sizes (e.g. the model used for prediction benchmarks).
+_shared = {}
+CANDIDATES_PER_TICKER = 252
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup when it cannot run in this environment."""
+
+
+def benchmark(name, max_size='l', repeats=5):
+    """
+    Registers ``func(fixture) -> (run, setup)``. ``setup()`` builds fresh input before each
+    repeat (untimed) and ``run(input)`` is the timed call.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = {'setup': func, 'max_size': max_size, 'repeats': repeats}
+        return func
+    return decorator
+
+
+def _indicator_frames(universe):
+    from trading_assistant.analysis import calculate_technical_indicators
+    return {ticker: calculate_technical_indicators(df) for ticker, df in universe.items()}
+
+
+@benchmark('calculate_technical_indicators')
+def bench_indicators(fixture):
+    from trading_assistant.analysis import calculate_technical_indicators
+
+    def run(frames):
+        for df in frames:
+            calculate_technical_indicators(df)
+    return run, lambda: list(fixture['universe'].values())
+
+
+@benchmark('compute_indicators_float32')
+def bench_compute_indicators_float32(fixture):
+    from trading_assistant.analysis import compute_indicators
+    from trading_assistant.bars import Bars
+
+    def run(panel):
+        for bars in panel:
+            compute_indicators(bars, dtype=np.float32)
+    panel = [Bars.from_frame(df, dtype=np.float32) for df in fixture['universe'].values()]
+    return run, lambda: panel
+
+
+@benchmark('indicator_arrays')
+def bench_indicator_arrays(fixture):
+    from trading_assistant.indicators import indicator_arrays
+
+    def run(closes):
+        for close in closes:
+            indicator_arrays(close)
+    return run, lambda: [df['Close'].to_numpy() for df in fixture['universe'].values()]
+
+
+@benchmark('determine_market_personality')
+def bench_personality(fixture):
+    from trading_assistant.analysis import determine_market_personality
+
+    def run(frames):
+        for df in frames:
+            determine_market_personality(df)
+    return run, lambda: list(fixture['indicators'].values())
+
+
+@benchmark('regime_map')
+def bench_regime_map(fixture):
+    from trading_assistant.regimes import regime_map, regime_transitions
+
+    def run(universe):
+        regime_transitions(regime_map(universe, dtype=np.float32))
+    return run, lambda: fixture['universe']
+
+
+@benchmark('generate_trading_signal')
+def bench_signal(fixture):
+    from trading_assistant.trading_logic import generate_trading_signal
+    sentiment = {'compound': 0.2}
+
+    def run(frames):
+        for df in frames:
+            generate_trading_signal(df, sentiment)
+    return run, lambda: list(fixture['indicators'].values())
+
+
+def _headlines(fixture):
+    n_tickers, years = fixture['shape']
+    return synthetic_headlines(n_tickers * 50, seed=years)
+
+
+def _sentiment_service():
+    from trading_assistant.sentiment import get_sentiment_service, ensure_vader_lexicon
+    if not ensure_vader_lexicon(download=False):
+        raise Skip("VADER lexicon not provisioned")
+    return get_sentiment_service()
+
+
+@benchmark('analyze_sentiment_cold', max_size='m')
+def bench_sentiment_cold(fixture):
+    from trading_assistant.analysis import analyze_sentiment
+    service = _sentiment_service()
+    headlines = _headlines(fixture)
+
+    def setup():
+        service.clear()
+        return headlines
+
+    def run(batch):
+        for headline in batch:
+            analyze_sentiment(headline)
+    return run, setup
+
+
+@benchmark('analyze_sentiment_warm', max_size='m')
+def bench_sentiment_warm(fixture):
+    from trading_assistant.analysis import analyze_sentiment
+    service = _sentiment_service()
+    headlines = _headlines(fixture)
+    service.analyze_sentiments(headlines)
+
+    def run(batch):
+        for headline in batch:
+            analyze_sentiment(headline)
+    return run, lambda: headlines
+
+
+def _pooled_training_frame(fixture):
+    from trading_assistant.ml_model import prepare_data_for_ml
+    frames = [prepare_data_for_ml(df).iloc[:-1] for df in fixture['indicators'].values()]
+    return pd.concat(frames)
+
+
+@benchmark('train_ml_model', max_size='s', repeats=1)
+def bench_train(fixture):
+    from trading_assistant.ml_model import train_ml_model
+    pooled = _pooled_training_frame(fixture)
+
+    def run(frame):
+        train_ml_model(frame, tickers=list(fixture['universe']))
+    return run, lambda: pooled
+
+
+def _shared_model():
+    from trading_assistant.ml_model import FEATURES
+    from sklearn.ensemble import RandomForestClassifier
+    if 'model' not in _shared:
+        train = _pooled_training_frame({'indicators': _indicator_frames(make_universe('xs'))}).dropna()
+        _shared['model'] = RandomForestClassifier(n_estimators=100, random_state=42).fit(
+            train[FEATURES].to_numpy(), train['Target'].to_numpy())
+    return _shared['model']
+
+
+@benchmark('get_ml_prediction')
+def bench_prediction(fixture):
+    from trading_assistant.ml_model import get_ml_prediction, FEATURES
+    model = _shared_model()
+
+    def run(tails):
+        for tail in tails:
+            get_ml_prediction(model, tail, FEATURES)
+    return run, lambda: [df.tail(1) for df in fixture['indicators'].values()]
+
+
+@benchmark('get_ml_prediction_compiled')
+def bench_prediction_compiled(fixture):
+    from trading_assistant.ml_model import get_ml_prediction, FEATURES
+    from trading_assistant.compiled_forest import CompiledForest
+    if 'compiled' not in _shared:
+        _shared['compiled'] = CompiledForest.from_sklearn(_shared_model())
+    forest = _shared['compiled']
+
+    def run(tails):
+        for tail in tails:
+            get_ml_prediction(forest, tail, FEATURES)
+    return run, lambda: [df.tail(1) for df in fixture['indicators'].values()]
+
+
+@benchmark('predict_many_compiled')
+def bench_predict_many_compiled(fixture):
+    from trading_assistant.ml_model import FEATURES
+    from trading_assistant.model_registry import predict_many
+    from trading_assistant.compiled_forest import CompiledForest
+    if 'compiled' not in _shared:
+        _shared['compiled'] = CompiledForest.from_sklearn(_shared_model())
+    forest = _shared['compiled']
+    latest = np.vstack([df[FEATURES].to_numpy()[-1] for df in fixture['indicators'].values()])
+    return lambda X: predict_many(forest, X), lambda: latest
+
+
+def _candidates(fixture):
+    n_tickers, _ = fixture['shape']
+    rng = np.random.default_rng(n_tickers)
+    n = n_tickers * CANDIDATES_PER_TICKER
+    return rng.uniform(5, 500, n), rng.random(n) > 0.5
+
+
+@benchmark('risk_scalar')
+def bench_risk_scalar(fixture):
+    from trading_assistant.risk_management import calculate_position_size, calculate_stop_loss, calculate_target_profit
+
+    def run(candidates):
+        entries, longs = candidates
+        for entry, is_long in zip(entries.tolist(), longs.tolist()):
+            stop = calculate_stop_loss(entry, 0.01, is_long=is_long)
+            calculate_target_profit(entry, 0.02, is_long=is_long)
+            calculate_position_size(10000.0, 0.01, stop, entry)
+    return run, lambda: _candidates(fixture)
+
+
+@benchmark('risk_vectorized')
+def bench_risk_vectorized(fixture):
+    from trading_assistant.risk_management import position_sizes, stop_losses, target_profits
+
+    def run(candidates):
+        entries, longs = candidates
+        stops = stop_losses(entries, 0.01, longs)
+        target_profits(entries, 0.02, longs)
+        position_sizes(10000.0, 0.01, stops, entries)
+    return run, lambda: _candidates(fixture)
+
+
+def _fixture(size, recorded_dir=None):
+    n_tickers, years = SIZES[size]
+    if recorded_dir:
+        universe = load_recorded(recorded_dir, [f"T{i:04d}" for i in range(n_tickers)])
+        if not universe:
+            raise Skip(f"No recorded fixtures in {recorded_dir}")
+    else:
+        universe = make_universe(size)
+    return {'size': size, 'shape': (n_tickers, years), 'universe': universe,
+            'indicators': _indicator_frames(universe)}
+
+
+def _measure(run, setup, repeats, memory=True):
+    times = []
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    result = {
+        'repeats': repeats,
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+    }
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+            result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(sizes, names=None, repeats=None, memory=True, recorded_dir=None):
+    """Runs the selected benchmarks for every size. Returns a list of result dicts."""
+    size_order = list(SIZES)
+    results = []
+    for size in sizes:
+        fixture = None
+        for name, spec in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            record = {'benchmark': name, 'size': size, 'tickers': SIZES[size][0], 'years': SIZES[size][1]}
+            if size_order.index(size) > size_order.index(spec['max_size']):
+                record['skipped'] = f"larger than max size {spec['max_size']}"
+            else:
+                try:
+                    if fixture is None:
+                        fixture = _fixture(size, recorded_dir)
+                    run, setup = spec['setup'](fixture)
+                    record.update(_measure(run, setup, repeats or spec['repeats'], memory))
+                except Skip as e:
+                    record['skipped'] = str(e)
+            results.append(record)
+            _print_record(record)
+    return results
+
+
+def _print_record(record, baseline=None):
+    label = f"{record['benchmark']:<32} {record['size']:>3}"
+    if 'skipped' in record:
+        print(f"{label}  skipped: {record['skipped']}")
+        return
+    line = f"{label}  median {record['median_s'] * 1000:10.2f} ms  min {record['min_s'] * 1000:10.2f} ms"
+    if 'peak_mb' in record:
+        line += f"  peak {record['peak_mb']:8.1f} MB"
+    print(line, flush=True)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compares medians with a baseline result list. Returns the regressions as
+    ``(benchmark, size, ratio)`` tuples, where ratio is current / baseline.
+    """
+    reference = {(r['benchmark'], r['size']): r for r in baseline if 'median_s' in r}
+    regressions = []
+    print(f"\n{'benchmark':<32} {'size':>4} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for record in results:
+        base = reference.get((record['benchmark'], record['size']))
+        if base is None or 'median_s' not in record:
+            continue
+        ratio = record['median_s'] / base['median_s']
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{record['benchmark']:<32} {record['size']:>4} {base['median_s'] * 1000:12.2f} "
+              f"{record['median_s'] * 1000:12.2f} {ratio:7.2f}{flag}")
+        if flag:
+            regressions.append((record['benchmark'], record['size'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the trading pipeline.")
+    parser.add_argument('--sizes', default=",".join(DEFAULT_SIZES),
+                        help=f"Comma-separated sizes from {list(SIZES)} or 'all'.")
+    parser.add_argument('--only', help="Comma-separated benchmark names.")
+    parser.add_argument('--repeats', type=int, help="Override every benchmark's repeat count.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced peak-memory run.")
+    parser.add_argument('--fixtures-dir', help="Use recorded T0000.csv... fixtures instead of synthetic bars.")
+    parser.add_argument('--output', help="Result file (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Also write results to {DEFAULT_BASELINE}.")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help="Baseline file to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed median slowdown (0.2 = 20%%).")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('trading_assistant').setLevel(args.log_level)
+    sizes = list(SIZES) if args.sizes == 'all' else args.sizes.split(',')
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {unknown}")
+    names = args.only.split(',') if args.only else None
+
+    results = run_suite(sizes, names, args.repeats, not args.no_memory, args.fixtures_dir)
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {DEFAULT_BASELINE}")
+
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"Baseline {args.compare} not found; run with --save-baseline first.")
+            return 1
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+# Settings are read from the environment at import time, so point every store at a scratch
+# directory before any trading_assistant module is imported.
+_SCRATCH = tempfile.mkdtemp(prefix='trading_assistant_tests_')
+for name, value in {
+    'LOG_DIR': os.path.join(_SCRATCH, 'logs'),
+    'LOG_STDOUT': '0',
+    'BAR_CACHE_DIR': os.path.join(_SCRATCH, 'bars'),
+    'MODEL_REGISTRY_DIR': os.path.join(_SCRATCH, 'models'),
+    'FEATURE_STORE_DIR': os.path.join(_SCRATCH, 'features'),
+    'ORDER_JOURNAL_PATH': os.path.join(_SCRATCH, 'orders.sqlite'),
+    'NEWS_STORE_PATH': os.path.join(_SCRATCH, 'news.sqlite'),
+    'SWEEP_CACHE_DIR': os.path.join(_SCRATCH, 'sweep_cache'),
+    'SWEEP_RESULTS_PATH': os.path.join(_SCRATCH, 'sweeps.sqlite'),
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
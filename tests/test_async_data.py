@@ -0,0 +1,118 @@
+# tests/test_async_data.py
+
+import asyncio
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from trading_assistant.async_data import AsyncFinnhubClient, RateLimitError, TokenBucket, retry_after_seconds
+
+
+class FakeFinnhub:
+    """Local stand-in for the Finnhub REST API that scripts responses per symbol."""
+
+    def __init__(self):
+        self.hits = {}
+        # symbol -> list of (status, headers, delay) served before a normal quote
+        self.script = {}
+        self.delay = 0.0
+
+    async def quote(self, request):
+        symbol = request.query['symbol']
+        self.hits[symbol] = self.hits.get(symbol, 0) + 1
+        script = self.script.get(symbol)
+        if script:
+            status, headers, delay = script.pop(0)
+            await asyncio.sleep(delay)
+            if status != 200:
+                return web.json_response({'error': 'scripted'}, status=status, headers=headers)
+        await asyncio.sleep(self.delay)
+        return web.json_response({'c': 100.0, 'symbol': symbol})
+
+
+def _run(fake, scenario, **client_kwargs):
+    async def main():
+        app = web.Application()
+        app.router.add_get('/quote', fake.quote)
+        async with TestServer(app) as server:
+            client_kwargs.setdefault('backoff', 0.01)
+            async with AsyncFinnhubClient(api_key='test', base_url=str(server.make_url('')),
+                                          **client_kwargs) as client:
+                return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_retry_after_parses_seconds_and_http_dates():
+    assert retry_after_seconds('2') == 2.0
+    assert retry_after_seconds(format_datetime(datetime(2000, 1, 1, tzinfo=timezone.utc), usegmt=True)) == 0.0
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 0 < retry_after_seconds(later) <= 30
+    assert retry_after_seconds('soon') is None
+    assert retry_after_seconds(None) is None
+
+
+def test_429_with_http_date_retry_after_is_retried():
+    fake = FakeFinnhub()
+    past = format_datetime(datetime(2000, 1, 1, tzinfo=timezone.utc), usegmt=True)
+    fake.script['AAPL'] = [(429, {'Retry-After': past}, 0), (503, {}, 0)]
+
+    async def scenario(client):
+        return await client.quote('AAPL'), client.stats
+
+    quote, stats = _run(fake, scenario)
+    assert quote['c'] == 100.0
+    assert fake.hits['AAPL'] == 3
+    assert stats['retries'] == 2
+
+
+def test_persistent_429_raises_rate_limit_error():
+    fake = FakeFinnhub()
+    fake.script['AAPL'] = [(429, {'Retry-After': '0'}, 0)] * 10
+
+    async def scenario(client):
+        with pytest.raises(RateLimitError):
+            await client.quote('AAPL')
+
+    _run(fake, scenario, max_retries=2)
+    assert fake.hits['AAPL'] == 3
+
+
+def test_timeouts_are_retried():
+    fake = FakeFinnhub()
+    fake.script['AAPL'] = [(200, {}, 0.5)]
+
+    async def scenario(client):
+        return await client.quote('AAPL')
+
+    assert _run(fake, scenario, timeout=0.2)['c'] == 100.0
+    assert fake.hits['AAPL'] == 2
+
+
+def test_identical_concurrent_requests_are_coalesced():
+    fake = FakeFinnhub()
+    fake.delay = 0.05
+
+    async def scenario(client):
+        quotes = await asyncio.gather(*(client.quote('AAPL') for _ in range(5)))
+        return quotes, client.stats
+
+    quotes, stats = _run(fake, scenario)
+    assert all(q['c'] == 100.0 for q in quotes)
+    assert fake.hits['AAPL'] == 1
+    assert stats['coalesced'] == 4
+
+
+def test_token_bucket_spaces_requests():
+    fake = FakeFinnhub()
+
+    async def scenario(client):
+        client.limiter = TokenBucket(20, per=1.0, capacity=1)
+        start = time.monotonic()
+        await asyncio.gather(*(client.quote(f"T{i}") for i in range(5)))
+        return time.monotonic() - start
+
+    # One banked token, then 20 per second: the other four wait at least 0.2s in total.
+    assert _run(fake, scenario) >= 0.19
+    assert sum(fake.hits.values()) == 5
@@ -0,0 +1,25 @@
+# tests/test_backtest.py
+
+import numpy as np
+from benchmarks.fixtures import synthetic_ohlcv
+from trading_assistant.analysis import calculate_technical_indicators
+from trading_assistant.backtest import check_parity
+
+
+def _frame(seed=0, n_bars=300):
+    return calculate_technical_indicators(synthetic_ohlcv(n_bars, seed=seed))
+
+
+def test_parity_with_row_by_row_replay():
+    df = _frame()
+    rng = np.random.default_rng(0)
+    sentiment = rng.uniform(-0.5, 0.5, len(df))
+    ml_prediction = rng.choice([1, -1, 0], len(df))
+    assert len(check_parity(df, sentiment, ml_prediction)) == 0
+
+
+def test_parity_with_label_predictions_and_scalar_sentiment():
+    df = _frame(seed=1)
+    labels = np.random.default_rng(1).choice(['Up', 'Down'], len(df))
+    for sentiment in (-0.3, 0.0, 0.3):
+        assert len(check_parity(df, sentiment, labels)) == 0
@@ -0,0 +1,41 @@
+# tests/test_compiled_forest.py
+
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from trading_assistant.compiled_forest import PRECISIONS, CompiledForest, probe_rows
+from trading_assistant.model_registry import COMPILED_ARTIFACT, ModelRegistry
+
+
+@pytest.fixture(scope='module')
+def model():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 6))
+    y = (X[:, 0] + 0.5 * X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=2000) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize('precision', PRECISIONS)
+def test_compiled_forest_predicts_like_sklearn(model, precision, tmp_path):
+    forest = CompiledForest.from_sklearn(model, precision)
+    X = probe_rows(forest)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+    if precision == 'float64':
+        np.testing.assert_array_equal(forest.predict_proba(X), model.predict_proba(X))
+
+    path = str(tmp_path / COMPILED_ARTIFACT)
+    forest.save(path)
+    assert os.listdir(tmp_path) == [COMPILED_ARTIFACT]
+    np.testing.assert_array_equal(CompiledForest.load(path).predict(X), model.predict(X))
+
+
+def test_unreadable_compiled_file_is_not_served(model, tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    version = registry.register(model, [f"f{i}" for i in range(6)])
+    with open(os.path.join(str(tmp_path), version, COMPILED_ARTIFACT), 'wb') as f:
+        f.write(b'PK\x03\x04 truncated')
+    registry.invalidate()
+
+    assert registry.load_compiled(version) == (None, None)
+    assert registry.load(version)[0] is not None
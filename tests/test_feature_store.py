@@ -0,0 +1,72 @@
+# tests/test_feature_store.py
+
+import numpy as np
+import pandas as pd
+from benchmarks.fixtures import synthetic_ohlcv
+from trading_assistant.feature_store import FEATURES, FeatureStore, compute_features
+
+
+def _bars_until_today(n_bars):
+    bars = synthetic_ohlcv(n_bars)
+    bars.index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=n_bars, name='Date')
+    return bars
+
+
+def test_incremental_updates_match_full_recompute(tmp_path):
+    bars = synthetic_ohlcv(1000)
+    store = FeatureStore(str(tmp_path))
+    assert store.update('T', bars.iloc[:600]) == 600
+    for end in range(650, 1001, 50):
+        store.update('T', bars.iloc[:end])
+
+    stored = store.read('T')
+    full = compute_features(bars)
+    assert len(stored['Date']) == len(bars)
+    for name in FEATURES:
+        np.testing.assert_allclose(stored[name], full[name], rtol=1e-6, atol=1e-6)
+
+
+def test_todays_bar_stays_open(tmp_path):
+    bars = _bars_until_today(300)
+    store = FeatureStore(str(tmp_path))
+    assert store.update('T', bars) == len(bars) - 1
+    assert store.last_date('T') == bars.index[-2]
+
+    # A later quote for the same session replaces the open row instead of appending.
+    bars.iloc[-1, bars.columns.get_loc('Close')] *= 1.05
+    assert store.update('T', bars) == 0
+    full = compute_features(bars)
+    X, dates = store.latest_features(['T'])
+    assert dates[0] == bars.index[-1].to_datetime64()
+    np.testing.assert_allclose(X[0], [full[name][-1] for name in FEATURES], rtol=1e-6)
+
+    # Training reads only closed bars.
+    X, y, dates, _ = store.training_matrix(['T'])
+    assert dates.max() < bars.index[-1].to_datetime64()
+
+
+def test_earlier_or_gapped_bars_rebuild_the_ticker(tmp_path):
+    bars = synthetic_ohlcv(1000)
+    store = FeatureStore(str(tmp_path))
+    store.update('T', bars.iloc[400:])
+
+    # An earlier, wider range does not continue the stored rows, so the ticker is rebuilt.
+    assert store.update('T', bars.iloc[:700]) == 700
+    np.testing.assert_array_equal(store.read('T')['Date'], bars.index[:700].to_numpy())
+    np.testing.assert_allclose(store.read('T')['RSI_14'], compute_features(bars.iloc[:700])['RSI_14'])
+
+    # A gap would label the last bar before it against the first close after it.
+    store.update('T', bars.iloc[800:])
+    np.testing.assert_array_equal(store.read('T')['Date'], bars.index[800:].to_numpy())
+
+
+def test_training_reads_only_the_requested_range(tmp_path):
+    from trading_assistant.walk_forward import training_arrays
+    bars = synthetic_ohlcv(1000)
+    store = FeatureStore(str(tmp_path))
+    store.update('T', bars)
+
+    X, y, dates, _ = training_arrays({'T': bars.iloc[300:600]}, FEATURES, store)
+    assert dates.min() >= bars.index[300].to_datetime64()
+    assert dates.max() < bars.index[599].to_datetime64()
+    assert len(store.read('T')['Date']) == 1000
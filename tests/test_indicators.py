@@ -0,0 +1,44 @@
+# tests/test_indicators.py
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.fixtures import synthetic_ohlcv
+from trading_assistant.indicators import IncrementalIndicators, indicator_arrays
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+COLUMNS = ['RSI_14', 'MACD_12_26_9', 'MACDH_12_26_9', 'MACDS_12_26_9', 'SMA_20', 'SMA_50']
+
+
+@pytest.fixture(scope='module')
+def pandas_ta():
+    """pandas_ta's rsi, macd and sma outputs (default arguments) on 300 fixture closes."""
+    return pd.read_csv(os.path.join(FIXTURES, 'pandas_ta_indicators.csv'), index_col='Date', parse_dates=True)
+
+
+def test_indicator_arrays_match_pandas_ta(pandas_ta):
+    arrays = indicator_arrays(pandas_ta['Close'].to_numpy())
+    for column in COLUMNS:
+        expected = pandas_ta[column].to_numpy()
+        np.testing.assert_array_equal(np.isnan(arrays[column]), np.isnan(expected), err_msg=column)
+        np.testing.assert_allclose(arrays[column], expected, rtol=1e-10, atol=1e-10, err_msg=column)
+
+
+def test_incremental_engine_matches_indicator_arrays():
+    close = synthetic_ohlcv(2000, seed=3)['Close'].to_numpy()
+    state = IncrementalIndicators()
+    streamed = {column: [] for column in COLUMNS}
+    for price in close:
+        preview = state.update_quote({'c': price})
+        values = state.update(price)
+        for column in COLUMNS:
+            streamed[column].append(values[column])
+            # A quote previews exactly what the completed bar commits.
+            np.testing.assert_equal(preview[column], values[column])
+
+    arrays = indicator_arrays(close)
+    for column in COLUMNS:
+        actual = np.array(streamed[column])
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(arrays[column]), err_msg=column)
+        np.testing.assert_allclose(actual, arrays[column], rtol=1e-12, atol=1e-12, err_msg=column)
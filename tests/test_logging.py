@@ -0,0 +1,52 @@
+# tests/test_logging.py
+
+import logging
+import queue
+import time
+from trading_assistant.utils import RateLimitFilter, _Listener
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _record(created):
+    record = logging.LogRecord('t', logging.INFO, __file__, 10, "tick %d", (1,), None)
+    record.created = created
+    return record
+
+
+def test_drops_at_the_end_of_a_burst_are_reported():
+    rate_filter = RateLimitFilter(rate=1, burst=2)
+    passed = [rate_filter.filter(_record(100.0)) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+
+    [summary] = rate_filter.pending()
+    assert summary.suppressed == 3
+    assert (summary.name, summary.lineno) == ('t', 10)
+    assert rate_filter.pending() == []
+    # Already reported, so the next record let through does not count them again.
+    record = _record(200.0)
+    assert rate_filter.filter(record) and not hasattr(record, 'suppressed')
+
+
+def test_writer_reports_pending_drops_while_idle_and_on_stop():
+    rate_filter = RateLimitFilter(rate=1, burst=1)
+    handler = ListHandler()
+    listener = _Listener(queue.Queue(), [handler], pending=rate_filter.pending, interval=0.05)
+    listener.start()
+    for _ in range(3):
+        rate_filter.filter(_record(100.0))
+    deadline = time.monotonic() + 2
+    while not handler.records and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r.suppressed for r in handler.records] == [2]
+
+    rate_filter.filter(_record(100.0))
+    listener.stop()
+    assert [r.suppressed for r in handler.records] == [2, 1]
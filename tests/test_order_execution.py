@@ -0,0 +1,85 @@
+# tests/test_order_execution.py
+
+import asyncio
+from datetime import timedelta
+from trading_assistant.order_execution import ExecutionEngine, MockBroker, OrderJournal
+
+
+class FlakyBroker(MockBroker):
+    """MockBroker whose submissions fail before reaching the book while ``down`` is set."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.down = False
+
+    def submit_order(self, order_data):
+        if self.down:
+            with self._lock:
+                self.calls['submit_order'] += 1
+            raise ConnectionError("Connection refused")
+        return super().submit_order(order_data)
+
+
+def _engine(broker, max_retries):
+    return ExecutionEngine(broker, OrderJournal(':memory:'), max_retries=max_retries, backoff=0.0)
+
+
+def test_lost_final_response_is_recovered():
+    # Every submission is accepted but its response is lost, and no retries are allowed.
+    broker = MockBroker(fail_rate=1.0)
+    engine = _engine(broker, max_retries=0)
+    client_order_id = engine.enqueue('AAPL', 1, 'buy')
+    [record] = asyncio.run(engine.submit_pending())
+
+    assert record['status'] != 'failed'
+    assert record['broker_order_id'] == broker.orders[0].id
+    assert broker.calls['submit_order'] == 1
+    assert engine.stats['recovered'] == 1
+    assert engine.journal.get(client_order_id)['error'] is None
+
+
+def test_lost_response_is_not_resubmitted():
+    broker = MockBroker(fail_rate=1.0)
+    engine = _engine(broker, max_retries=3)
+    engine.enqueue('AAPL', 1, 'buy')
+    [record] = asyncio.run(engine.submit_pending())
+
+    assert record['status'] in ('new', 'filled')
+    assert len(broker.orders) == 1
+    assert broker.calls['submit_order'] == 1
+
+
+def test_failed_order_can_be_retried():
+    broker = FlakyBroker()
+    broker.down = True
+    engine = _engine(broker, max_retries=1)
+    client_order_id = engine.enqueue('AAPL', 1, 'buy')
+    [record] = asyncio.run(engine.submit_pending())
+    assert record['status'] == 'failed'
+    assert broker.orders == []
+
+    broker.down = False
+    assert engine.enqueue('AAPL', 1, 'buy', client_order_id=client_order_id) == client_order_id
+    assert engine.journal.get(client_order_id)['status'] == 'queued'
+    [record] = asyncio.run(engine.submit_pending())
+    assert record['status'] in ('new', 'filled')
+    assert [order.client_order_id for order in broker.orders] == [client_order_id]
+
+    # Once accepted, enqueueing the same ID again is a no-op.
+    engine.enqueue('AAPL', 1, 'buy', client_order_id=client_order_id)
+    asyncio.run(engine.submit_pending())
+    assert len(broker.orders) == 1
+
+
+def test_orders_sharing_a_page_boundary_are_polled():
+    broker = MockBroker(fill_delay=3600)
+    engine = _engine(broker, max_retries=0)
+    ids = [engine.enqueue('AAPL', 1, 'buy') for _ in range(501)]
+    asyncio.run(engine.submit_pending())
+    # One order per second, except that the 500th and 501st share the first page's last timestamp.
+    start = broker.orders[0].submitted_at
+    for i, order in enumerate(broker.orders):
+        order.submitted_at = start + timedelta(seconds=min(i, 499))
+
+    updates = engine._poll_once(engine.journal.open_orders())
+    assert sorted(client_order_id for client_order_id, _ in updates) == sorted(ids)
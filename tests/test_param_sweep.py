@@ -0,0 +1,65 @@
+# tests/test_param_sweep.py
+
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+from benchmarks.fixtures import synthetic_ohlcv
+from trading_assistant.param_sweep import FileQueue, MemoCache, ResultStore, SweepData, _feature_matrix, \
+    _fitted_model, run_sweep
+
+GRID = {'rsi_length': [10, 14], 'use_ml': [False, True], 'n_estimators': [5]}
+
+
+def _histories():
+    # LATE starts inside the holdout window of the panel, so it has no rows to train on.
+    return {'EARLY': synthetic_ohlcv(500, seed=1, start='2020-01-01'),
+            'LATE': synthetic_ohlcv(100, seed=2, start='2021-09-01')}
+
+
+def test_sweep_runs_resumes_and_matches_the_queue(tmp_path):
+    histories = _histories()
+    results = ResultStore(str(tmp_path / 'sweeps.sqlite'))
+    sweep_id, summary = run_sweep(histories, GRID, workers=0, results=results, cache_root=str(tmp_path / 'cache'))
+    assert len(summary) == 4
+    assert results.frame(sweep_id)['ml_accuracy'].notna().sum() == 4
+
+    # Rerunning resumes: every point is already in the table.
+    assert run_sweep(histories, GRID, workers=0, results=results, cache_root=str(tmp_path / 'cache'))[0] == sweep_id
+
+    queued = ResultStore(str(tmp_path / 'queued.sqlite'))
+    _, queued_summary = run_sweep(histories, GRID, workers=0, queue_dir=str(tmp_path / 'queue'), results=queued,
+                                  cache_root=str(tmp_path / 'cache'))
+    pd.testing.assert_frame_equal(queued_summary.sort_index(), summary.sort_index())
+
+
+def test_model_never_trains_on_the_holdout_window(tmp_path):
+    data = SweepData(_histories())
+    assert data.eval_row('LATE') == 0
+    cache = MemoCache(str(tmp_path))
+    p = {'rsi_length': 14, 'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9, 'sma_fast': 20, 'sma_slow': 50,
+         'n_estimators': 5, 'max_depth': None}
+    model = _fitted_model(cache, data, p)
+
+    X, _ = _feature_matrix(cache, data, 'EARLY', p)
+    expected = np.count_nonzero(~np.isnan(X[:data.eval_row('EARLY') - 1]).any(axis=1))
+    assert model.estimators_[0].tree_.weighted_n_node_samples[0] == expected
+    # The second call is served from the memo cache.
+    misses = cache.stats['misses']
+    assert _fitted_model(cache, data, p) is model
+    assert cache.stats['misses'] == misses
+
+
+def test_only_stale_claims_are_requeued(tmp_path):
+    queue = FileQueue(str(tmp_path))
+    queue.publish('s', {}, {}, [(0, {}), (1, {})])
+    live, _ = queue.claim()
+    dead, _ = queue.claim()
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    os.rename(os.path.join(queue.claimed, dead), os.path.join(queue.claimed, f"{dead.rpartition('@')[0]}@{exited.pid}"))
+
+    assert queue.requeue_stale() == 1
+    assert os.listdir(queue.claimed) == [live]
+    assert queue.outstanding('s') == 2
@@ -0,0 +1,38 @@
+# tests/test_portfolio.py
+
+import numpy as np
+import pandas as pd
+from trading_assistant.portfolio import allocate
+
+CAPITAL = 100000.0
+
+
+def _candidates(n, stop, sectors=None):
+    return pd.DataFrame({'symbol': [f"T{i}" for i in range(n)], 'entry': 100.0, 'side': 'BUY', 'stop': stop,
+                         'sector': sectors if sectors is not None else [f"S{i}" for i in range(n)]})
+
+
+def test_position_cap():
+    # A 0.10 stop distance would risk 1% on 10,000 shares: 1,000% of capital in one position.
+    allocation = allocate(_candidates(1, 99.9), CAPITAL)
+    np.testing.assert_allclose(allocation['notional'], 0.10 * CAPITAL)
+
+
+def test_sector_cap_applies_after_the_position_cap():
+    allocation = allocate(_candidates(4, 99.9, sectors=['Tech'] * 4), CAPITAL)
+    # Each position is first capped at 10%; the sector's 40% is then scaled to 30%.
+    np.testing.assert_allclose(allocation['notional'], 0.075 * CAPITAL)
+
+
+def test_gross_cap_applies_after_position_and_sector_caps():
+    allocation = allocate(_candidates(12, 99.9), CAPITAL)
+    np.testing.assert_allclose(allocation['notional'], 0.10 * CAPITAL * 100 / 120)
+    assert np.isclose(allocation['notional'].sum(), CAPITAL)
+
+
+def test_risk_budget_applies_last():
+    # Wide stops keep every exposure cap loose: 20 shares and 2,000 notional per trade.
+    allocation = allocate(_candidates(10, 50.0), CAPITAL)
+    assert np.isclose(allocation['risk'].sum(), 0.05 * CAPITAL)
+    np.testing.assert_allclose(allocation['qty'], 10.0)
+    np.testing.assert_allclose(allocation['scale'], 0.5)
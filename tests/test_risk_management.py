@@ -0,0 +1,30 @@
+# tests/test_risk_management.py
+
+import itertools
+import numpy as np
+from trading_assistant.risk_management import calculate_position_size, calculate_stop_loss, \
+    calculate_target_profit, position_sizes, stop_losses, target_profits
+
+ENTRIES = [0.0, -5.0, 1.0, 50.0, 123.45]
+
+
+def test_array_functions_match_the_scalar_ones():
+    tolerances = [0.0, 0.01, 0.5, 1.0, 2.5, -0.1]
+    for is_long in (True, False):
+        cases = list(itertools.product(ENTRIES, tolerances))
+        entry, tolerance = (np.array(values) for values in zip(*cases))
+        np.testing.assert_allclose(stop_losses(entry, tolerance, is_long),
+                                   [calculate_stop_loss(e, t, is_long) for e, t in cases])
+
+        factors = [0.0, 0.02, 0.5, 1.5, -1.0]
+        cases = list(itertools.product(ENTRIES, factors))
+        entry, factor = (np.array(values) for values in zip(*cases))
+        np.testing.assert_allclose(target_profits(entry, factor, is_long),
+                                   [calculate_target_profit(e, f, is_long) for e, f in cases])
+
+    stops = [0.0, -1.0, 1.0, 45.0, 50.0, 130.0]
+    for capital, risk in itertools.product([0.0, 10000.0], [0.0, 0.01, 1.0, 1.5]):
+        cases = list(itertools.product(stops, ENTRIES))
+        stop, entry = (np.array(values) for values in zip(*cases))
+        np.testing.assert_allclose(position_sizes(capital, risk, stop, entry),
+                                   [calculate_position_size(capital, risk, s, e) for s, e in cases])
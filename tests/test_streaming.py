@@ -0,0 +1,71 @@
+# tests/test_streaming.py
+
+import asyncio
+from trading_assistant.streaming import CLOCK_GRACE, StreamIngestor
+
+
+class QuietStream:
+    """Sends one batch of ticks, then nothing while its clock moves on: a quiet socket."""
+
+    def __init__(self, ticks, quiet_until):
+        self.ticks = ticks
+        self.now = ticks[-1][3]
+        self.quiet_until = quiet_until
+
+    def clock(self):
+        return self.now
+
+    async def __aiter__(self):
+        yield self.ticks
+        self.now = self.quiet_until
+        await asyncio.Event().wait()
+
+
+def test_deadline_and_bar_close_on_a_quiet_socket():
+    source = QuietStream([('AAA', 10.0, 1.0, 1000.0), ('BBB', 20.0, 1.0, 1010.0)], quiet_until=1020.0 + CLOCK_GRACE)
+    ingestor = StreamIngestor(['AAA', 'BBB'], source, intervals=(60,))
+    bars = []
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 0.3
+        # Bars closed by the clock arrive before the deadline, not from the final flush.
+        ingestor.subscribe(lambda bar: bars.append(bar) if loop.time() < deadline else None)
+        return await asyncio.wait_for(ingestor.run(until=lambda: loop.time() >= deadline, tick=0.05), timeout=5)
+
+    metrics = asyncio.run(_run())
+    assert sorted(bar['symbol'] for bar in bars) == ['AAA', 'BBB']
+    assert all(bar['timestamp'].timestamp() == 960 for bar in bars)
+    assert metrics['bars'] == 2
+
+
+class BatchStream:
+    """Delivers fixed tick batches with no clock, so only the ticks themselves close bars."""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+    async def __aiter__(self):
+        for batch in self.batches:
+            yield batch
+
+
+def test_other_symbols_ticks_do_not_close_a_bar_early():
+    source = BatchStream([
+        [('A', 10.0, 1.0, 0.0)],
+        [('A', 11.0, 1.0, 59.0), ('B', 20.0, 1.0, 61.0)],
+        [('A', 12.0, 1.0, 59.5)],
+        # Closes A's 00:00 bar; the A tick after it falls in that bar and is late.
+        [('B', 21.0, 1.0, 200.0)],
+        [('A', 13.0, 1.0, 30.0)],
+    ])
+    ingestor = StreamIngestor(['A', 'B'], source, intervals=(60,))
+    bars = []
+    ingestor.subscribe(bars.append)
+    metrics = asyncio.run(ingestor.run(tick=60))
+
+    [bar] = [bar for bar in bars if bar['symbol'] == 'A']
+    assert bar['timestamp'].timestamp() == 0
+    assert (bar['Open'], bar['High'], bar['Close'], bar['Volume']) == (10.0, 12.0, 12.0, 3.0)
+    assert len(ingestor.bars('A')) == 1
+    assert metrics['late_ticks'] == 1
@@ -1,34 +1,45 @@
 # trading_assistant/analysis.py
 
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
 from trading_assistant.utils import get_logger
-from urllib.error import URLError
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.indicators import indicator_arrays
+from trading_assistant.regimes import REGIMES, classify_regimes
+from trading_assistant.instrumentation import timed
+from trading_assistant.sentiment import get_sentiment_service
 
 logger = get_logger(__name__)
 
-# Download VADER lexicon for sentiment analysis
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError:
-    try:
-        nltk.download('vader_lexicon')
-    except URLError:
-        logger.error("Failed to download vader_lexicon due to a network error.")
+@timed('indicators')
+def compute_indicators(bars, dtype=np.float64, **lengths) -> pd.DataFrame:
+    """
+    Computes RSI, MACD (line, histogram, signal) and the 20/50 SMAs for OHLCV bars and returns
+    only those columns, on the bars' index.
 
+    ``bars`` may be a DataFrame (flat or yfinance MultiIndex columns) or a ``Bars`` container;
+    it is only read. Pass ``dtype=np.float32`` to halve the memory of the result. ``lengths``
+    (rsi_length, macd_fast, macd_slow, macd_signal, sma_lengths) override the defaults of
+    indicator_arrays, and the column names follow them (e.g. ``RSI_21``).
+    """
+    if isinstance(bars, pd.DataFrame):
+        bars = flat_ohlcv(bars)
+    close = bars['Close']
+    close = close.to_numpy() if isinstance(close, pd.Series) else close
+    return pd.DataFrame(indicator_arrays(close, dtype=dtype, **lengths), index=bars.index, copy=False)
 
-def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+def calculate_technical_indicators(df: pd.DataFrame, dtype=np.float64, **lengths) -> pd.DataFrame:
     """
-    Calculates technical indicators and adds them as new columns to the DataFrame.
+    Returns the OHLCV DataFrame with the technical indicator columns appended.
+
+    The input is left untouched and its columns are shared with the result rather than copied.
+    Use compute_indicators when only the indicator columns are needed.
     """
     if not isinstance(df, pd.DataFrame) or df.empty:
         logger.warning("Input is not a valid pandas DataFrame or is empty.")
         return pd.DataFrame()
 
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(1)
+    df = flat_ohlcv(df)
 
     required_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
     if not all(col in df.columns for col in required_cols):
@@ -37,48 +48,36 @@ def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
 
     try:
         logger.info("Calculating technical indicators...")
-        df.ta.rsi(append=True)
-        df.ta.macd(append=True)
-        df.ta.sma(length=20, append=True)
-        df.ta.sma(length=50, append=True)
-        return df
+        indicators = compute_indicators(df, dtype=dtype, **lengths)
+        return pd.concat([df, indicators], axis=1)
     except Exception as e:
         logger.error(f"Error calculating technical indicators: {e}")
         return df
 
+def _latest(df, column):
+    return df[column].iloc[-1]
+
 def determine_market_personality(df: pd.DataFrame) -> str:
     """
     Determines the market personality based on technical indicators.
+
+    Only the last row is read and the input is not modified. See regimes.latest_regimes and
+    regimes.regime_map to classify a whole universe, or every date, at once.
     """
     if not isinstance(df, pd.DataFrame) or df.empty:
         logger.warning("Input is not a valid pandas DataFrame or is empty.")
         return 'Undetermined'
 
-    if isinstance(df.columns, pd.MultiIndex):
-         df.columns = df.columns.get_level_values(1)
+    df = flat_ohlcv(df)
 
     try:
         logger.info("Determining market personality...")
-        df['SMA_20'] = df['SMA_20'].fillna(0)
-        df['SMA_50'] = df['SMA_50'].fillna(0)
-
-        if df['SMA_20'].iloc[-1] > df['SMA_50'].iloc[-1] and df['Close'].iloc[-1] > df['SMA_20'].iloc[-1]:
-            if 'MACDH_12_26_9' in df.columns and df['MACDH_12_26_9'].iloc[-1] > 0:
-                 return 'Trending Up'
-            elif 'MACDH_12_26_9' not in df.columns:
-                 return 'Trending Up'
-
-        elif df['SMA_20'].iloc[-1] < df['SMA_50'].iloc[-1] and df['Close'].iloc[-1] < df['SMA_20'].iloc[-1]:
-            if 'MACDH_12_26_9' in df.columns and df['MACDH_12_26_9'].iloc[-1] < 0:
-                return 'Trending Down'
-            elif 'MACDH_12_26_9' not in df.columns:
-                 return 'Trending Down'
-
-        if 'RSI_14' in df.columns and 40 < df['RSI_14'].iloc[-1] < 60:
-             if abs(df['SMA_20'].iloc[-1] - df['SMA_50'].iloc[-1]) / df['SMA_50'].iloc[-1] < 0.02:
-                 return 'Range-Bound'
-
-        return 'Undetermined'
+        code = classify_regimes(
+            _latest(df, 'Close'), _latest(df, 'SMA_20'), _latest(df, 'SMA_50'),
+            _latest(df, 'MACDH_12_26_9') if 'MACDH_12_26_9' in df.columns else None,
+            _latest(df, 'RSI_14') if 'RSI_14' in df.columns else None,
+        )
+        return REGIMES[int(code)]
     except Exception as e:
         logger.error(f"Error determining market personality: {e}")
         return 'Undetermined'
@@ -86,14 +85,14 @@ def determine_market_personality(df: pd.DataFrame) -> str:
 def analyze_sentiment(headline: str) -> dict:
     """
     Analyzes the sentiment of a news headline using NLTK's VADER.
+
+    Uses the shared, cached sentiment service; prefer sentiment.analyze_sentiments for batches.
     """
     if not isinstance(headline, str) or not headline:
         logger.warning("Input is not a valid string or is empty.")
         return {"error": "Invalid input headline"}
     try:
-        analyzer = SentimentIntensityAnalyzer()
-        sentiment_scores = analyzer.polarity_scores(headline)
-        return sentiment_scores
+        return get_sentiment_service().analyze_sentiment(headline)
     except Exception as e:
         logger.error(f"Error analyzing sentiment for headline '{headline}': {e}")
         return {"error": str(e)}
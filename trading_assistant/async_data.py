@@ -0,0 +1,269 @@
+# trading_assistant/async_data.py
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import aiohttp
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import span, increment
+from trading_assistant.news_store import get_news_store
+from trading_assistant.config import (FINNHUB_API_KEY, FINNHUB_BASE_URL, FINNHUB_CALLS_PER_MINUTE,
+                                      NEWS_STORE_ENABLED, NEWS_LOOKBACK_DAYS)
+
+logger = get_logger(__name__)
+
+
+class RateLimitError(Exception):
+    """Raised when a request is still rate limited (or failing with 5xx) after all retries."""
+
+
+def retry_after_seconds(value):
+    """
+    Seconds to wait from a Retry-After header, given as delta-seconds or as an HTTP date.
+    Returns None when the header is missing or unparseable.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Async token bucket: ``rate`` tokens per ``per`` seconds with at most ``capacity`` banked.
+    """
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = rate / per
+        self.capacity = capacity if capacity is not None else max(1, min(rate, 30))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def drain(self):
+        """Empties the bucket, e.g. after the server reports a rate limit."""
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+
+class AsyncFinnhubClient:
+    """
+    Asyncio Finnhub REST client sharing one connection pool.
+
+    Requests pass through a token bucket sized to the plan's calls per minute, are retried
+    with exponential backoff on 429 and 5xx responses, connection errors and timeouts, and
+    identical concurrent requests are coalesced into a single in-flight call. ``base_url`` can
+    point at a local fake server.
+    """
+
+    def __init__(self, api_key=FINNHUB_API_KEY, calls_per_minute=FINNHUB_CALLS_PER_MINUTE,
+                 base_url=FINNHUB_BASE_URL, max_connections=20, max_retries=5, backoff=0.5, timeout=10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(calls_per_minute)
+        self._session = None
+        self._in_flight = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'retries': 0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers={'X-Finnhub-Token': self.api_key or ''},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, path, params):
+        key = (path, tuple(sorted(params.items())))
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(self._request(path, params))
+        self._in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._in_flight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+    async def _request(self, path, params):
+        await self.open()
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            self.stats['requests'] += 1
+            try:
+                with span('finnhub_request', path=path):
+                    response = await self._session.get(url, params=params)
+                async with response:
+                    if response.status != 429 and response.status < 500:
+                        response.raise_for_status()
+                        return await response.json()
+                    reason, retry_after = response.status, response.headers.get('Retry-After')
+            except aiohttp.ClientResponseError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                reason, retry_after = type(e).__name__, None
+            if attempt == self.max_retries:
+                break
+            delay = retry_after_seconds(retry_after)
+            if delay is None:
+                delay = self.backoff * 2 ** attempt
+            delay *= 1 + random.random() * 0.1
+            if reason == 429:
+                self.limiter.drain()
+            logger.warning(f"Finnhub request {path} failed ({reason}); retrying in {delay:.2f}s")
+            self.stats['retries'] += 1
+            increment('finnhub_retries', status=reason)
+            await asyncio.sleep(delay)
+        raise RateLimitError(f"Finnhub request {path} failed after {self.max_retries} retries")
+
+    async def quote(self, symbol):
+        return await self._get("/quote", {'symbol': symbol})
+
+    async def company_news(self, symbol, _from, to):
+        return await self._get("/company-news", {'symbol': symbol, 'from': _from, 'to': to})
+
+    async def general_news(self, category, min_id=0):
+        return await self._get("/news", {'category': category, 'minId': min_id})
+
+
+async def fetch_realtime_data_async(client, ticker):
+    """Async counterpart of data_handler.fetch_realtime_data, with the same return shape."""
+    if client is None:
+        return None
+    try:
+        logger.info("Fetching real-time data for %s", ticker, extra={'ticker': ticker})
+        quote = await client.quote(ticker)
+        if quote and 'c' in quote:
+            return quote
+        else:
+            logger.warning(f"Could not retrieve real-time data for {ticker}")
+            return None
+    except Exception as e:
+        logger.error(f"Error fetching real-time data for {ticker}: {e}")
+        return None
+
+
+async def _fetch_news_stored_async(client, store, ticker, category):
+    if not store.is_fresh(ticker, category):
+        try:
+            if ticker:
+                start_date_str, end_date_str = store.date_range(ticker)
+                logger.info("Fetching news for %s since %s", ticker, start_date_str, extra={'ticker': ticker})
+                news = await client.company_news(ticker, start_date_str, end_date_str)
+            else:
+                min_id = store.last_id(category)
+                logger.info("Fetching news for category %s after id %s", category, min_id)
+                news = await client.general_news(category, min_id=min_id)
+            store.add(news, ticker=ticker, category=category)
+        except Exception as e:
+            logger.error(f"Error fetching news, serving stored articles: {e}")
+    news = store.recent(ticker, category)
+    if not news:
+        logger.warning(f"No news found for ticker: {ticker} or category: {category}")
+        return None
+    return news
+
+
+async def fetch_news_headlines_async(client, ticker=None, category=None, store=None):
+    """Async counterpart of data_handler.fetch_news_headlines, with the same return shape."""
+    if client is None:
+        return None
+    if not ticker and not category:
+        logger.warning("Please provide either a ticker or a category for news.")
+        return None
+    if store is None and NEWS_STORE_ENABLED:
+        store = get_news_store()
+    if store:
+        return await _fetch_news_stored_async(client, store, ticker, category)
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=NEWS_LOOKBACK_DAYS)
+        if ticker:
+            logger.info("Fetching news for %s", ticker, extra={'ticker': ticker})
+            news = await client.company_news(ticker, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        else:
+            logger.info("Fetching news for category %s", category)
+            news = await client.general_news(category, min_id=0)
+
+        if news:
+            return news
+        else:
+            logger.warning(f"No news found for ticker: {ticker} or category: {category}")
+            return None
+    except Exception as e:
+        logger.error(f"Error fetching news: {e}")
+        return None
+
+
+async def fetch_quotes(client, tickers):
+    """Quotes many tickers concurrently. Returns a dict of ticker to quote (or None)."""
+    quotes = await asyncio.gather(*(fetch_realtime_data_async(client, t) for t in tickers))
+    return dict(zip(tickers, quotes))
+
+
+async def fetch_news_many(client, tickers, store=None):
+    """Pulls company news for many tickers concurrently. Returns a dict of ticker to articles (or None)."""
+    news = await asyncio.gather(*(fetch_news_headlines_async(client, t, store=store) for t in tickers))
+    return dict(zip(tickers, news))
+
+
+def fetch_watchlist(tickers, include_news=True, **client_kwargs):
+    """
+    Blocking helper that quotes (and optionally pulls news for) a whole watchlist concurrently.
+
+    Returns ``(quotes, news)`` dicts keyed by ticker; ``news`` is empty when not requested.
+    """
+    async def _run():
+        async with AsyncFinnhubClient(**client_kwargs) as client:
+            quotes_task = fetch_quotes(client, tickers)
+            if include_news:
+                return await asyncio.gather(quotes_task, fetch_news_many(client, tickers))
+            return await quotes_task, {}
+
+    return tuple(asyncio.run(_run()))
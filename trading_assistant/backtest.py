@@ -0,0 +1,346 @@
+# trading_assistant/backtest.py
+
+import itertools
+import numpy as np
+import pandas as pd
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.indicators import indicator_arrays, macd_arrays, rsi_array, sma_array
+from trading_assistant.risk_management import calculate_position_size, calculate_stop_loss, calculate_target_profit
+from trading_assistant.trading_logic import RSI_OVERSOLD, RSI_OVERBOUGHT, SENTIMENT_THRESHOLD
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+BUY, HOLD, SELL = 1, 0, -1
+DECISION_LABELS = {BUY: 'BUY', HOLD: 'HOLD', SELL: 'SELL'}
+ML_CODES = {'Up': 1, 'Down': -1}
+TRADING_DAYS = 252
+
+DEFAULT_PARAMS = {
+    'rsi_length': 14,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'sma_fast': 20,
+    'sma_slow': 50,
+    'rsi_oversold': RSI_OVERSOLD,
+    'rsi_overbought': RSI_OVERBOUGHT,
+    'sentiment_threshold': SENTIMENT_THRESHOLD,
+    'risk_percentage': 0.01,
+    'reward_ratio': 2.0,
+}
+
+
+def _lagged(values):
+    """Shifts an array forward one bar, filling the first bar with NaN."""
+    out = np.empty_like(values, dtype=float)
+    out[0] = np.nan
+    out[1:] = values[:-1]
+    return out
+
+
+def technical_signal_arrays(rsi, macd, macd_signal, sma_fast, sma_slow, rsi_oversold=30, rsi_overbought=70):
+    """
+    Evaluates the crossover/RSI/MACD rules of generate_trading_signal on every bar at once.
+
+    Returns (tech_buy, tech_sell) boolean arrays. As in the per-row function, a bar needs a
+    previous bar to signal and NaN comparisons are never true.
+    """
+    rsi, macd, macd_signal = (np.asarray(a, dtype=float) for a in (rsi, macd, macd_signal))
+    sma_fast, sma_slow = np.asarray(sma_fast, dtype=float), np.asarray(sma_slow, dtype=float)
+    prev_rsi, prev_macd, prev_signal = _lagged(rsi), _lagged(macd), _lagged(macd_signal)
+    prev_fast, prev_slow = _lagged(sma_fast), _lagged(sma_slow)
+
+    with np.errstate(invalid='ignore'):
+        tech_buy = ((prev_fast <= prev_slow) & (sma_fast > sma_slow)) | \
+                   ((rsi < rsi_oversold) & (prev_rsi <= rsi)) | \
+                   ((prev_macd <= prev_signal) & (macd > macd_signal))
+        tech_sell = ((prev_fast >= prev_slow) & (sma_fast < sma_slow)) | \
+                    ((rsi > rsi_overbought) & (prev_rsi >= rsi)) | \
+                    ((prev_macd >= prev_signal) & (macd < macd_signal))
+    return tech_buy, tech_sell
+
+
+def combine_signal_arrays(tech_buy, tech_sell, sentiment=0.0, ml_prediction=None, sentiment_threshold=0.1):
+    """
+    Applies the sentiment rules of generate_trading_signal and the ML merging rules of
+    make_trading_decision to whole arrays. Returns int8 decisions (BUY=1, HOLD=0, SELL=-1).
+
+    ``sentiment`` is a compound score (scalar or per-bar array); ``ml_prediction`` is None or
+    a per-bar array of 'Up'/'Down' labels or +1/-1/0 codes, where 0 means no prediction.
+    """
+    sentiment = np.broadcast_to(np.asarray(sentiment, dtype=float), tech_buy.shape)
+    positive = sentiment > sentiment_threshold
+    negative = sentiment < -sentiment_threshold
+
+    rule = np.select(
+        [tech_buy & positive, tech_sell & negative, tech_buy & ~negative, tech_sell & ~positive],
+        [BUY, SELL, BUY, SELL],
+        default=HOLD,
+    ).astype(np.int8)
+    if ml_prediction is None:
+        return rule
+
+    ml = np.asarray(ml_prediction)
+    if ml.dtype.kind in 'OUS':
+        ml = np.array([ML_CODES.get(label, 0) for label in ml], dtype=np.int8)
+    ml = np.broadcast_to(ml.astype(np.int8), rule.shape)
+    merged = np.select(
+        [(rule == BUY) & (ml == 1), (rule == SELL) & (ml == -1), (rule == HOLD) & (ml == 1), (rule == HOLD) & (ml == -1)],
+        [BUY, SELL, BUY, SELL],
+        default=HOLD,
+    ).astype(np.int8)
+    return np.where(ml == 0, rule, merged).astype(np.int8)
+
+
+def decisions_from_frame(df_with_indicators, sentiment=0.0, ml_prediction=None, rsi_oversold=30,
+                         rsi_overbought=70, sentiment_threshold=0.1):
+    """Computes make_trading_decision for every row of a frame that already has indicator columns."""
+    tech_buy, tech_sell = technical_signal_arrays(
+        df_with_indicators['RSI_14'].to_numpy(), df_with_indicators['MACD_12_26_9'].to_numpy(),
+        df_with_indicators['MACDS_12_26_9'].to_numpy(), df_with_indicators['SMA_20'].to_numpy(),
+        df_with_indicators['SMA_50'].to_numpy(), rsi_oversold, rsi_overbought,
+    )
+    return combine_signal_arrays(tech_buy, tech_sell, sentiment, ml_prediction, sentiment_threshold)
+
+
+def _find_exit(open_, high, low, close, decisions, entry_idx, direction, stop_loss, target):
+    """
+    Finds the first bar after entry that hits the stop, the target or an opposite signal,
+    scanning forward in geometrically growing windows. Returns (index, price, reason).
+    """
+    n = len(close)
+    lo, width = entry_idx + 1, 16
+    while lo < n:
+        hi = min(n, lo + width)
+        if direction == BUY:
+            stop_hit, target_hit = low[lo:hi] <= stop_loss, high[lo:hi] >= target
+        else:
+            stop_hit, target_hit = high[lo:hi] >= stop_loss, low[lo:hi] <= target
+        reverse_hit = decisions[lo:hi] == -direction
+        hits = np.flatnonzero(stop_hit | target_hit | reverse_hit)
+        if hits.size:
+            k = hits[0]
+            j = lo + k
+            if stop_hit[k]:
+                gapped = open_[j] < stop_loss if direction == BUY else open_[j] > stop_loss
+                return j, (open_[j] if gapped else stop_loss), 'stop'
+            if target_hit[k]:
+                gapped = open_[j] > target if direction == BUY else open_[j] < target
+                return j, (open_[j] if gapped else target), 'target'
+            return j, close[j], 'signal'
+        lo, width = hi, width * 4
+    return n - 1, close[n - 1], 'end'
+
+
+def simulate_trades(open_, high, low, close, decisions, initial_capital=100000.0, risk_percentage=0.01,
+                    reward_ratio=2.0, allow_short=True):
+    """
+    Simulates fills for a decision array, one position at a time.
+
+    Entries fill at the signal bar's close. Stop-loss, target and position size come from the
+    risk_management functions, exactly as the app computes them (target = risk * reward_ratio).
+    Exits happen at the stop or target when a later bar trades through it (stop first if both
+    are touched, at the open if the bar gaps past the level), or at the close of an opposite
+    signal, which also opens the reverse position.
+
+    Returns (equity array, list of trade dicts).
+    """
+    open_, high, low, close = (np.asarray(a, dtype=float) for a in (open_, high, low, close))
+    decisions = np.asarray(decisions)
+    risk_percentage = float(risk_percentage)
+    n = len(close)
+    capital = float(initial_capital)
+    trades = []
+
+    realized = np.zeros(n)
+    position = np.zeros(n)
+    entry_marks = np.zeros(n)
+
+    entries = np.flatnonzero((decisions == BUY) | ((decisions == SELL) if allow_short else False))
+    i = entries[0] if entries.size else n
+    while i < n:
+        direction = int(decisions[i])
+        is_long = direction == BUY
+        entry_price = close[i]
+        stop_loss = calculate_stop_loss(float(entry_price), risk_percentage, is_long=is_long)
+        target = calculate_target_profit(float(entry_price), risk_percentage * reward_ratio, is_long=is_long)
+        qty = calculate_position_size(capital, risk_percentage, float(stop_loss), float(entry_price))
+        if qty <= 0 or not np.isfinite(entry_price):
+            k = np.searchsorted(entries, i, side='right')
+            i = entries[k] if k < entries.size else n
+            continue
+
+        exit_idx, exit_price, reason = _find_exit(open_, high, low, close, decisions, i, direction, stop_loss, target)
+        pnl = direction * qty * (exit_price - entry_price)
+        position[i:exit_idx] = direction * qty
+        entry_marks[i:exit_idx] = entry_price
+        capital += pnl
+        realized[exit_idx] += pnl
+        trades.append({
+            'entry_index': int(i), 'exit_index': int(exit_idx), 'side': DECISION_LABELS[direction],
+            'qty': qty, 'entry_price': float(entry_price), 'exit_price': float(exit_price),
+            'stop_loss': float(stop_loss), 'target': float(target), 'pnl': float(pnl),
+            'return': float(pnl / (capital - pnl)) if capital != pnl else 0.0, 'exit_reason': reason,
+        })
+
+        if reason == 'signal' and allow_short and exit_idx < n - 1:
+            i = exit_idx
+        else:
+            k = np.searchsorted(entries, exit_idx, side='right')
+            i = entries[k] if k < entries.size else n
+
+    equity = initial_capital + np.cumsum(realized) + position * (close - entry_marks)
+    return equity, trades
+
+
+def summarize(equity, trades, periods_per_year=TRADING_DAYS):
+    """Summary statistics for an equity curve and trade list."""
+    equity = np.asarray(equity, dtype=float)
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.array([])
+    running_max = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = equity / running_max - 1 if len(equity) else equity
+    pnls = np.array([t['pnl'] for t in trades], dtype=float)
+    wins, losses = pnls[pnls > 0], pnls[pnls < 0]
+    years = len(equity) / periods_per_year if len(equity) else 0
+
+    total_return = equity[-1] / equity[0] - 1 if len(equity) else 0.0
+    return {
+        'total_return': float(total_return),
+        'cagr': float((1 + total_return) ** (1 / years) - 1) if years > 0 and total_return > -1 else 0.0,
+        'sharpe': float(returns.mean() / returns.std() * np.sqrt(periods_per_year)) if returns.size and returns.std() > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else 0.0,
+        'num_trades': int(len(trades)),
+        'win_rate': float(len(wins) / len(pnls)) if len(pnls) else 0.0,
+        'profit_factor': float(wins.sum() / -losses.sum()) if losses.size else float('inf') if wins.size else 0.0,
+        'avg_trade_pnl': float(pnls.mean()) if len(pnls) else 0.0,
+    }
+
+
+def _backtest_arrays(open_, high, low, close, indicators, sentiment, ml_prediction, p, initial_capital, allow_short):
+    """Signals and fills for one history; shared by run_backtest and sweep."""
+    macd_props = f"_{p['macd_fast']}_{p['macd_slow']}_{p['macd_signal']}"
+    tech_buy, tech_sell = technical_signal_arrays(
+        indicators[f"RSI_{p['rsi_length']}"], indicators[f"MACD{macd_props}"], indicators[f"MACDS{macd_props}"],
+        indicators[f"SMA_{p['sma_fast']}"], indicators[f"SMA_{p['sma_slow']}"],
+        p['rsi_oversold'], p['rsi_overbought'],
+    )
+    decisions = combine_signal_arrays(tech_buy, tech_sell, sentiment, ml_prediction, p['sentiment_threshold'])
+    equity, trades = simulate_trades(open_, high, low, close, decisions, initial_capital,
+                                     p['risk_percentage'], p['reward_ratio'], allow_short)
+    return decisions, equity, trades
+
+
+def _ohlc_arrays(df):
+    df = flat_ohlcv(df)
+    return tuple(df[col].to_numpy(dtype=float) for col in ('Open', 'High', 'Low', 'Close'))
+
+
+def run_backtest(historical_data, sentiment=0.0, ml_prediction=None, initial_capital=100000.0,
+                 allow_short=True, indicators=None, **params):
+    """
+    Backtests the rule set of make_trading_decision over a full OHLCV history in one pass.
+
+    ``params`` override DEFAULT_PARAMS (indicator lengths, RSI thresholds, sentiment cutoff,
+    risk percentage and reward ratio). Precomputed ``indicators`` arrays may be passed to
+    skip the indicator step when sweeping non-indicator parameters.
+
+    Returns a dict with the ``equity`` and ``decisions`` Series, the ``trades`` DataFrame and ``stats``.
+    """
+    if not isinstance(historical_data, pd.DataFrame) or historical_data.empty:
+        logger.error("Historical data must be a non-empty DataFrame.")
+        return None
+    p = {**DEFAULT_PARAMS, **params}
+    open_, high, low, close = _ohlc_arrays(historical_data)
+    if indicators is None:
+        indicators = indicator_arrays(close, p['rsi_length'], p['macd_fast'], p['macd_slow'], p['macd_signal'],
+                                      (p['sma_fast'], p['sma_slow']))
+    decisions, equity, trades = _backtest_arrays(open_, high, low, close, indicators, sentiment, ml_prediction,
+                                                 p, initial_capital, allow_short)
+
+    index = historical_data.index
+    trades_df = pd.DataFrame(trades)
+    if not trades_df.empty:
+        trades_df['entry_date'] = index[trades_df['entry_index']]
+        trades_df['exit_date'] = index[trades_df['exit_index']]
+    return {
+        'equity': pd.Series(equity, index=index, name='equity'),
+        'decisions': pd.Series(decisions, index=index, name='decision'),
+        'trades': trades_df,
+        'stats': summarize(equity, trades),
+    }
+
+
+def sweep(histories, grid, sentiment=0.0, initial_capital=100000.0, allow_short=True):
+    """
+    Runs the backtest for every ticker and every combination in a parameter grid.
+
+    ``histories`` maps ticker to OHLCV DataFrame and ``grid`` maps parameter name to a list of
+    values. Indicator arrays are computed once per ticker and distinct indicator length.
+    Returns a DataFrame with one row of stats per (ticker, parameter combination).
+    """
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    rows = []
+    for ticker, df in histories.items():
+        if df is None or df.empty:
+            continue
+        open_, high, low, close = _ohlc_arrays(df)
+        cache = {}
+        for combo in combos:
+            p = {**DEFAULT_PARAMS, **combo}
+            macd_key = ('macd', p['macd_fast'], p['macd_slow'], p['macd_signal'])
+            if macd_key not in cache:
+                cache[macd_key] = macd_arrays(close, *macd_key[1:])
+            for key, fn in ((('rsi', p['rsi_length']), rsi_array),
+                            (('sma', p['sma_fast']), sma_array), (('sma', p['sma_slow']), sma_array)):
+                if key not in cache:
+                    cache[key] = fn(close, key[1])
+            macd_props = f"_{p['macd_fast']}_{p['macd_slow']}_{p['macd_signal']}"
+            macd, histogram, signal = cache[macd_key]
+            indicators = {
+                f"RSI_{p['rsi_length']}": cache[('rsi', p['rsi_length'])],
+                f"MACD{macd_props}": macd, f"MACDH{macd_props}": histogram, f"MACDS{macd_props}": signal,
+                f"SMA_{p['sma_fast']}": cache[('sma', p['sma_fast'])],
+                f"SMA_{p['sma_slow']}": cache[('sma', p['sma_slow'])],
+            }
+            _, equity, trades = _backtest_arrays(open_, high, low, close, indicators, sentiment, None,
+                                                 p, initial_capital, allow_short)
+            rows.append({'ticker': ticker, **combo, **summarize(equity, trades)})
+    logger.info(f"Parameter sweep finished: {len(rows)} backtests over {len(histories)} tickers")
+    return pd.DataFrame(rows)
+
+
+def replay_decisions(df_with_indicators, sentiment=0.0, ml_prediction=None):
+    """
+    Slow reference: calls make_trading_decision on every prefix of the frame, row by row.
+    """
+    from trading_assistant.trading_logic import make_trading_decision
+
+    n = len(df_with_indicators)
+    sentiment = np.broadcast_to(np.asarray(sentiment, dtype=float), (n,))
+    decisions = []
+    for i in range(n):
+        ml = None if ml_prediction is None else ml_prediction[i]
+        if isinstance(ml, (int, np.integer)):
+            ml = {1: 'Up', -1: 'Down'}.get(int(ml))
+        label = make_trading_decision(df_with_indicators.iloc[max(0, i - 1):i + 1],
+                                      {'compound': float(sentiment[i])}, ml)
+        decisions.append({'BUY': BUY, 'SELL': SELL}.get(label, HOLD))
+    return np.array(decisions, dtype=np.int8)
+
+
+def check_parity(df_with_indicators, sentiment=0.0, ml_prediction=None):
+    """
+    Compares the vectorized decisions with a row-by-row replay of make_trading_decision.
+
+    Returns the index labels of rows where they disagree (empty when in parity).
+    """
+    fast = decisions_from_frame(df_with_indicators, sentiment, ml_prediction)
+    slow = replay_decisions(df_with_indicators, sentiment, ml_prediction)
+    mismatches = df_with_indicators.index[fast != slow]
+    if len(mismatches):
+        logger.warning(f"Backtest parity check found {len(mismatches)} mismatching rows")
+    else:
+        logger.info(f"Backtest parity check passed on {len(df_with_indicators)} rows")
+    return mismatches
@@ -0,0 +1,435 @@
+# trading_assistant/bar_cache.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import increment
+from trading_assistant.config import BAR_CACHE_DIR, BAR_CACHE_MAX_BYTES
+
+logger = get_logger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+MANIFEST_FILE = "manifest.json"
+# Cache hits update a partition's last access in memory; it is written out at most this often.
+TOUCH_INTERVAL = 300
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process manifest lock
+    fcntl = None
+
+
+def _to_timestamp(value):
+    """Converts a date-like value to a tz-naive, midnight-normalized Timestamp."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.normalize()
+
+
+def normalize_ohlcv(df, ticker=None):
+    """
+    Flattens a yfinance frame to plain OHLCV columns with a sorted, tz-naive DatetimeIndex.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    if isinstance(df.columns, pd.MultiIndex):
+        levels = range(df.columns.nlevels)
+        price_level = next((i for i in levels if 'Close' in df.columns.get_level_values(i)), 0)
+        if df.columns.nlevels == 2:
+            ticker_level = 1 - price_level
+            tickers = df.columns.get_level_values(ticker_level).unique()
+            df = df.xs(ticker if ticker in tickers else tickers[0], axis=1, level=ticker_level)
+        else:
+            df = df.copy()
+            df.columns = df.columns.get_level_values(price_level)
+
+    columns = [col for col in OHLCV_COLUMNS if col in df.columns]
+    df = df[columns]
+    df.index = pd.DatetimeIndex(df.index)
+    if df.index.tz is not None:
+        df.index = df.index.tz_convert(None)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    df.index.name = 'Date'
+    return df
+
+
+def _merge_ranges(ranges):
+    """Merges overlapping or touching [start, end) ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(ranges, start, end):
+    """Returns the parts of [start, end) not covered by the given ranges."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in ranges:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class FixtureSource:
+    """
+    Offline bar source that serves slices of local CSV or Parquet files.
+
+    Files are looked up as ``<TICKER>_<interval>.<ext>`` and then ``<TICKER>.<ext>``.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}
+
+    def _load(self, ticker, interval):
+        key = (ticker, interval)
+        if key not in self._frames:
+            frame = None
+            for name in (f"{ticker}_{interval}", ticker):
+                for ext in ('parquet', 'csv'):
+                    path = os.path.join(self.directory, f"{name}.{ext}")
+                    if os.path.exists(path):
+                        if ext == 'parquet':
+                            frame = pd.read_parquet(path)
+                        else:
+                            frame = pd.read_csv(path, index_col=0, parse_dates=True)
+                        break
+                if frame is not None:
+                    break
+            self._frames[key] = normalize_ohlcv(frame, ticker) if frame is not None else None
+        return self._frames[key]
+
+    def __call__(self, ticker, start, end, interval='1d'):
+        frame = self._load(ticker, interval)
+        if frame is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return frame.loc[(frame.index >= start) & (frame.index < end)]
+
+
+class BarCache:
+    """
+    Persistent on-disk OHLCV store with one Parquet partition per ticker/interval.
+
+    Each partition records the date ranges it has already covered, so a request only
+    downloads the gaps it is missing. Total size on disk is bounded by ``max_bytes``
+    and the least recently used partitions are evicted first.
+    """
+
+    def __init__(self, root=BAR_CACHE_DIR, max_bytes=BAR_CACHE_MAX_BYTES, fetcher=None, available_start=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        # available_start(start, interval): the earliest start the fetcher can serve.
+        self.available_start = available_start
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._manifest_mtime = None
+        # Entries this process wrote, removed or read since its last save.
+        self._dirty = set()
+        self._removed = set()
+        self._accessed = {}
+        self._saved_access = {}
+
+    # -- manifest -------------------------------------------------------------
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    @contextmanager
+    def _file_lock(self):
+        """Serializes manifest updates across processes sharing the cache directory."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, MANIFEST_FILE + ".lock"), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest_file(self):
+        path = self._manifest_path()
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path) as f:
+                return json.load(f), mtime
+        except FileNotFoundError:
+            return {}, None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Bar cache manifest unreadable, starting empty: {e}")
+            return {}, None
+
+    def _apply_changes(self, manifest, ours):
+        """Applies this process's unsaved changes from ``ours`` onto ``manifest``."""
+        for key in self._dirty:
+            if key in ours:
+                manifest[key] = ours[key]
+        for key in self._removed:
+            manifest.pop(key, None)
+        for key, accessed in self._accessed.items():
+            if key in manifest:
+                manifest[key]['last_access'] = max(manifest[key].get('last_access', 0), accessed)
+        return manifest
+
+    def _load_manifest(self):
+        """
+        The manifest as seen by this process: the file, re-read when another process has
+        rewritten it, with this process's unsaved changes on top.
+        """
+        try:
+            mtime = os.path.getmtime(self._manifest_path())
+        except OSError:
+            mtime = None
+        if self._manifest is None or mtime != self._manifest_mtime:
+            manifest, self._manifest_mtime = self._read_manifest_file()
+            for key, entry in manifest.items():
+                self._saved_access[key] = max(self._saved_access.get(key, 0), entry.get('last_access', 0))
+            self._manifest = self._apply_changes(manifest, self._manifest or {})
+        return self._manifest
+
+    def _save_manifest(self):
+        """Merges this process's changed entries into the manifest file under the file lock."""
+        with self._file_lock():
+            manifest = self._apply_changes(self._read_manifest_file()[0], self._manifest or {})
+            tmp_path = f"{self._manifest_path()}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self._manifest_path())
+            self._manifest = manifest
+            self._manifest_mtime = os.path.getmtime(self._manifest_path())
+        self._saved_access.update({key: entry.get('last_access', 0) for key, entry in manifest.items()})
+        self._dirty.clear()
+        self._removed.clear()
+        self._accessed.clear()
+
+    @staticmethod
+    def _key(ticker, interval):
+        return f"{interval}/{ticker}"
+
+    def _partition_path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker}.parquet")
+
+    # -- reads and writes -----------------------------------------------------
+
+    def _read_partition(self, ticker, interval):
+        path = self._partition_path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable bar cache partition {path}: {e}")
+            self.invalidate(ticker, interval)
+            return None
+
+    def _write_partition(self, ticker, interval, frame, ranges):
+        path = self._partition_path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+        key = self._key(ticker, interval)
+        self._load_manifest()[key] = {
+            'ranges': [[str(s.date()), str(e.date())] for s, e in ranges],
+            'bytes': os.path.getsize(path),
+            'last_access': time.time(),
+        }
+        self._dirty.add(key)
+        self._removed.discard(key)
+        self._evict(keep=key)
+        self._save_manifest()
+
+    def _ranges(self, ticker, interval):
+        entry = self._load_manifest().get(self._key(ticker, interval))
+        if not entry:
+            return []
+        return [[pd.Timestamp(s), pd.Timestamp(e)] for s, e in entry['ranges']]
+
+    def _touch(self, ticker, interval):
+        key = self._key(ticker, interval)
+        entry = self._load_manifest().get(key)
+        if entry:
+            entry['last_access'] = self._accessed[key] = time.time()
+            # Eviction order only needs coarse access times, so hits rarely write the manifest.
+            if entry['last_access'] - self._saved_access.get(key, 0) >= TOUCH_INTERVAL:
+                self._save_manifest()
+
+    def missing_ranges(self, ticker, start, end, interval='1d'):
+        """Returns the (start, end) date gaps of [start, end) not yet cached."""
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        with self._lock:
+            return _missing_ranges(self._ranges(ticker, interval), start, end)
+
+    def put(self, ticker, frame, start, end, interval='1d'):
+        """
+        Merges bars covering [start, end) into the partition for ticker/interval.
+        """
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        with self._lock:
+            existing = self._read_partition(ticker, interval)
+            frame = normalize_ohlcv(frame, ticker)
+            if existing is not None and not existing.empty:
+                frame = pd.concat([existing, frame]) if not frame.empty else existing
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+            ranges = _merge_ranges(self._ranges(ticker, interval) + [[start, end]])
+            self._write_partition(ticker, interval, frame, ranges)
+
+    def get(self, ticker, start, end, interval='1d'):
+        """
+        Returns bars for [start, end), downloading only the date gaps not yet cached.
+
+        Returns None when nothing is available for the requested range.
+        """
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        if end <= start:
+            logger.warning(f"Empty date range requested for {ticker}: {start} to {end}")
+            return None
+
+        with self._lock:
+            ranges = self._ranges(ticker, interval)
+            gaps = _missing_ranges(ranges, start, end)
+            frame = self._read_partition(ticker, interval) if ranges else None
+
+            if gaps and self.fetcher is not None:
+                # Bars for the current session are still forming, so never mark today as covered.
+                today = pd.Timestamp.now().normalize()
+                downloaded = []
+                for gap_start, gap_end in gaps:
+                    if self.available_start is not None:
+                        # Only the part of the gap the source still serves is downloaded and covered.
+                        gap_start = max(gap_start, _to_timestamp(self.available_start(gap_start, interval)))
+                        if gap_start >= gap_end:
+                            continue
+                    logger.info("Bar cache miss for %s (%s): %s to %s", ticker, interval, gap_start.date(),
+                                gap_end.date(), extra={'ticker': ticker})
+                    increment('bar_cache_requests', result='miss')
+                    try:
+                        bars = self.fetcher(ticker, gap_start, gap_end, interval)
+                    except Exception as e:
+                        logger.error(f"Error downloading {ticker} bars for {gap_start.date()} to {gap_end.date()}: {e}")
+                        continue
+                    bars = normalize_ohlcv(bars, ticker).dropna(how='all')
+                    # yfinance returns an empty frame on errors and rate limits, so a range only
+                    # counts as covered when bars came back for it.
+                    if bars.empty:
+                        continue
+                    downloaded.append(bars)
+                    covered_end = min(gap_end, today)
+                    if covered_end > gap_start:
+                        ranges.append([gap_start, covered_end])
+
+                if downloaded:
+                    parts = ([frame] if frame is not None and not frame.empty else []) + downloaded
+                    frame = pd.concat(parts)
+                    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                    self._write_partition(ticker, interval, frame, _merge_ranges(ranges))
+            elif frame is not None:
+                logger.info("Bar cache hit for %s (%s)", ticker, interval, extra={'ticker': ticker})
+                increment('bar_cache_requests', result='hit')
+                self._touch(ticker, interval)
+
+        if frame is None or frame.empty:
+            return None
+        result = frame.loc[(frame.index >= start) & (frame.index < end)]
+        return result if not result.empty else None
+
+    def load_fixtures(self, directory, interval='1d'):
+        """
+        Seeds the store from local CSV or Parquet files named after their tickers.
+        """
+        loaded = []
+        for name in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(name)
+            if ext not in ('.csv', '.parquet'):
+                continue
+            if ext == '.parquet':
+                frame = pd.read_parquet(os.path.join(directory, name))
+            else:
+                frame = pd.read_csv(os.path.join(directory, name), index_col=0, parse_dates=True)
+            frame = normalize_ohlcv(frame, stem)
+            if frame.empty:
+                continue
+            end = frame.index[-1].normalize() + pd.Timedelta(days=1)
+            self.put(stem.upper(), frame, frame.index[0], end, interval)
+            loaded.append(stem.upper())
+        logger.info(f"Loaded {len(loaded)} fixture partitions into the bar cache")
+        return loaded
+
+    # -- eviction -------------------------------------------------------------
+
+    def size_bytes(self):
+        """Returns the total size of all cached partitions."""
+        return sum(entry.get('bytes', 0) for entry in self._load_manifest().values())
+
+    def _evict(self, keep=None):
+        manifest = self._load_manifest()
+        total = sum(entry.get('bytes', 0) for entry in manifest.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(manifest, key=lambda k: manifest[k].get('last_access', 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            interval, ticker = key.split('/', 1)
+            total -= manifest[key].get('bytes', 0)
+            self._remove(ticker, interval)
+            logger.info(f"Evicted {key} from the bar cache")
+
+    def _remove(self, ticker, interval):
+        path = self._partition_path(ticker, interval)
+        if os.path.exists(path):
+            os.remove(path)
+        key = self._key(ticker, interval)
+        self._load_manifest().pop(key, None)
+        self._dirty.discard(key)
+        self._removed.add(key)
+
+    def invalidate(self, ticker, interval='1d'):
+        """Drops the cached partition for ticker/interval."""
+        with self._lock:
+            self._remove(ticker, interval)
+            self._save_manifest()
+
+    def clear(self):
+        """Drops every cached partition."""
+        with self._lock:
+            for key in list(self._load_manifest()):
+                interval, ticker = key.split('/', 1)
+                self._remove(ticker, interval)
+            self._save_manifest()
+
+
+_default_cache = None
+
+
+def get_bar_cache(fetcher=None, available_start=None):
+    """
+    Returns the process-wide bar cache, creating it with the given fetcher on first use.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BarCache(fetcher=fetcher, available_start=available_start)
+    elif _default_cache.fetcher is None:
+        _default_cache.fetcher = fetcher
+        _default_cache.available_start = available_start
+    return _default_cache
@@ -0,0 +1,125 @@
+# trading_assistant/bar_pyramid.py
+
+import numpy as np
+import pandas as pd
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.bar_cache import OHLCV_COLUMNS
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Bar sizes by yfinance interval name, finest first.
+INTERVAL_FREQS = {
+    '1m': '1min',
+    '2m': '2min',
+    '5m': '5min',
+    '15m': '15min',
+    '30m': '30min',
+    '1h': '1h',
+    '1d': '1D',
+}
+DEFAULT_LEVELS = ('1m', '5m', '1h', '1d')
+
+
+def resample_ohlcv(df, interval):
+    """
+    Aggregates sorted OHLCV bars into ``interval`` bars (first Open, max High, min Low, last
+    Close, summed Volume) in one pass. Buckets without bars are omitted. Daily buckets follow
+    the index's (UTC) calendar day.
+    """
+    df = flat_ohlcv(df)
+    if df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name=df.index.name))
+    keys = pd.DatetimeIndex(df.index).floor(INTERVAL_FREQS[interval])
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    lasts = np.append(starts[1:] - 1, len(df) - 1)
+    resampled = pd.DataFrame({
+        'Open': df['Open'].to_numpy(dtype=float)[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy(dtype=float)[lasts],
+        'Volume': np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype=float)), starts),
+    }, index=keys[starts])
+    resampled.index.name = df.index.name
+    return resampled
+
+
+def _levels_from(base, levels):
+    order = list(INTERVAL_FREQS)
+    if base not in INTERVAL_FREQS:
+        raise ValueError(f"Unsupported base interval: {base}")
+    coarser = [level for level in levels if order.index(level) > order.index(base)]
+    return [base] + sorted(coarser, key=order.index)
+
+
+class BarPyramid:
+    """
+    The same bars precomputed at several resolutions (e.g. 1m -> 5m -> 1h -> 1d), each level
+    aggregated from the one below it, so any timeframe is served without re-aggregating.
+
+    ``select`` picks the finest level that fits a point budget for a date range, which keeps
+    charts of years of minute bars responsive.
+    """
+
+    def __init__(self, bars, base='1m', levels=DEFAULT_LEVELS):
+        self.base = base
+        self.levels = {}
+        names = _levels_from(base, levels)
+        bars = flat_ohlcv(bars)
+        self.levels[base] = bars[[c for c in OHLCV_COLUMNS if c in bars.columns]].sort_index()
+        for finer, coarser in zip(names, names[1:]):
+            self.levels[coarser] = resample_ohlcv(self.levels[finer], coarser)
+        logger.info(f"Built bar pyramid {' -> '.join(f'{k}:{len(v)}' for k, v in self.levels.items())}")
+
+    @property
+    def intervals(self):
+        return list(self.levels)
+
+    def __getitem__(self, interval):
+        return self.levels[interval]
+
+    @property
+    def nbytes(self):
+        return sum(int(level.memory_usage(index=True).sum()) for level in self.levels.values())
+
+    def _bounds(self, frame, start, end):
+        index = frame.index
+        lo = index.searchsorted(pd.Timestamp(start)) if start is not None else 0
+        hi = index.searchsorted(pd.Timestamp(end)) if end is not None else len(index)
+        return lo, hi
+
+    def select(self, start=None, end=None, max_bars=None, interval=None):
+        """
+        Bars in [start, end) at ``interval``, or at the finest level with at most ``max_bars``
+        bars in the range (the coarsest level when none fits). Returns ``(interval, frame)``.
+        """
+        if interval is None:
+            interval = self.intervals[-1]
+            for name in self.intervals:
+                lo, hi = self._bounds(self.levels[name], start, end)
+                if max_bars is None or hi - lo <= max_bars:
+                    interval = name
+                    break
+        frame = self.levels[interval]
+        lo, hi = self._bounds(frame, start, end)
+        return interval, frame.iloc[lo:hi]
+
+    def append(self, bars):
+        """
+        Merges new base-interval bars (e.g. from streaming) and re-aggregates only the
+        buckets they touch at each coarser level.
+        """
+        bars = flat_ohlcv(bars)
+        if bars.empty:
+            return
+        base = self.levels[self.base]
+        merged = pd.concat([base, bars[base.columns]])
+        self.levels[self.base] = merged[~merged.index.duplicated(keep='last')].sort_index()
+        changed_from = bars.index.min()
+        names = self.intervals
+        for finer, coarser in zip(names, names[1:]):
+            changed_from = changed_from.floor(INTERVAL_FREQS[coarser])
+            source = self.levels[finer]
+            refreshed = resample_ohlcv(source.iloc[source.index.searchsorted(changed_from):], coarser)
+            kept = self.levels[coarser]
+            self.levels[coarser] = pd.concat([kept.iloc[:kept.index.searchsorted(changed_from)], refreshed])
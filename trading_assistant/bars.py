@@ -0,0 +1,112 @@
+# trading_assistant/bars.py
+
+import numpy as np
+import pandas as pd
+from trading_assistant.bar_cache import OHLCV_COLUMNS
+
+
+def flat_ohlcv(df):
+    """
+    Returns ``df`` with yfinance MultiIndex columns flattened to their price level.
+
+    The input is never modified; flat frames are returned as they are, and flattened ones
+    share their data with the input.
+    """
+    if not isinstance(df.columns, pd.MultiIndex):
+        return df
+    levels = range(df.columns.nlevels)
+    price_level = next((i for i in levels if 'Close' in df.columns.get_level_values(i)), 0)
+    return df.set_axis(df.columns.get_level_values(price_level), axis=1)
+
+
+class Bars:
+    """
+    Compact OHLCV bars: one contiguous, read-only ``(5, n)`` array plus a DatetimeIndex.
+
+    Each column is a contiguous row of the block, so ``bars.close`` and ``bars.tail(n)`` are
+    views and never copy.
+    ``dtype=np.float32`` halves the footprint of large many-ticker panels.
+    """
+
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index, values):
+        # A view, so marking it read-only never touches the caller's array.
+        values = np.asarray(values).view()
+        if values.ndim != 2 or values.shape[0] != len(OHLCV_COLUMNS) or values.shape[1] != len(index):
+            raise ValueError(f"Expected a ({len(OHLCV_COLUMNS)}, {len(index)}) array, got {values.shape}")
+        values.flags.writeable = False
+        self.index = pd.DatetimeIndex(index)
+        self.values = values
+
+    @classmethod
+    def from_frame(cls, df, dtype=np.float64):
+        """Packs an OHLCV DataFrame (flat or yfinance MultiIndex columns) into a single block."""
+        df = flat_ohlcv(df)
+        values = np.empty((len(OHLCV_COLUMNS), len(df)), dtype=dtype)
+        for row, column in enumerate(OHLCV_COLUMNS):
+            values[row] = df[column].to_numpy()
+        return cls(df.index, values)
+
+    @classmethod
+    def from_arrays(cls, index, open, high, low, close, volume, dtype=np.float64):
+        values = np.empty((len(OHLCV_COLUMNS), len(index)), dtype=dtype)
+        for row, column in enumerate((open, high, low, close, volume)):
+            values[row] = column
+        return cls(index, values)
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def __repr__(self):
+        span = f"{self.index[0].date()} to {self.index[-1].date()}" if len(self) else "empty"
+        return f"Bars({len(self)} bars, {span}, {self.dtype})"
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        """Bytes held by the price block and the index."""
+        return self.values.nbytes + self.index.nbytes
+
+    @property
+    def open(self):
+        return self.values[0]
+
+    @property
+    def high(self):
+        return self.values[1]
+
+    @property
+    def low(self):
+        return self.values[2]
+
+    @property
+    def close(self):
+        return self.values[3]
+
+    @property
+    def volume(self):
+        return self.values[4]
+
+    def __getitem__(self, column):
+        """Column access by OHLCV name, so Bars can stand in for a frame's ``df['Close']``."""
+        return self.values[OHLCV_COLUMNS.index(column)]
+
+    def tail(self, n):
+        """The last ``n`` bars, as views of this block."""
+        start = max(len(self) - n, 0)
+        return Bars(self.index[start:], self.values[:, start:])
+
+    def astype(self, dtype):
+        """Returns the bars in ``dtype``, or self when they already are."""
+        if self.dtype == np.dtype(dtype):
+            return self
+        return Bars(self.index, self.values.astype(dtype))
+
+    def to_frame(self):
+        """An OHLCV DataFrame whose columns are read-only views of the block."""
+        return pd.DataFrame({column: self.values[row] for row, column in enumerate(OHLCV_COLUMNS)},
+                            index=self.index, copy=False)
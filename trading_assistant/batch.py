@@ -0,0 +1,207 @@
+# trading_assistant/batch.py
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from trading_assistant.data_handler import fetch_historical_data_bulk
+from trading_assistant.analysis import calculate_technical_indicators, determine_market_personality
+from trading_assistant.trading_logic import make_trading_decision
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import profile_run
+
+logger = get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 25
+NEUTRAL_SENTIMENT = {'compound': 0}
+RESULT_COLUMNS = ['ticker', 'status', 'as_of', 'close', 'market_personality', 'ml_prediction',
+                  'decision', 'RSI_14', 'MACD_12_26_9', 'SMA_20', 'SMA_50', 'error']
+
+_worker_model = None
+
+
+def _load_worker_model():
+    """Loads the ML model once per worker process."""
+    global _worker_model
+    if _worker_model is None:
+        from trading_assistant.ml_model import load_ml_model
+        _worker_model = load_ml_model() or False
+    return _worker_model or None
+
+
+def analyze_ticker(ticker, historical_data, sentiment_scores=None, use_ml=False):
+    """
+    Runs the indicator, personality and decision steps for one ticker.
+
+    Uses the same analysis functions as the Streamlit app so results are identical.
+    Errors are captured in the returned record instead of being raised.
+    """
+    result = {col: None for col in RESULT_COLUMNS}
+    result['ticker'] = ticker
+    try:
+        if historical_data is None or historical_data.empty:
+            raise ValueError("no historical data")
+
+        df_with_indicators = calculate_technical_indicators(historical_data)
+        if df_with_indicators.empty:
+            raise ValueError("failed to calculate technical indicators")
+
+        market_personality = determine_market_personality(df_with_indicators)
+
+        ml_prediction = None
+        if use_ml:
+            model = _load_worker_model()
+            if model is not None:
+                from trading_assistant.ml_model import get_stored_prediction
+                ml_prediction = get_stored_prediction(model, ticker, historical_data)
+
+        decision = make_trading_decision(df_with_indicators, sentiment_scores or NEUTRAL_SENTIMENT, ml_prediction)
+
+        latest = df_with_indicators.iloc[-1]
+        result.update({
+            'status': 'ok',
+            'as_of': str(df_with_indicators.index[-1].date()),
+            'close': float(latest['Close']),
+            'market_personality': market_personality,
+            'ml_prediction': ml_prediction,
+            'decision': decision,
+        })
+        for col in ('RSI_14', 'MACD_12_26_9', 'SMA_20', 'SMA_50'):
+            if col in df_with_indicators.columns and pd.notna(latest[col]):
+                result[col] = float(latest[col])
+    except Exception as e:
+        logger.error(f"Batch analysis failed for {ticker}: {e}")
+        result['status'] = 'error'
+        result['error'] = str(e)
+    return result
+
+
+def _analyze_chunk(items, sentiment, use_ml):
+    """Worker entry point: analyzes a list of (ticker, DataFrame) pairs."""
+    return [analyze_ticker(ticker, bars, sentiment.get(ticker), use_ml) for ticker, bars in items]
+
+
+def _error_result(ticker, message):
+    result = {col: None for col in RESULT_COLUMNS}
+    result.update({'ticker': ticker, 'status': 'error', 'error': message})
+    return result
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_batch(tickers, start_date, end_date, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+              sentiment=None, use_ml=False):
+    """
+    Analyzes many tickers across a process pool, yielding per-ticker results as they finish.
+
+    Bars are fetched in bulk one chunk at a time, so downloading the next chunk overlaps
+    with analysis of the previous ones. A failing ticker (or a crashed chunk) produces an
+    ``error`` record and never stops the batch.
+    """
+    tickers = [t.strip().upper() for t in tickers if t and t.strip()]
+    sentiment = sentiment or {}
+    logger.info(f"Starting batch analysis of {len(tickers)} tickers with chunk size {chunk_size}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for chunk in _chunks(tickers, max(1, chunk_size)):
+            bars = fetch_historical_data_bulk(chunk, start_date, end_date)
+            items = [(ticker, bars.get(ticker)) for ticker in chunk]
+            chunk_sentiment = {t: sentiment[t] for t in chunk if t in sentiment}
+            futures[executor.submit(_analyze_chunk, items, chunk_sentiment, use_ml)] = chunk
+
+            for future in [f for f in futures if f.done()]:
+                yield from _collect(future, futures.pop(future))
+
+        for future in as_completed(list(futures)):
+            yield from _collect(future, futures.pop(future))
+
+
+def _collect(future, chunk):
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"Batch chunk {chunk[0]}..{chunk[-1]} failed: {e}")
+        return [_error_result(ticker, f"worker failure: {e}") for ticker in chunk]
+
+
+def write_jsonl(results, path):
+    """Streams result records to a JSONL file, flushing each line as it arrives."""
+    count = 0
+    with open(path, 'w') as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            count += 1
+    return count
+
+
+def write_parquet(results, path, row_group_size=DEFAULT_CHUNK_SIZE):
+    """Streams result records to a Parquet file, one row group per batch of records."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('ticker', pa.string()), ('status', pa.string()), ('as_of', pa.string()),
+        ('close', pa.float64()), ('market_personality', pa.string()), ('ml_prediction', pa.string()),
+        ('decision', pa.string()), ('RSI_14', pa.float64()), ('MACD_12_26_9', pa.float64()),
+        ('SMA_20', pa.float64()), ('SMA_50', pa.float64()), ('error', pa.string()),
+    ])
+    count = 0
+    buffer = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for result in results:
+            buffer.append(result)
+            count += 1
+            if len(buffer) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+                buffer = []
+        if buffer:
+            writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+    return count
+
+
+def _read_tickers(args):
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            tickers.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return tickers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch multi-ticker analysis.")
+    parser.add_argument('tickers', nargs='*', help="Tickers to analyze.")
+    parser.add_argument('--tickers-file', help="File with one ticker per line.")
+    parser.add_argument('--start', default=str((pd.Timestamp.today() - pd.DateOffset(years=1)).date()))
+    parser.add_argument('--end', default=str(pd.Timestamp.today().date()))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', required=True, help="Output path.")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--use-ml', action='store_true', help="Include the saved ML model prediction.")
+    parser.add_argument('--profile', action='store_true', help="Profile the run (see PROFILE_DIR).")
+    args = parser.parse_args(argv)
+
+    tickers = _read_tickers(args)
+    if not tickers:
+        parser.error("no tickers given")
+
+    with profile_run('batch', enabled=args.profile or None):
+        results = run_batch(tickers, args.start, args.end, workers=args.workers,
+                            chunk_size=args.chunk_size, use_ml=args.use_ml)
+        if args.format == 'parquet':
+            count = write_parquet(results, args.output)
+        else:
+            count = write_jsonl(results, args.output)
+    logger.info(f"Batch analysis wrote {count} results")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
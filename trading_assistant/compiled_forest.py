@@ -0,0 +1,275 @@
+# trading_assistant/compiled_forest.py
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+PRECISIONS = ('float64', 'float32', 'quantized')
+LEAF = -1  # sklearn's TREE_LEAF
+QUANTIZED_LEAF = np.iinfo(np.uint16).max
+# Descent steps between dropping the paths that reached a leaf.
+COMPACT_EVERY = 8
+
+
+def _floor_float32(values):
+    """
+    Largest float32 <= each value. sklearn compares float32 inputs against float64
+    thresholds, and for a float32 x, ``x <= t`` exactly when ``x <= floor32(t)``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompiledForest:
+    """
+    A fitted sklearn tree ensemble flattened into contiguous NumPy node arrays.
+
+    All trees share the ``feature``, ``threshold``, ``child`` (left child) and ``value``
+    (class probabilities) arrays. Nodes are numbered breadth-first across all trees: tree
+    i's root is node i, and siblings are adjacent, so the right child is always
+    ``child + 1``. Leaves point back at themselves and never branch right. A batch descends
+    every tree at once with a few gathers per step, and drops paths as they reach their
+    leaves.
+
+    Inputs are compared as float32 against thresholds rounded down to float32, which takes
+    exactly sklearn's branches. ``precision`` sets how values are stored. ``float64`` keeps
+    sklearn's probabilities bit for bit, and ``float32`` halves the leaf values.
+    ``quantized`` also stores thresholds as uint16 indices into per-feature cut tables, and
+    bins each input row once.
+    """
+
+    __slots__ = ('feature', 'threshold', 'child', 'value', 'classes', 'n_trees', 'max_depth', 'n_features',
+                 'precision', 'cuts', 'cut_offsets')
+
+    def __init__(self, feature, threshold, child, value, classes, n_trees, max_depth, n_features,
+                 precision='float32', cuts=None, cut_offsets=None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        self.feature = feature
+        self.threshold = threshold
+        self.child = child
+        self.value = value
+        self.classes = classes
+        self.n_trees = int(n_trees)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.precision = precision
+        self.cuts = cuts
+        self.cut_offsets = cut_offsets
+
+    @classmethod
+    def from_sklearn(cls, model, precision='float32'):
+        """Flattens a fitted RandomForestClassifier (or any forest of DecisionTreeClassifiers)."""
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.repeat(np.concatenate([[0], np.cumsum(sizes)[:-1]]), sizes)
+        left = np.concatenate([tree.children_left for tree in trees])
+        right = np.concatenate([tree.children_right for tree in trees])
+        leaf = left == LEAF
+        left = np.where(leaf, 0, left + offsets)
+        right = np.where(leaf, 0, right + offsets)
+
+        # Breadth-first positions: roots first, then each level's children in sibling pairs.
+        position = np.empty(len(leaf), dtype=np.int64)
+        level = np.flatnonzero(offsets == np.arange(len(leaf)))
+        position[level] = np.arange(len(level))
+        next_position = len(level)
+        while len(level):
+            level = level[~leaf[level]]
+            kids = np.column_stack([left[level], right[level]]).ravel()
+            position[kids] = next_position + np.arange(len(kids))
+            next_position += len(kids)
+            level = kids
+        order = np.argsort(position)
+        leaf = leaf[order]
+
+        n_features = model.n_features_in_
+        feature = np.where(leaf, 0, np.concatenate([tree.feature for tree in trees])[order])
+        feature = feature.astype(np.uint8 if n_features <= np.iinfo(np.uint8).max else np.int32)
+        child = np.where(leaf, np.arange(len(order)), position[left[order]]).astype(np.int32)
+        threshold = _floor_float32(np.where(leaf, np.inf, np.concatenate([tree.threshold for tree in trees])[order]))
+        cuts = cut_offsets = None
+        if precision == 'quantized':
+            tables = [np.unique(threshold[~leaf & (feature == f)]) for f in range(n_features)]
+            if max((len(t) for t in tables), default=0) >= QUANTIZED_LEAF:
+                raise ValueError("Too many distinct thresholds per feature for uint16 quantization")
+            cut_offsets = np.concatenate([[0], np.cumsum([len(t) for t in tables])]).astype(np.int64)
+            cuts = np.concatenate(tables).astype(np.float32)
+            codes = np.full(len(threshold), QUANTIZED_LEAF, dtype=np.uint16)
+            for f, table in enumerate(tables):
+                split = ~leaf & (feature == f)
+                codes[split] = np.searchsorted(table, threshold[split])
+            threshold = codes
+
+        # Per-tree class probabilities, normalized like DecisionTreeClassifier.predict_proba.
+        value = np.concatenate([tree.value[:, 0, :] for tree in trees])[order].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        value = value / np.where(totals == 0, 1, totals)
+        if precision != 'float64':
+            value = value.astype(np.float32)
+
+        return cls(feature, threshold, child, value, np.asarray(model.classes_), len(trees),
+                   max(tree.max_depth for tree in trees), n_features, precision, cuts, cut_offsets)
+
+    @property
+    def n_nodes(self):
+        return len(self.child)
+
+    @property
+    def nbytes(self):
+        arrays = (self.feature, self.threshold, self.child, self.value, self.cuts, self.cut_offsets)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def split_thresholds(self, feature):
+        """The float thresholds this forest splits ``feature`` on."""
+        if self.precision == 'quantized':
+            return self.cuts[self.cut_offsets[feature]:self.cut_offsets[feature + 1]]
+        return self.threshold[(self.child != np.arange(self.n_nodes)) & (self.feature == feature)]
+
+    def _prepare(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.precision != 'quantized':
+            return X
+        # A value's code is the number of cuts below it, so x <= cut[k] exactly when code <= k.
+        codes = np.empty(X.shape, dtype=np.uint16)
+        for f in range(self.n_features):
+            codes[:, f] = np.searchsorted(self.cuts[self.cut_offsets[f]:self.cut_offsets[f + 1]], X[:, f])
+        return codes
+
+    def apply(self, X):
+        """The leaf node reached in every tree: an (n_rows, n_trees) array of node indices."""
+        X = self._prepare(X)
+        n_rows = len(X)
+        flat = X.ravel()
+        feature, threshold, child = self.feature, self.threshold, self.child
+        leaves = np.empty(n_rows * self.n_trees, dtype=np.int32)
+        # One entry per (row, tree) path still descending: its slot in leaves, row offset and node.
+        slots = np.arange(n_rows * self.n_trees)
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int32) * X.shape[1], self.n_trees)
+        current = np.tile(np.arange(self.n_trees, dtype=np.int32), n_rows)
+        while len(current):
+            for _ in range(COMPACT_EVERY):
+                current = child.take(current) + (flat.take(row_offsets + feature.take(current)) > threshold.take(current))
+            done = child.take(current) == current
+            if done.any():
+                leaves[slots[done]] = current[done]
+                descending = ~done
+                slots, row_offsets, current = slots[descending], row_offsets[descending], current[descending]
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        """Mean class probabilities over the trees, in ``classes`` order."""
+        return self.value[self.apply(X)].mean(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        """Predicted class labels, like the source model's ``predict``. Rows must not contain NaN."""
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        """
+        Writes the arrays to an uncompressed ``.npz`` file. The file is replaced atomically, so
+        a process loading it concurrently never reads a partial file.
+        """
+        arrays = {'feature': self.feature, 'threshold': self.threshold, 'child': self.child, 'value': self.value,
+                  'classes': self.classes}
+        if self.cuts is not None:
+            arrays.update(cuts=self.cuts, cut_offsets=self.cut_offsets)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, n_trees=self.n_trees, max_depth=self.max_depth, n_features=self.n_features,
+                     precision=self.precision, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(arrays['feature'], arrays['threshold'], arrays['child'], arrays['value'], arrays['classes'],
+                   int(arrays['n_trees']),
+                   int(arrays['max_depth']), int(arrays['n_features']), str(arrays['precision']),
+                   arrays.get('cuts'), arrays.get('cut_offsets'))
+
+
+def probe_rows(forest, n_rows=10000, seed=0):
+    """
+    Random rows spread over each feature's threshold range (with margins), so a parity check
+    exercises branches on both sides of the splits.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.empty((n_rows, forest.n_features))
+    for f in range(forest.n_features):
+        thresholds = forest.split_thresholds(f).astype(np.float64)
+        if len(thresholds) == 0:
+            X[:, f] = rng.normal(size=n_rows)
+            continue
+        lo, hi = thresholds.min(), thresholds.max()
+        margin = (hi - lo) * 0.1 or 1.0
+        X[:, f] = rng.uniform(lo - margin, hi + margin, n_rows)
+        # Land some rows exactly on thresholds, where float rounding would show.
+        on_split = rng.random(n_rows) < 0.2
+        X[on_split, f] = rng.choice(thresholds, on_split.sum())
+    return X
+
+
+def check_parity(model, forest, X):
+    """
+    Compares a compiled forest against its sklearn model on rows ``X``. Returns the number of
+    rows, of differing labels and the largest probability difference.
+    """
+    import warnings
+    X = np.asarray(X, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        expected_labels = model.predict(X)
+        expected_proba = model.predict_proba(X)
+    proba = forest.predict_proba(X)
+    labels = forest.classes[np.argmax(proba, axis=1)]
+    return {
+        'rows': int(len(X)),
+        'label_mismatches': int((labels != expected_labels).sum()),
+        'max_proba_diff': float(np.abs(proba - expected_proba).max()) if len(X) else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a registered forest to compiled node arrays and check parity.")
+    parser.add_argument('--version', help="Registry version (default: latest)")
+    parser.add_argument('--precision', choices=PRECISIONS, default=None,
+                        help="Threshold precision (default: ML_COMPILED_PRECISION)")
+    parser.add_argument('--rows', type=int, default=10000, help="Probe rows for the parity check")
+    args = parser.parse_args(argv)
+
+    from trading_assistant.model_registry import get_model_registry
+    registry = get_model_registry()
+    model, metadata = registry.load(args.version)
+    if model is None or not hasattr(model, 'estimators_'):
+        logger.error("No registered forest model to export.")
+        return 1
+    forest = registry.export_compiled(metadata['version'], args.precision)
+    X = probe_rows(forest, args.rows)
+    parity = check_parity(model, forest, X)
+
+    start = time.perf_counter()
+    for row in X[:1000]:
+        forest.predict(row)
+    per_row = (time.perf_counter() - start) / min(len(X), 1000)
+    print(f"{metadata['version']}: {forest.n_trees} trees, {forest.n_nodes} nodes, {forest.nbytes / 1024:.0f} KiB "
+          f"({forest.precision}); {parity['label_mismatches']}/{parity['rows']} label mismatches, "
+          f"max probability diff {parity['max_proba_diff']:.2e}; {per_row * 1e6:.0f} us per single-row predict")
+    return 0 if parity['label_mismatches'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,3 +9,59 @@ FINNHUB_API_KEY = os.getenv('FINNHUB_API_KEY')
 ALPACA_API_KEY_ID = os.getenv('APCA_API_KEY_ID')
 ALPACA_API_SECRET_KEY = os.getenv('APCA_API_SECRET_KEY')
 ALPACA_API_BASE_URL = os.getenv('APCA_API_BASE_URL', 'https://paper-api.alpaca.markets')
+
+BAR_CACHE_ENABLED = os.getenv('BAR_CACHE_ENABLED', '1') != '0'
+BAR_CACHE_DIR = os.getenv('BAR_CACHE_DIR', 'data/bars')
+BAR_CACHE_MAX_BYTES = int(os.getenv('BAR_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+SENTIMENT_CACHE_PATH = os.getenv('SENTIMENT_CACHE_PATH')
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', '10000'))
+
+FINNHUB_BASE_URL = os.getenv('FINNHUB_BASE_URL', 'https://finnhub.io/api/v1')
+FINNHUB_CALLS_PER_MINUTE = int(os.getenv('FINNHUB_CALLS_PER_MINUTE', '60'))
+
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'models')
+# Serve registered forests as compiled node arrays; precision is float64, float32 or quantized.
+ML_COMPILED_INFERENCE = os.getenv('ML_COMPILED_INFERENCE', '1') != '0'
+ML_COMPILED_PRECISION = os.getenv('ML_COMPILED_PRECISION', 'float32')
+
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', 'data/features')
+
+ORDER_JOURNAL_PATH = os.getenv('ORDER_JOURNAL_PATH', 'data/orders.sqlite')
+
+# Local news store: feeds fetched within NEWS_REFRESH_SECONDS are served without an API call.
+NEWS_STORE_ENABLED = os.getenv('NEWS_STORE_ENABLED', '1') != '0'
+NEWS_STORE_PATH = os.getenv('NEWS_STORE_PATH', 'data/news.sqlite')
+NEWS_REFRESH_SECONDS = int(os.getenv('NEWS_REFRESH_SECONDS', '60'))
+NEWS_LOOKBACK_DAYS = int(os.getenv('NEWS_LOOKBACK_DAYS', '30'))
+
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR')
+
+# Streamlit result caches, in seconds: bars and indicators change daily, news much faster.
+APP_HISTORY_TTL = int(os.getenv('APP_HISTORY_TTL', '3600'))
+APP_NEWS_TTL = int(os.getenv('APP_NEWS_TTL', '300'))
+
+FINNHUB_WS_URL = os.getenv('FINNHUB_WS_URL', 'wss://ws.finnhub.io')
+APP_MAX_CHART_POINTS = int(os.getenv('APP_MAX_CHART_POINTS', '2000'))
+
+# Parameter sweeps: memoized feature matrices and fitted models, and the results table.
+SWEEP_CACHE_DIR = os.getenv('SWEEP_CACHE_DIR', 'data/sweep_cache')
+SWEEP_RESULTS_PATH = os.getenv('SWEEP_RESULTS_PATH', 'data/sweeps.sqlite')
+
+# Logging: records are written by a background thread as JSONL (LOG_JSON=0 for text) to a
+# rotating file in LOG_DIR, bounded at LOG_MAX_BYTES times (LOG_BACKUP_COUNT + 1).
+# LOG_LEVELS sets per-module levels, e.g. "trading_assistant.analysis=WARNING". Each call site
+# may log LOG_RATE_LIMIT INFO/DEBUG records per second after a burst of LOG_RATE_BURST (0 disables).
+# Drops not yet reported by a later record are summarised every LOG_SUPPRESSED_INTERVAL seconds.
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_JSON = os.getenv('LOG_JSON', '1') != '0'
+LOG_STDOUT = os.getenv('LOG_STDOUT', '1') != '0'
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_RATE_LIMIT = float(os.getenv('LOG_RATE_LIMIT', '20'))
+LOG_RATE_BURST = int(os.getenv('LOG_RATE_BURST', '100'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_SUPPRESSED_INTERVAL = float(os.getenv('LOG_SUPPRESSED_INTERVAL', '10'))
@@ -1,18 +1,89 @@
 # trading_assistant/data_handler.py
 
-import yfinance as yf
-import finnhub
 import pandas as pd
 from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import timed
+from trading_assistant.bar_cache import get_bar_cache, normalize_ohlcv
+from trading_assistant.bar_pyramid import BarPyramid, DEFAULT_LEVELS
+from trading_assistant.news_store import get_news_store
+from trading_assistant.config import BAR_CACHE_ENABLED, NEWS_STORE_ENABLED, NEWS_LOOKBACK_DAYS
 from datetime import datetime, timedelta
 
 logger = get_logger(__name__)
 
-def fetch_historical_data(ticker, start_date, end_date):
-    """Fetches historical stock data using yfinance."""
+# Longest span yfinance serves per intraday request, in days.
+INTRADAY_MAX_DAYS = {'1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '1h': 730}
+# How far back yfinance keeps intraday bars, in days.
+INTRADAY_RETENTION_DAYS = {'1m': 30, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '1h': 730}
+
+def _available_start(start_date, interval='1d'):
+    """The start yfinance can serve for ``interval``: intraday starts are clamped to its retention window."""
+    start = pd.Timestamp(start_date)
+    retention = INTRADAY_RETENTION_DAYS.get(interval)
+    if retention is None:
+        return start
+    # A day short of the limit: yfinance rejects starts exactly at the boundary.
+    earliest = pd.Timestamp.now(tz=start.tz).normalize() - pd.Timedelta(days=retention - 1)
+    if start < earliest:
+        logger.info(f"yfinance keeps {retention} days of {interval} bars; starting at {earliest.date()} "
+                    f"instead of {start.date()}")
+        return earliest
+    return start
+
+def _download(tickers, start_date, end_date, interval='1d', **kwargs):
+    """
+    yf.download, split into spans yfinance accepts for intraday intervals. Intraday starts
+    are clamped to the interval's retention window (see _available_start), since older
+    chunks can only fail.
+    """
+    import yfinance as yf
+    max_days = INTRADAY_MAX_DAYS.get(interval)
+    start, end = _available_start(start_date, interval), pd.Timestamp(end_date)
+    if start >= end:
+        return pd.DataFrame()
+    if max_days is None or end - start <= pd.Timedelta(days=max_days):
+        return yf.download(tickers, start=start, end=end, interval=interval, progress=False, **kwargs)
+    parts = []
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(end, chunk_start + pd.Timedelta(days=max_days))
+        part = yf.download(tickers, start=chunk_start, end=chunk_end, interval=interval, progress=False, **kwargs)
+        if part is not None and not part.empty:
+            parts.append(part)
+        chunk_start = chunk_end
+    if not parts:
+        return pd.DataFrame()
+    data = pd.concat(parts)
+    return data[~data.index.duplicated(keep='last')]
+
+def _download_bars(ticker, start_date, end_date, interval='1d'):
+    """
+    Downloads raw bars from yfinance. Errors and rate limits usually come back as an empty
+    frame rather than an exception, so an empty result is not proof that no bars exist.
+    """
+    return _download(ticker, start_date, end_date, interval)
+
+@timed('fetch_bars')
+def fetch_historical_data(ticker, start_date, end_date, cache=None, interval='1d'):
+    """
+    Fetches historical stock data, serving from the local bar cache when possible.
+
+    ``interval`` is a yfinance interval ('1m', '5m', '1h', '1d', ...); intraday ranges are
+    downloaded in chunks yfinance accepts, with starts clamped to the recent history yfinance keeps.
+    Only the date ranges missing from the cache are downloaded through yfinance.
+    Pass ``cache=False`` to bypass the cache entirely.
+    """
+    if cache is None and BAR_CACHE_ENABLED:
+        cache = get_bar_cache(fetcher=_download_bars, available_start=_available_start)
     try:
-        logger.info(f"Fetching historical data for {ticker} from {start_date} to {end_date}")
-        data = yf.download(ticker, start=start_date, end=end_date)
+        logger.info("Fetching %s historical data for %s from %s to %s", interval, ticker, start_date, end_date,
+                    extra={'ticker': ticker})
+        if cache:
+            data = cache.get(ticker, start_date, end_date, interval)
+            if data is None:
+                logger.warning(f"No historical data found for {ticker}")
+            return data
+        data = _download(ticker, start_date, end_date, interval)
         if data.empty:
             logger.warning(f"No historical data found for {ticker}")
             return None
@@ -21,12 +92,69 @@ def fetch_historical_data(ticker, start_date, end_date):
         logger.error(f"Error fetching historical data for {ticker}: {e}")
         return None
 
+@timed('fetch_bars_bulk')
+def fetch_historical_data_bulk(tickers, start_date, end_date, cache=None, interval='1d'):
+    """
+    Fetches historical data for many tickers with a single yfinance download.
+
+    Tickers already fully cached are served locally; the rest are downloaded together
+    and written back to the cache. Returns a dict of ticker to DataFrame (or None).
+    """
+    if cache is None and BAR_CACHE_ENABLED:
+        cache = get_bar_cache(fetcher=_download_bars, available_start=_available_start)
+    tickers = list(dict.fromkeys(tickers))
+    # Days before the source's retention window can never be filled, so they do not count as missing.
+    available_start = _available_start(start_date, interval)
+    missing = [t for t in tickers if cache.missing_ranges(t, available_start, end_date, interval)] if cache else tickers
+
+    downloaded = {}
+    if missing:
+        try:
+            logger.info(f"Bulk fetching historical data for {len(missing)} tickers from {start_date} to {end_date}")
+            raw = _download(missing, start_date, end_date, interval, group_by='ticker', threads=True)
+            available = set(raw.columns.get_level_values(0)) if isinstance(raw.columns, pd.MultiIndex) else set()
+            for ticker in missing:
+                if len(missing) > 1 and ticker not in available:
+                    continue
+                bars = normalize_ohlcv(raw, ticker).dropna(how='all')
+                downloaded[ticker] = bars
+                covered_end = min(pd.Timestamp(end_date), pd.Timestamp.now().normalize())
+                # An empty slice may be a failed download, so it never marks the range covered.
+                if cache and not bars.empty and covered_end > available_start:
+                    cache.put(ticker, bars, available_start, covered_end, interval)
+        except Exception as e:
+            logger.error(f"Error bulk fetching historical data: {e}")
+
+    results = {}
+    for ticker in tickers:
+        if ticker in downloaded:
+            bars = downloaded[ticker]
+            results[ticker] = bars if not bars.empty else None
+        elif cache:
+            results[ticker] = cache.get(ticker, start_date, end_date, interval)
+        else:
+            results[ticker] = None
+        if results[ticker] is None:
+            logger.warning(f"No historical data found for {ticker}")
+    return results
+
+def fetch_bar_pyramid(ticker, start_date, end_date, base='1m', levels=DEFAULT_LEVELS, cache=None):
+    """
+    Fetches ``base`` bars for a ticker and precomputes the coarser levels of a BarPyramid.
+    Returns None when no bars are available.
+    """
+    bars = fetch_historical_data(ticker, start_date, end_date, cache=cache, interval=base)
+    if bars is None or bars.empty:
+        return None
+    return BarPyramid(bars, base=base, levels=levels)
+
+@timed('fetch_quote')
 def fetch_realtime_data(finnhub_client, ticker):
     """Fetches real-time stock data using Finnhub."""
     if finnhub_client is None:
         return None
     try:
-        logger.info(f"Fetching real-time data for {ticker}")
+        logger.info("Fetching real-time data for %s", ticker, extra={'ticker': ticker})
         quote = finnhub_client.quote(ticker)
         if quote and 'c' in quote:
             return quote
@@ -37,24 +165,56 @@ def fetch_realtime_data(finnhub_client, ticker):
         logger.error(f"Error fetching real-time data for {ticker}: {e}")
         return None
 
-def fetch_news_headlines(finnhub_client, ticker=None, category=None):
-    """Fetches news headlines using Finnhub."""
+def _fetch_news_stored(finnhub_client, store, ticker, category):
+    """Fetches only a feed's new articles into the news store, then serves the feed from it."""
+    if not store.is_fresh(ticker, category):
+        try:
+            if ticker:
+                start_date_str, end_date_str = store.date_range(ticker)
+                logger.info("Fetching news for %s since %s", ticker, start_date_str, extra={'ticker': ticker})
+                news = finnhub_client.company_news(ticker, _from=start_date_str, to=end_date_str)
+            else:
+                min_id = store.last_id(category)
+                logger.info("Fetching news for category %s after id %s", category, min_id)
+                news = finnhub_client.general_news(category=category, min_id=min_id)
+            store.add(news, ticker=ticker, category=category)
+        except Exception as e:
+            logger.error(f"Error fetching news, serving stored articles: {e}")
+    news = store.recent(ticker, category)
+    if not news:
+        logger.warning(f"No news found for ticker: {ticker} or category: {category}")
+        return None
+    return news
+
+@timed('fetch_news')
+def fetch_news_headlines(finnhub_client, ticker=None, category=None, store=None):
+    """
+    Fetches news headlines using Finnhub.
+
+    With the local news store (``NEWS_STORE_ENABLED``, or pass ``store``) only articles newer
+    than the feed's last stored one are downloaded, and syndicated duplicates are dropped.
+    Pass ``store=False`` to always download the full window.
+    """
     if finnhub_client is None:
         return None
+    if not ticker and not category:
+        logger.warning("Please provide either a ticker or a category for news.")
+        return None
+    if store is None and NEWS_STORE_ENABLED:
+        store = get_news_store()
+    if store:
+        return _fetch_news_stored(finnhub_client, store, ticker, category)
     try:
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
+        start_date = end_date - timedelta(days=NEWS_LOOKBACK_DAYS)
         start_date_str = start_date.strftime('%Y-%m-%d')
         end_date_str = end_date.strftime('%Y-%m-%d')
         if ticker:
-            logger.info(f"Fetching news for {ticker}")
+            logger.info("Fetching news for %s", ticker, extra={'ticker': ticker})
             news = finnhub_client.company_news(ticker, _from=start_date_str, to=end_date_str)
-        elif category:
-            logger.info(f"Fetching news for category {category}")
-            news = finnhub_client.general_news(category=category, min_id=0)
         else:
-            logger.warning("Please provide either a ticker or a category for news.")
-            return None
+            logger.info("Fetching news for category %s", category)
+            news = finnhub_client.general_news(category=category, min_id=0)
 
         if news:
             return news
@@ -0,0 +1,100 @@
+# trading_assistant/downsample.py
+
+import numpy as np
+import pandas as pd
+
+
+def _as_float(x):
+    if isinstance(x, (pd.DatetimeIndex, pd.Series)) and np.issubdtype(x.dtype, np.datetime64):
+        return np.asarray(x, dtype='datetime64[ns]').astype(np.int64).astype(float)
+    return np.asarray(x, dtype=float)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of at most ``threshold`` points that keep the
+    visual shape of the series ``y`` over ``x`` (numbers or datetimes, ascending).
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = _as_float(y)
+    # threshold - 2 buckets between the fixed first and last points.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = np.nanmean(y[end:next_end]) if np.any(~np.isnan(y[end:next_end])) else y[a]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + (int(np.nanargmax(area)) if np.any(~np.isnan(area)) else 0)
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Indices of the minimum and maximum of ``y`` in each of ``n_buckets`` equal-count buckets
+    (at most ``2 * n_buckets`` points, in order), so every spike survives.
+    """
+    y = _as_float(y)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    padded = np.full(size * n_buckets, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    missing = np.isnan(blocks)
+    filled = ~missing.all(axis=1)
+    low = np.argmin(np.where(missing, np.inf, blocks), axis=1) + offsets
+    high = np.argmax(np.where(missing, -np.inf, blocks), axis=1) + offsets
+    return np.unique(np.concatenate([low[filled], high[filled]]))
+
+
+def downsample_line(series, max_points, method='lttb'):
+    """Downsamples a Series for plotting with ``lttb`` or ``minmax``; short series are returned as-is."""
+    if len(series) <= max_points:
+        return series
+    if method == 'lttb':
+        indices = lttb_indices(series.index, series.to_numpy(), max_points)
+    elif method == 'minmax':
+        indices = minmax_indices(series.to_numpy(), max(1, max_points // 2))
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return series.iloc[indices]
+
+
+def downsample_ohlcv(df, max_points):
+    """
+    Merges consecutive bars into at most ``max_points`` candles: first Open, max High, min Low,
+    last Close and summed Volume per bucket, so the chart keeps every high and low. Other
+    numeric columns (indicators) take the bucket's last value. Buckets are labelled with
+    their first bar's timestamp.
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    lasts = np.append(starts[1:] - 1, n - 1)
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if column == 'Open':
+            columns[column] = values[starts]
+        elif column == 'High':
+            columns[column] = np.fmax.reduceat(values.astype(float), starts)
+        elif column == 'Low':
+            columns[column] = np.fmin.reduceat(values.astype(float), starts)
+        elif column == 'Volume':
+            columns[column] = np.add.reduceat(np.nan_to_num(values.astype(float)), starts)
+        else:
+            columns[column] = values[lasts]
+    return pd.DataFrame(columns, index=df.index[starts])
+
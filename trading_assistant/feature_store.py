@@ -0,0 +1,337 @@
+# trading_assistant/feature_store.py
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.indicators import indicator_arrays
+from trading_assistant.utils import get_logger
+from trading_assistant.config import FEATURE_STORE_DIR
+
+logger = get_logger(__name__)
+
+FEATURES = ['RSI_14', 'MACD_12_26_9', 'MACDH_12_26_9', 'MACDS_12_26_9', 'SMA_20', 'SMA_50']
+SEGMENT_SUFFIX = ".arrow"
+# Holds the features of today's still-forming bar; rewritten on every update, never appended.
+OPEN_BAR_FILE = "open.ipc"
+MAX_SEGMENTS = 16
+# Bars recomputed ahead of the first new row so the recursive indicators (EMA, RSI) converge
+# to their full-history values (after 250 bars the differences are around 1e-7 of the price).
+WARMUP_BARS = 250
+
+# name -> function(bars, cache) returning a float array aligned with bars
+FEATURE_DEFINITIONS = {}
+
+
+def register_feature(name, func):
+    """
+    Registers a feature definition. ``func(bars, cache)`` receives the OHLCV DataFrame and a
+    dict shared by every definition during one computation pass, and returns a float array.
+    """
+    FEATURE_DEFINITIONS[name] = func
+    return func
+
+
+def _standard_indicators(bars, cache):
+    if 'indicators' not in cache:
+        cache['indicators'] = indicator_arrays(bars['Close'].to_numpy(dtype=np.float64))
+    return cache['indicators']
+
+
+for _name in FEATURES:
+    register_feature(_name, lambda bars, cache, _name=_name: _standard_indicators(bars, cache)[_name])
+
+
+def compute_features(bars, features=None):
+    """Computes registered feature definitions over an OHLCV DataFrame, as a dict of arrays."""
+    features = list(features or FEATURE_DEFINITIONS)
+    cache = {}
+    return {name: np.asarray(FEATURE_DEFINITIONS[name](bars, cache), dtype=np.float64) for name in features}
+
+
+def make_target(close):
+    """Next-bar direction label (1 up, 0 not up); NaN for the last bar, whose next close is unknown."""
+    close = np.asarray(close, dtype=np.float64)
+    target = np.full(close.shape, np.nan)
+    target[:-1] = (close[1:] > close[:-1]).astype(np.float64)
+    return target
+
+
+class FeatureStore:
+    """
+    Append-only columnar store of engineered features keyed by ticker and date.
+
+    Each ticker is a directory of uncompressed Arrow IPC segments holding Date, Close and one
+    column per feature. ``update`` appends only closed bars newer than the last stored date,
+    and reads memory-map the segments so single-segment columns come back as zero-copy NumPy
+    views (``compact`` merges segments). Today's bar is still forming, so like the bar cache
+    the store never treats it as final: its row is kept in a separate open-bar file that each
+    update replaces, and only inference (``latest_features``) reads it.
+    """
+
+    def __init__(self, root=FEATURE_STORE_DIR, features=None):
+        self.root = root
+        self.features = list(features or FEATURES)
+        self._lock = threading.Lock()
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root, ticker)
+
+    def _segments(self, ticker):
+        directory = self._ticker_dir(ticker)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.endswith(SEGMENT_SUFFIX))
+
+    @staticmethod
+    def _read_segment(path):
+        import pyarrow as pa
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+    @staticmethod
+    def _write_segment(path, columns):
+        import pyarrow as pa
+        table = pa.table(columns)
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def tickers(self):
+        """Returns the tickers with stored features."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self._segments(name))
+
+    def last_date(self, ticker):
+        """Returns the last stored date for a ticker, or None."""
+        segments = self._segments(ticker)
+        if not segments:
+            return None
+        dates = self._read_segment(segments[-1]).column('Date')
+        return pd.Timestamp(dates[len(dates) - 1].as_py()) if len(dates) else None
+
+    def _open_path(self, ticker):
+        return os.path.join(self._ticker_dir(ticker), OPEN_BAR_FILE)
+
+    def _read_open(self, ticker):
+        path = self._open_path(ticker)
+        return self._read_segment(path) if os.path.exists(path) else None
+
+    def _continues(self, ticker, dates, close):
+        """
+        True when closed bars (``dates``, ``close``) continue the stored rows: they start inside
+        the stored range and match every stored date and close they overlap, so no bar is
+        missing between the two and the prices were not adjusted since.
+        """
+        stored = self.read(ticker, ['Close'])
+        if stored is None or len(stored['Date']) == 0 or len(dates) == 0:
+            return True
+        if dates[0] < stored['Date'][0] or dates[0] > stored['Date'][-1]:
+            return False
+        lo = np.searchsorted(stored['Date'], dates[0])
+        overlap = min(len(stored['Date']) - lo, len(dates))
+        return np.array_equal(stored['Date'][lo:lo + overlap], dates[:overlap]) \
+            and np.allclose(stored['Close'][lo:lo + overlap], close[:overlap], rtol=1e-9, atol=0.0)
+
+    def _clear(self, ticker):
+        for path in self._segments(ticker) + [self._open_path(ticker)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def update(self, ticker, bars):
+        """
+        Appends features for the closed bars in ``bars`` (daily OHLCV) that are newer than
+        what is stored, and replaces the open-bar row with today's bar if ``bars`` has one.
+
+        Only the new rows plus WARMUP_BARS of history before them are recomputed, so ``bars``
+        needs that much history ahead of the last stored date. When ``bars`` does not continue
+        the stored rows (it starts earlier, leaves a gap or has different closes), the ticker's
+        features are rebuilt from ``bars``. Returns the number of rows written.
+        """
+        if bars is None or bars.empty:
+            return 0
+        bars = flat_ohlcv(bars)
+        index = pd.DatetimeIndex(bars.index)
+        today = pd.Timestamp.now(tz=index.tz).normalize()
+
+        with self._lock:
+            closed = index < today
+            if not self._continues(ticker, index[closed].to_numpy(dtype='datetime64[ns]'),
+                                   bars['Close'].to_numpy(dtype=np.float64)[closed]):
+                logger.info("Rebuilding features for %s: the bars do not continue the stored rows", ticker,
+                            extra={'ticker': ticker})
+                self._clear(ticker)
+            last = self.last_date(ticker)
+            new_rows = np.flatnonzero(closed & (index > last) if last is not None else closed)
+            open_rows = np.flatnonzero(~closed)[-1:]
+            if new_rows.size == 0 and open_rows.size == 0:
+                self._drop_open(ticker, today)
+                return 0
+
+            start = max(0, int(new_rows[0] if new_rows.size else open_rows[0]) - WARMUP_BARS)
+            tail = bars.iloc[start:]
+            values = compute_features(tail, self.features)
+            dates = index[start:].to_numpy(dtype='datetime64[ns]')
+            close = tail['Close'].to_numpy(dtype=np.float64)
+
+            def columns(rows):
+                rows = rows - start
+                return {'Date': dates[rows], 'Close': close[rows],
+                        **{name: values[name][rows] for name in self.features}}
+
+            os.makedirs(self._ticker_dir(ticker), exist_ok=True)
+            segments = self._segments(ticker)
+            if new_rows.size:
+                sequence = int(os.path.basename(segments[-1])[:-len(SEGMENT_SUFFIX)]) + 1 if segments else 0
+                self._write_segment(os.path.join(self._ticker_dir(ticker), f"{sequence:06d}{SEGMENT_SUFFIX}"),
+                                    columns(new_rows))
+                logger.info("Appended %d feature rows for %s", new_rows.size, ticker, extra={'ticker': ticker})
+            if open_rows.size:
+                self._write_segment(self._open_path(ticker), columns(open_rows))
+            else:
+                self._drop_open(ticker, today)
+
+            if new_rows.size and len(segments) + 1 > MAX_SEGMENTS:
+                self._compact(ticker)
+        return int(new_rows.size)
+
+    def _drop_open(self, ticker, today):
+        """Removes an open-bar row left over from an earlier session."""
+        open_bar = self._read_open(ticker)
+        if open_bar is not None and (not open_bar.num_rows or pd.Timestamp(open_bar.column('Date')[0].as_py()) < today):
+            os.remove(self._open_path(ticker))
+
+    def _compact(self, ticker):
+        import pyarrow as pa
+        segments = self._segments(ticker)
+        if len(segments) <= 1:
+            return
+        table = pa.concat_tables([self._read_segment(path) for path in segments]).combine_chunks()
+        target = segments[-1]
+        self._write_segment(target, {name: table.column(name) for name in table.column_names})
+        for path in segments[:-1]:
+            os.remove(path)
+        logger.info(f"Compacted {len(segments)} feature segments for {ticker}")
+
+    def compact(self, ticker):
+        """Merges a ticker's segments into one so reads are fully zero-copy."""
+        with self._lock:
+            self._compact(ticker)
+
+    def read(self, ticker, columns=None, start=None, end=None):
+        """
+        Returns a dict of column name to NumPy array (plus 'Date') for ``start <= date < end``.
+
+        Arrays are read-only views over the memory-mapped segment when the ticker has a single
+        segment; otherwise segments are concatenated once.
+        """
+        import pyarrow as pa
+        segments = self._segments(ticker)
+        if not segments:
+            return None
+        columns = ['Date'] + [c for c in (columns or ['Close'] + self.features) if c != 'Date']
+        tables = [self._read_segment(path).select(columns) for path in segments]
+        table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+        result = {}
+        for name in columns:
+            column = table.column(name)
+            if column.num_chunks == 1:
+                result[name] = column.chunk(0).to_numpy(zero_copy_only=name != 'Date')
+            else:
+                result[name] = column.to_numpy()
+        dates = result['Date'].astype('datetime64[ns]')
+        lo = np.searchsorted(dates, pd.Timestamp(start).to_datetime64()) if start is not None else 0
+        hi = np.searchsorted(dates, pd.Timestamp(end).to_datetime64()) if end is not None else len(dates)
+        result['Date'] = dates
+        return {name: values[lo:hi] for name, values in result.items()}
+
+    def read_frame(self, ticker, columns=None, start=None, end=None):
+        """Same as read, as a DataFrame indexed by Date."""
+        data = self.read(ticker, columns, start, end)
+        if data is None:
+            return pd.DataFrame()
+        dates = data.pop('Date')
+        return pd.DataFrame(data, index=pd.DatetimeIndex(dates, name='Date'))
+
+    def training_matrix(self, tickers, features=None, start=None, end=None):
+        """
+        Pooled training data for many tickers: ``(X, y, dates, tickers)`` NumPy arrays, with
+        rows lacking a feature or a label dropped.
+        """
+        features = list(features or self.features)
+        parts = []
+        for ticker in tickers:
+            data = self.read(ticker, ['Close'] + features, start, end)
+            if data is None or len(data['Date']) == 0:
+                continue
+            X = np.column_stack([data[name] for name in features])
+            y = make_target(data['Close'])
+            keep = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+            parts.append((X[keep], y[keep].astype(np.int64), data['Date'][keep],
+                          np.full(int(keep.sum()), ticker, dtype=object)))
+        if not parts:
+            return (np.empty((0, len(features))), np.empty(0, dtype=np.int64),
+                    np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=object))
+        X, y, dates, names = (np.concatenate(arrays) for arrays in zip(*parts))
+        order = np.argsort(dates, kind='stable')
+        return X[order], y[order], dates[order], names[order]
+
+    def training_frames(self, tickers, start=None, end=None):
+        """Per-ticker feature frames (with Close) in the shape walk_forward expects."""
+        return {ticker: self.read_frame(ticker, start=start, end=end) for ticker in tickers}
+
+    def feature_row(self, ticker, date, features=None):
+        """
+        The features of one bar as a 1 x n matrix, from the open bar when ``date`` is the
+        forming session and from the closed segments otherwise. None when the bar is not stored.
+        """
+        features = list(features or self.features)
+        date = pd.Timestamp(date).as_unit('ns').to_datetime64()
+        open_bar = self._read_open(ticker)
+        if open_bar is not None and open_bar.num_rows \
+                and np.datetime64(open_bar.column('Date')[0].as_py(), 'ns') == date:
+            return np.array([[open_bar.column(name)[0].as_py() for name in features]], dtype=np.float64)
+        data = self.read(ticker, features, start=date, end=date + np.timedelta64(1, 'ns'))
+        if data is None or len(data['Date']) == 0:
+            return None
+        return np.column_stack([data[name] for name in features])
+
+    def latest_features(self, tickers, features=None, include_open=True):
+        """
+        The most recent feature row of each ticker as a matrix ready for predict_many, taken
+        from today's open bar when there is one (``include_open``) and from the last closed
+        bar otherwise. Returns ``(X, dates)``; tickers without data get a row of NaNs.
+        """
+        features = list(features or self.features)
+        X = np.full((len(tickers), len(features)), np.nan)
+        dates = np.full(len(tickers), np.datetime64('NaT'), dtype='datetime64[ns]')
+        for i, ticker in enumerate(tickers):
+            segments = self._segments(ticker)
+            table = self._read_segment(segments[-1]) if segments else None
+            open_bar = self._read_open(ticker) if include_open else None
+            if open_bar is not None and open_bar.num_rows and (
+                    table is None or not table.num_rows
+                    or open_bar.column('Date')[0].as_py() > table.column('Date')[table.num_rows - 1].as_py()):
+                table = open_bar
+            if table is None or table.num_rows == 0:
+                continue
+            last = table.slice(table.num_rows - 1)
+            X[i] = [last.column(name)[0].as_py() for name in features]
+            dates[i] = np.datetime64(last.column('Date')[0].as_py(), 'ns')
+        return X, dates
+
+
+_default_store = None
+
+
+def get_feature_store():
+    """Returns the store at FEATURE_STORE_DIR."""
+    global _default_store
+    if _default_store is None:
+        _default_store = FeatureStore()
+    return _default_store
@@ -0,0 +1,308 @@
+# trading_assistant/indicators.py
+
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def sma_array(values, length):
+    """Vectorized simple moving average, NaN until ``length`` values are available."""
+    return pd.Series(values, dtype=float).rolling(length).mean().to_numpy()
+
+
+def ema_array(values, length):
+    """
+    Vectorized EMA seeded with the SMA of the first ``length`` valid values,
+    matching pandas_ta's default ``ema(..., sma=True)``.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < length:
+        return out
+    start = valid[0]
+    seeded = values[start:].copy()
+    seeded[length - 1] = np.nanmean(values[start:start + length])
+    seeded[:length - 1] = np.nan
+    out[start:] = pd.Series(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+    return out
+
+
+def rma_array(values, length):
+    """Vectorized Wilder's moving average as pandas_ta computes it."""
+    return pd.Series(values, dtype=float).ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+
+
+def rsi_array(close, length=14):
+    """Vectorized RSI matching pandas_ta's ``rsi``."""
+    change = np.diff(np.asarray(close, dtype=float), prepend=np.nan)
+    gain = rma_array(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), length)
+    loss = rma_array(np.where(change < 0, change, np.where(np.isnan(change), np.nan, 0.0)), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100.0 * gain / (gain + np.abs(loss))
+
+
+def macd_arrays(close, fast=12, slow=26, signal=9):
+    """Vectorized MACD line, histogram and signal matching pandas_ta's ``macd``."""
+    macd = ema_array(close, fast) - ema_array(close, slow)
+    macd_signal = ema_array(macd, signal)
+    return macd, macd - macd_signal, macd_signal
+
+
+def atr_array(high, low, close, length=14):
+    """Vectorized Average True Range (Wilder smoothing) matching pandas_ta's ``atr``."""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    prev_close = np.concatenate(([np.nan], np.asarray(close, dtype=float)[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[0] = np.nan
+    return rma_array(true_range, length)
+
+
+def indicator_arrays(close, rsi_length=14, macd_fast=12, macd_slow=26, macd_signal=9, sma_lengths=(20, 50),
+                     dtype=np.float64):
+    """
+    Computes every indicator calculate_technical_indicators adds, as a dict of NumPy arrays
+    keyed by the package's column names.
+
+    ``close`` is only read. Values are always computed in float64 and then cast to ``dtype``.
+    """
+    macd_props = f"_{macd_fast}_{macd_slow}_{macd_signal}"
+    macd, histogram, signal = macd_arrays(close, macd_fast, macd_slow, macd_signal)
+    arrays = {
+        f"RSI_{rsi_length}": rsi_array(close, rsi_length),
+        f"MACD{macd_props}": macd,
+        f"MACDH{macd_props}": histogram,
+        f"MACDS{macd_props}": signal,
+    }
+    for length in sma_lengths:
+        arrays[f"SMA_{length}"] = sma_array(close, length)
+    if np.dtype(dtype) != np.float64:
+        arrays = {column: values.astype(dtype) for column, values in arrays.items()}
+    return arrays
+
+
+class _SMA:
+    """Rolling simple moving average over a fixed window."""
+
+    def __init__(self, length):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self.commits = 0
+
+    def step(self, x):
+        total = self.total + x - (self.window[0] if len(self.window) == self.length else 0.0)
+        count = min(len(self.window) + 1, self.length)
+        return total, (total / count if count == self.length else math.nan)
+
+    def commit(self, x, total):
+        self.window.append(x)
+        self.total = total
+        self.commits += 1
+        if self.commits % self.length == 0:
+            # Refresh the running sum once per window to stop floating-point drift.
+            self.total = math.fsum(self.window)
+
+
+class _EMA:
+    """
+    Exponential moving average seeded with the SMA of the first ``length`` values,
+    matching pandas_ta's default ``ema(..., sma=True)``.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = math.nan
+
+    def step(self, x):
+        count = self.count + 1
+        if count < self.length:
+            return count, self.seed_sum + x, math.nan
+        if count == self.length:
+            seed_sum = self.seed_sum + x
+            return count, seed_sum, seed_sum / self.length
+        return count, self.seed_sum, self.value + self.alpha * (x - self.value)
+
+    def commit(self, state):
+        self.count, self.seed_sum, self.value = state
+
+
+class _RMA:
+    """
+    Wilder's moving average as pandas_ta computes it: ``ewm(alpha=1/length, min_periods=length)``
+    with pandas' default ``adjust=True`` weighting, tracked as a weighted sum and weight total.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.count = 0
+        self.weighted_sum = 0.0
+        self.weight = 0.0
+
+    def step(self, x):
+        count = self.count + 1
+        weighted_sum = x + self.decay * self.weighted_sum
+        weight = 1.0 + self.decay * self.weight
+        value = weighted_sum / weight if count >= self.length else math.nan
+        return (count, weighted_sum, weight), value
+
+    def commit(self, state):
+        self.count, self.weighted_sum, self.weight = state
+
+
+class IncrementalIndicators:
+    """
+    O(1)-per-bar indicator state producing the same columns as
+    ``analysis.calculate_technical_indicators``: RSI, MACD (line, histogram, signal) and SMAs.
+
+    Seed it from history with ``from_frame``, then call ``update`` for each completed bar.
+    ``update_quote`` previews the values for a still-forming bar (e.g. a Finnhub quote from
+    ``fetch_realtime_data``) without advancing the state.
+    """
+
+    def __init__(self, rsi_length=14, macd_fast=12, macd_slow=26, macd_signal=9, sma_lengths=(20, 50)):
+        self.rsi_length = rsi_length
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.sma_lengths = tuple(sma_lengths)
+
+        self._rsi_gain = _RMA(rsi_length)
+        self._rsi_loss = _RMA(rsi_length)
+        self._ema_fast = _EMA(macd_fast)
+        self._ema_slow = _EMA(macd_slow)
+        self._ema_signal = _EMA(macd_signal)
+        self._smas = {length: _SMA(length) for length in self.sma_lengths}
+        self._last_close = None
+
+        macd_props = f"_{macd_fast}_{macd_slow}_{macd_signal}"
+        self.rsi_column = f"RSI_{rsi_length}"
+        self.macd_column = f"MACD{macd_props}"
+        self.macd_hist_column = f"MACDH{macd_props}"
+        self.macd_signal_column = f"MACDS{macd_props}"
+        self.bars = 0
+        self.current = None
+        self.previous = None
+
+    @property
+    def columns(self):
+        """Indicator column names, in the order calculate_technical_indicators adds them."""
+        return [self.rsi_column, self.macd_column, self.macd_hist_column, self.macd_signal_column] + \
+               [f"SMA_{length}" for length in self.sma_lengths]
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Builds the state by replaying every Close in an OHLCV DataFrame."""
+        state = cls(**kwargs)
+        df = flat_ohlcv(df)
+        for timestamp, close in df['Close'].items():
+            state.update(close, timestamp=timestamp)
+        logger.info(f"Seeded incremental indicators from {state.bars} bars")
+        return state
+
+    def _advance(self, close):
+        """Computes the next outputs and accumulator states for a close, without committing."""
+        pending = {}
+        values = {'Close': close}
+
+        if self._last_close is None:
+            values[self.rsi_column] = math.nan
+        else:
+            change = close - self._last_close
+            pending['gain'], gain = self._rsi_gain.step(max(change, 0.0))
+            pending['loss'], loss = self._rsi_loss.step(min(change, 0.0))
+            if math.isnan(gain) or math.isnan(loss) or gain + abs(loss) == 0:
+                values[self.rsi_column] = math.nan
+            else:
+                values[self.rsi_column] = 100.0 * gain / (gain + abs(loss))
+
+        pending['fast'] = self._ema_fast.step(close)
+        pending['slow'] = self._ema_slow.step(close)
+        macd = pending['fast'][2] - pending['slow'][2]
+        values[self.macd_column] = macd
+        signal = math.nan
+        if not math.isnan(macd):
+            pending['signal'] = self._ema_signal.step(macd)
+            signal = pending['signal'][2]
+        values[self.macd_hist_column] = macd - signal
+        values[self.macd_signal_column] = signal
+
+        for length, sma in self._smas.items():
+            pending[length], values[f"SMA_{length}"] = sma.step(close)
+        return values, pending
+
+    def update(self, bar, timestamp=None):
+        """
+        Advances the state by one completed bar and returns the new indicator values.
+
+        ``bar`` may be a close price, a dict/Series with a 'Close' key, or a Finnhub quote dict.
+        """
+        close = self._close_of(bar)
+        if close is None or math.isnan(close):
+            logger.warning("Skipping bar without a valid close price.")
+            return self.current
+
+        values, pending = self._advance(close)
+        if 'gain' in pending:
+            self._rsi_gain.commit(pending['gain'])
+            self._rsi_loss.commit(pending['loss'])
+        self._ema_fast.commit(pending['fast'])
+        self._ema_slow.commit(pending['slow'])
+        if 'signal' in pending:
+            self._ema_signal.commit(pending['signal'])
+        for length, sma in self._smas.items():
+            sma.commit(close, pending[length])
+        self._last_close = close
+
+        values['timestamp'] = timestamp
+        self.previous, self.current = self.current, values
+        self.bars += 1
+        return values
+
+    def update_quote(self, quote):
+        """
+        Returns indicator values as if the forming bar closed at the quote's price.
+
+        The state is not advanced; call ``update`` once the bar completes.
+        """
+        close = self._close_of(quote)
+        if close is None or math.isnan(close):
+            return None
+        values, _ = self._advance(close)
+        values['timestamp'] = pd.Timestamp(quote['t'], unit='s') if isinstance(quote, dict) and quote.get('t') else None
+        return values
+
+    @staticmethod
+    def _close_of(bar):
+        if bar is None:
+            return None
+        if isinstance(bar, dict):
+            value = bar.get('Close', bar.get('c'))
+        elif isinstance(bar, pd.Series):
+            value = bar.get('Close')
+        else:
+            value = bar
+        return float(value) if value is not None else None
+
+    def to_frame(self, preview=None):
+        """
+        Returns the last two rows (previous and current, or current and ``preview``) as a
+        DataFrame that generate_trading_signal and make_trading_decision accept.
+        """
+        rows = [row for row in ((self.current, preview) if preview is not None else (self.previous, self.current))
+                if row is not None]
+        if not rows:
+            return pd.DataFrame(columns=['Close'] + self.columns)
+        index = [row.get('timestamp') for row in rows]
+        return pd.DataFrame([{k: v for k, v in row.items() if k != 'timestamp'} for row in rows],
+                            index=index)
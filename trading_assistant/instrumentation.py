@@ -0,0 +1,264 @@
+# trading_assistant/instrumentation.py
+
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from trading_assistant.utils import get_logger
+from trading_assistant.config import INSTRUMENTATION_ENABLED, PROFILE_DIR
+
+logger = get_logger(__name__)
+
+METRIC_PREFIX = "trading_assistant"
+# Latency bucket upper bounds in seconds, Prometheus style.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 2048
+
+_enabled = INSTRUMENTATION_ENABLED
+
+
+class _Histogram:
+    """Bucketed histogram plus a window of recent samples for percentiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+class MetricsRegistry:
+    """In-process counters and latency histograms keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def summary(self):
+        """Counters and per-span count/mean/p50/p95/p99/max in milliseconds."""
+        with self._lock:
+            counters = {_label_name(name, labels): value for (name, labels), value in self.counters.items()}
+            spans = {}
+            for (name, labels), h in self.histograms.items():
+                spans[_label_name(name, labels)] = {
+                    'count': h.count,
+                    'mean_ms': h.sum / h.count * 1000.0 if h.count else None,
+                    'p50_ms': h.percentile(50) * 1000.0,
+                    'p95_ms': h.percentile(95) * 1000.0,
+                    'p99_ms': h.percentile(99) * 1000.0,
+                    'max_ms': max(h.recent) * 1000.0,
+                }
+        return {'counters': counters, 'spans': spans}
+
+    def prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (n, labels), value in self.counters.items():
+                    if n == name:
+                        lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{METRIC_PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (n, labels), h in self.histograms.items():
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_prometheus_labels(labels + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{metric}_bucket{_prometheus_labels(labels + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{metric}_sum{_prometheus_labels(labels)} {h.sum}")
+                    lines.append(f"{metric}_count{_prometheus_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _label_name(name, labels):
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+def enable(flag=True):
+    """Turns instrumentation on or off for the whole process."""
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled():
+    return _enabled
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            metrics.increment(f"{self.name}_errors", **self.labels)
+        return False
+
+
+def span(name, **labels):
+    """
+    Times a block into the ``name`` histogram (and counts exceptions as ``<name>_errors``).
+    Returns a shared no-op context manager when instrumentation is disabled.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, labels)
+
+
+def timed(name=None, **labels):
+    """Decorator form of span; the span name defaults to the function name."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, value=1, **labels):
+    """Adds to a counter when instrumentation is enabled."""
+    if _enabled:
+        metrics.increment(name, value, **labels)
+
+
+def export_jsonl(path):
+    """Appends a timestamped summary snapshot as one JSON line."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps({'timestamp': time.time(), **metrics.summary()}) + "\n")
+
+
+def export_prometheus(path=None):
+    """Returns the Prometheus text; also writes it atomically to ``path`` (e.g. for a textfile collector)."""
+    text = metrics.prometheus()
+    if path:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    return text
+
+
+@contextmanager
+def profile_run(name, enabled=None, directory=PROFILE_DIR, interval=0.001):
+    """
+    Profiles one pipeline run when ``enabled`` (default: PROFILE_DIR is set).
+
+    Uses the pyinstrument sampling profiler when it is installed and writes an HTML report;
+    otherwise falls back to cProfile and writes a .pstats file. Yields the report path or None.
+    """
+    enabled = bool(directory) if enabled is None else enabled
+    if not enabled:
+        yield None
+        return
+
+    directory = directory or "profiles"
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        path = os.path.join(directory, f"{name}-{stamp}.html")
+        profiler = Profiler(interval=interval)
+        profiler.start()
+        try:
+            yield path
+        finally:
+            profiler.stop()
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+    else:
+        import cProfile
+        path = os.path.join(directory, f"{name}-{stamp}.pstats")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield path
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    logger.info(f"Wrote profile for {name} to {path}")
@@ -0,0 +1,381 @@
+# trading_assistant/live_runner.py
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from trading_assistant.indicators import IncrementalIndicators
+from trading_assistant.trading_logic import make_trading_decision, get_trading_client, check_alpaca_connection
+from trading_assistant.order_execution import ExecutionEngine, OrderJournal, MockBroker
+from trading_assistant.risk_management import calculate_position_size, calculate_stop_loss
+from trading_assistant.feature_store import FEATURES
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import span, profile_run, is_enabled, metrics as pipeline_metrics, export_prometheus
+from trading_assistant.config import ALPACA_API_KEY_ID, ALPACA_API_SECRET_KEY
+
+logger = get_logger(__name__)
+
+NEUTRAL_SENTIMENT = {'compound': 0}
+
+
+class LatencyStats:
+    """Rolling latency samples with percentile summaries."""
+
+    def __init__(self, maxlen=10000):
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {'count': 0}
+        values = np.fromiter(self.samples, dtype=float) * 1000.0
+        return {
+            'count': self.count,
+            'mean_ms': float(values.mean()),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95)),
+            'max_ms': float(values.max()),
+        }
+
+
+class ReplayQuoteSource:
+    """
+    Replays OHLCV frames as Finnhub-shaped quotes, one bar per poll, for offline runs.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+
+    @property
+    def exhausted(self):
+        return all(self.position >= len(df) for df in self.frames.values())
+
+    async def __call__(self, symbols):
+        quotes = {}
+        for symbol in symbols:
+            df = self.frames.get(symbol)
+            if df is None or self.position >= len(df):
+                quotes[symbol] = None
+                continue
+            bar = df.iloc[self.position]
+            previous = df['Close'].iloc[self.position - 1] if self.position else bar['Close']
+            quotes[symbol] = {
+                'c': float(bar['Close']), 'o': float(bar['Open']), 'h': float(bar['High']),
+                'l': float(bar['Low']), 'pc': float(previous), 't': int(df.index[self.position].timestamp()),
+            }
+        self.position += 1
+        return quotes
+
+
+class FinnhubQuoteSource:
+    """Polls Finnhub quotes for all symbols concurrently through the async client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def __call__(self, symbols):
+        from trading_assistant.async_data import fetch_quotes
+        return await fetch_quotes(self.client, symbols)
+
+
+class LiveRunner:
+    """
+    Headless trading loop: polls quotes on a schedule, updates incremental indicators per
+    symbol, evaluates make_trading_decision and submits orders through an ExecutionEngine.
+
+    Orders are only sent when a symbol's decision changes to BUY or SELL, so a standing
+    signal is not resubmitted on every poll. Loop and decision-to-order latencies are
+    tracked in ``loop_latency`` and ``order_latency``.
+
+    With a ``feature_store`` (daily bars only) the seeded history is appended to it and
+    predictions for closed sessions use the stored feature rows the model was trained on;
+    the forming session is still predicted from the incremental indicators.
+    """
+
+    def __init__(self, symbols, quote_source, trading_client, histories=None, sentiment=None, model=None,
+                 features=FEATURES, total_capital=10000.0, risk_percentage=0.01, interval=60.0, engine=None,
+                 feature_store=None):
+        self.symbols = list(symbols)
+        self.quote_source = quote_source
+        self.engine = engine or ExecutionEngine(trading_client)
+        self.sentiment = sentiment or {}
+        self.model = model
+        self.features = list(features)
+        self.feature_store = feature_store
+        self._stored_rows = {}
+        self.total_capital = total_capital
+        self.risk_percentage = risk_percentage
+        self.interval = interval
+
+        self.states = {symbol: IncrementalIndicators() for symbol in self.symbols}
+        self._forming = {}
+        self.last_decision = {}
+        self.orders = []
+        self.loops = 0
+        self.loop_latency = LatencyStats()
+        self.order_latency = LatencyStats()
+        if histories:
+            self.seed(histories)
+
+    def seed(self, histories):
+        """Seeds each symbol's indicator state from its historical OHLCV frame."""
+        for symbol, df in histories.items():
+            if symbol in self.states and df is not None and not df.empty:
+                self.states[symbol] = IncrementalIndicators.from_frame(df)
+                if self.feature_store is not None:
+                    self.feature_store.update(symbol, df)
+
+    def _bar_date(self, quote):
+        return pd.Timestamp(quote['t'], unit='s').normalize() if quote.get('t') else pd.Timestamp.now().normalize()
+
+    def _evaluate(self, symbol, quote):
+        """Advances indicators with a quote and returns the decision for the symbol."""
+        state = self.states[symbol]
+        bar_date = self._bar_date(quote)
+        committed = state.current.get('timestamp') if state.current else None
+        if committed is not None and pd.Timestamp(committed).normalize() >= bar_date:
+            # The quote's session is already in the seeded history.
+            return make_trading_decision(state.to_frame(), self.sentiment.get(symbol, NEUTRAL_SENTIMENT),
+                                         self._predict(state.current, symbol, committed))
+        forming = self._forming.get(symbol)
+        if forming is not None and bar_date > forming[0]:
+            # A quote from a new session means the previous bar is complete.
+            state.update(forming[1], timestamp=forming[0])
+        self._forming[symbol] = (bar_date, float(quote['c']))
+
+        preview = state.update_quote(quote)
+        return make_trading_decision(state.to_frame(preview), self.sentiment.get(symbol, NEUTRAL_SENTIMENT),
+                                     self._predict(preview))
+
+    def _predict(self, values, symbol=None, bar_date=None):
+        if self.model is None or values is None:
+            return None
+        from trading_assistant.model_registry import predict_many
+        row = self._stored_row(symbol, bar_date)
+        if row is None:
+            row = [[values.get(f, np.nan) for f in self.features]]
+        return predict_many(self.model, row)[0]
+
+    def _stored_row(self, symbol, bar_date):
+        """The feature store's row for a closed bar, read once per (symbol, bar)."""
+        if self.feature_store is None or symbol is None or bar_date is None:
+            return None
+        cached = self._stored_rows.get(symbol)
+        if cached is None or cached[0] != bar_date:
+            cached = (bar_date, self.feature_store.feature_row(symbol, bar_date, self.features))
+            self._stored_rows[symbol] = cached
+        return cached[1]
+
+    def _order_size(self, decision, price):
+        stop_loss = calculate_stop_loss(price, self.risk_percentage, is_long=decision == 'BUY')
+        return round(calculate_position_size(self.total_capital, self.risk_percentage, stop_loss, price), 4)
+
+    def _queue_order(self, symbol, decision, price):
+        """Queues an order when the symbol's decision changes to BUY or SELL. Returns True if queued."""
+        queued = False
+        if decision in ('BUY', 'SELL') and decision != self.last_decision.get(symbol):
+            qty = self._order_size(decision, price)
+            if qty > 0:
+                self.engine.enqueue(symbol, qty, 'buy' if decision == 'BUY' else 'sell')
+                queued = True
+        self.last_decision[symbol] = decision
+        return queued
+
+    async def _submit(self, decided):
+        records = await self.engine.submit_pending()
+        submitted_at = time.perf_counter()
+        for decided_at in decided:
+            self.order_latency.add(submitted_at - decided_at)
+        for record in records:
+            if record['status'] != 'failed':
+                self.orders.append(record)
+                logger.info("%s order submitted for %s (%s shares)", record['side'].upper(), record['symbol'],
+                            record['qty'], extra={'ticker': record['symbol']})
+
+    async def step(self):
+        """Runs one poll-decide-order cycle."""
+        loop_start = time.perf_counter()
+        with span('fetch_quotes'):
+            quotes = await self.quote_source(self.symbols)
+
+        decided = []
+        for symbol in self.symbols:
+            quote = quotes.get(symbol)
+            if not quote or quote.get('c') is None:
+                continue
+            decided_at = time.perf_counter()
+            decision = self._evaluate(symbol, quote)
+            if self._queue_order(symbol, decision, float(quote['c'])):
+                decided.append(decided_at)
+
+        if decided:
+            await self._submit(decided)
+
+        self.loops += 1
+        self.loop_latency.add(time.perf_counter() - loop_start)
+
+    async def on_bar(self, bar):
+        """
+        StreamIngestor subscriber: commits a completed bar to the symbol's indicators and
+        acts on the resulting decision. The model is trained on daily features, so stream bars
+        are decided without it.
+        """
+        symbol = bar['symbol']
+        state = self.states.get(symbol)
+        if state is None:
+            return
+        decided_at = time.perf_counter()
+        state.update(bar['Close'], timestamp=bar['timestamp'])
+        decision = make_trading_decision(state.to_frame(), self.sentiment.get(symbol, NEUTRAL_SENTIMENT), None)
+        if self._queue_order(symbol, decision, float(bar['Close'])):
+            await self._submit([decided_at])
+        self.loops += 1
+        self.loop_latency.add(time.perf_counter() - decided_at)
+
+    async def run(self, max_loops=None, until=None):
+        """Polls every ``interval`` seconds until ``max_loops`` or ``until()`` returns True."""
+        logger.info(f"Live runner started for {len(self.symbols)} symbols, polling every {self.interval}s")
+        while max_loops is None or self.loops < max_loops:
+            started = time.monotonic()
+            try:
+                await self.step()
+            except Exception as e:
+                logger.error(f"Live runner loop failed: {e}")
+            if until is not None and until():
+                break
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        return self.metrics()
+
+    def metrics(self):
+        return {
+            'loops': self.loops,
+            'orders': len(self.orders),
+            'loop_latency': self.loop_latency.summary(),
+            'order_latency': self.order_latency.summary(),
+        }
+
+
+def _load_replay_frames(directory, symbols):
+    from trading_assistant.bar_cache import FixtureSource
+    source = FixtureSource(directory)
+    frames = {}
+    for symbol in symbols:
+        df = source(symbol, pd.Timestamp.min, pd.Timestamp.max)
+        if df is not None and not df.empty:
+            frames[symbol] = df
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless live trading loop.")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--interval', type=float, default=60.0, help="Seconds between polls.")
+    parser.add_argument('--max-loops', type=int, help="Stop after this many polls.")
+    parser.add_argument('--broker', choices=['alpaca', 'fake'], default='fake')
+    parser.add_argument('--replay-dir', help="Replay <SYMBOL>.csv fixtures instead of polling Finnhub.")
+    parser.add_argument('--seed-bars', type=int, default=250, help="Replay bars used to seed indicators.")
+    parser.add_argument('--lookback-days', type=int, default=365)
+    parser.add_argument('--capital', type=float, default=10000.0)
+    parser.add_argument('--risk-percentage', type=float, default=0.01)
+    parser.add_argument('--use-ml', action='store_true')
+    parser.add_argument('--stream', action='store_true',
+                        help="Act on bars aggregated from the trade websocket (or replayed ticks) instead of polling.")
+    parser.add_argument('--bar-interval', type=int, default=60, help="Bar size in seconds for --stream.")
+    parser.add_argument('--profile', action='store_true', help="Profile the run (see PROFILE_DIR).")
+    parser.add_argument('--metrics-file', help="Write Prometheus metrics here when instrumentation is on.")
+    args = parser.parse_args(argv)
+    symbols = [s.upper() for s in args.symbols]
+    if args.stream and args.use_ml:
+        parser.error("--use-ml needs daily bars; the model is not trained on --stream's intraday bars")
+
+    if args.broker == 'alpaca':
+        trading_client = get_trading_client(ALPACA_API_KEY_ID, ALPACA_API_SECRET_KEY)
+        if trading_client is None or not check_alpaca_connection(trading_client):
+            logger.error("Failed to connect to Alpaca.")
+            return 1
+        engine = ExecutionEngine(trading_client)
+    else:
+        engine = ExecutionEngine(MockBroker(), OrderJournal(':memory:'))
+
+    model = None
+    if args.use_ml:
+        from trading_assistant.ml_model import load_ml_model
+        model = load_ml_model()
+
+    # Filled in by _run so a run stopped with Ctrl-C still reports what it measured.
+    report = {}
+
+    async def _run_stream():
+        from trading_assistant.streaming import StreamIngestor, FinnhubTradeStream, ReplayTickStream
+        histories = None
+        if args.replay_dir:
+            frames = _load_replay_frames(args.replay_dir, symbols)
+            histories = {s: df.iloc[:args.seed_bars] for s, df in frames.items()}
+            source = ReplayTickStream.from_frames({s: df.iloc[args.seed_bars:] for s, df in frames.items()})
+        else:
+            # Intraday bars build up from the stream; daily history would mix bar sizes.
+            source = FinnhubTradeStream(symbols)
+        runner = LiveRunner(symbols, None, None, histories, model=model, engine=engine,
+                            total_capital=args.capital, risk_percentage=args.risk_percentage)
+        ingestor = StreamIngestor(symbols, source, intervals=(args.bar_interval,))
+        ingestor.subscribe(runner.on_bar, name='live_runner')
+        report['metrics'] = lambda: {**runner.metrics(), 'stream': ingestor.metrics()}
+        stream_metrics = await ingestor.run(until=lambda: args.max_loops is not None and runner.loops >= args.max_loops)
+        return {**runner.metrics(), 'stream': stream_metrics}
+
+    async def _run():
+        if args.stream:
+            return await _run_stream()
+        if args.replay_dir:
+            frames = _load_replay_frames(args.replay_dir, symbols)
+            histories = {s: df.iloc[:args.seed_bars] for s, df in frames.items()}
+            source = ReplayQuoteSource({s: df.iloc[args.seed_bars:] for s, df in frames.items()})
+            runner = LiveRunner(symbols, source, None, histories, model=model, engine=engine,
+                                total_capital=args.capital, risk_percentage=args.risk_percentage,
+                                interval=args.interval)
+            report['metrics'] = runner.metrics
+            return await runner.run(args.max_loops, until=lambda: source.exhausted)
+
+        from trading_assistant.async_data import AsyncFinnhubClient
+        from trading_assistant.data_handler import fetch_historical_data_bulk
+        end = pd.Timestamp.today().normalize()
+        histories = fetch_historical_data_bulk(symbols, end - pd.Timedelta(days=args.lookback_days), end)
+        feature_store = None
+        if model is not None:
+            from trading_assistant.feature_store import get_feature_store
+            feature_store = get_feature_store()
+        async with AsyncFinnhubClient() as client:
+            runner = LiveRunner(symbols, FinnhubQuoteSource(client), None, histories, model=model, engine=engine,
+                                total_capital=args.capital, risk_percentage=args.risk_percentage,
+                                interval=args.interval, feature_store=feature_store)
+            report['metrics'] = runner.metrics
+            return await runner.run(args.max_loops)
+
+    try:
+        with profile_run('live_runner', enabled=args.profile or None):
+            metrics = asyncio.run(_run())
+    except KeyboardInterrupt:
+        # asyncio.run cancels the loop on Ctrl-C and discards its result.
+        if 'metrics' not in report:
+            return 0
+        logger.info("Live runner interrupted; reporting metrics so far")
+        metrics = report['metrics']()
+    if is_enabled():
+        metrics['pipeline'] = pipeline_metrics.summary()
+        if args.metrics_file:
+            export_prometheus(args.metrics_file)
+    print(json.dumps(metrics, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,75 +1,75 @@
 # trading_assistant/ml_model.py
 
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
 import pandas as pd
 import numpy as np
 from trading_assistant.utils import get_logger
-import joblib
+from trading_assistant.model_registry import get_model_registry, predict_many
+from trading_assistant.feature_store import FEATURES, get_feature_store
+from trading_assistant.config import ML_COMPILED_INFERENCE
 import os
 
 logger = get_logger(__name__)
+# Legacy single-file model location, still read when the registry is empty.
 MODEL_FILE = "trading_model.joblib"
+N_ESTIMATORS = 100
 
 def prepare_data_for_ml(df_with_indicators):
     """
-    Prepares the data for ML model training.
+    Prepares the data for ML model training, returning a new frame with the Target column.
     """
     if df_with_indicators.empty:
         logger.error("Input DataFrame is empty. Cannot prepare data for ML.")
         return pd.DataFrame()
 
-    df_with_indicators['Target'] = (df_with_indicators['Close'].shift(-1) > df_with_indicators['Close']).astype(int)
-    df_with_indicators.dropna(subset=['Target'], inplace=True)
-    return df_with_indicators
+    target = (df_with_indicators['Close'].shift(-1) > df_with_indicators['Close']).astype(int)
+    return df_with_indicators.assign(Target=target).dropna(subset=['Target'])
 
-def train_ml_model(df_model):
+def train_ml_model(df_model, tickers=None, n_estimators=N_ESTIMATORS, max_depth=None):
     """
-    Trains the machine learning model and saves it to a file.
+    Trains the machine learning model with purged walk-forward validation and registers it
+    as a new version in the model registry.
+
+    ``df_model`` holds one ticker's bars with indicator columns (its Target column is
+    recomputed). Returns ``(model, features)``, or ``(None, None)`` when there are too few
+    labelled bars to validate on.
     """
     if df_model.empty:
         logger.error("DataFrame is empty. Cannot train ML model.")
         return None, None
 
-    features = ['RSI_14', 'MACD_12_26_9', 'MACDH_12_26_9', 'MACDS_12_26_9', 'SMA_20', 'SMA_50']
-    df_model.dropna(subset=features + ['Target'], inplace=True)
+    from trading_assistant.walk_forward import train_walk_forward
 
-    if df_model.empty:
-        logger.error("DataFrame is empty after dropping rows with missing values. Cannot train ML model.")
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    histories = {tickers[0]: df_model} if tickers and len(tickers) == 1 else df_model
+    model, features, fold_metrics = train_walk_forward(histories, FEATURES, n_estimators=n_estimators,
+                                                       max_depth=max_depth)
+    if model is None:
         return None, None
-
-    X = df_model[features]
-    y = df_model['Target']
-
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
-
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    classification_rep = classification_report(y_test, y_pred)
-
-    logger.info(f"Model Accuracy: {accuracy}")
-    logger.info(f"Classification Report:\\n{classification_rep}")
-
-    # Save the trained model
-    joblib.dump(model, MODEL_FILE)
-    logger.info(f"Model saved to {MODEL_FILE}")
-
+    logger.info(f"Walk-forward accuracy: {fold_metrics['accuracy'].mean():.3f} over {len(fold_metrics)} folds")
     return model, features
 
-def load_ml_model():
+def load_ml_model(version=None, compiled=ML_COMPILED_INFERENCE):
     """
-    Loads a pre-trained machine learning model from a file.
+    Loads a pre-trained machine learning model, the latest registered version by default.
+
+    With ``compiled`` the registered forest is served as a CompiledForest, which predicts
+    the same labels as the sklearn model much faster. Models are cached per process, so
+    repeated calls do not touch the disk.
     """
-    if os.path.exists(MODEL_FILE):
+    if compiled:
+        model, _ = get_model_registry().load_compiled(version)
+        if model is not None:
+            return model
+    model, _ = get_model_registry().load(version)
+    if model is not None:
+        return model
+    if version is None and os.path.exists(MODEL_FILE):
         logger.info(f"Loading model from {MODEL_FILE}")
+        import joblib
         return joblib.load(MODEL_FILE)
-    else:
-        logger.warning("No pre-trained model found.")
-        return None
+    logger.warning("No pre-trained model found.")
+    return None
 
 def get_ml_prediction(model, data, features):
     """
@@ -78,10 +78,26 @@ def get_ml_prediction(model, data, features):
     if model is None:
         return None
 
-    data.dropna(subset=features, inplace=True)
+    X = data[features].to_numpy(dtype=np.float64)
+    X = X[~np.isnan(X).any(axis=1)]
+
+    if len(X) == 0:
+        return None
+
+    return predict_many(model, X[:1])[0]
+
+def get_stored_prediction(model, ticker, bars, features=FEATURES, store=None):
+    """
+    Gets a prediction for the last bar of a ticker's daily ``bars`` from the feature store,
+    which is first updated with ``bars``, so inference reads the same rows training does.
+    """
+    if model is None or bars is None or bars.empty:
+        return None
 
-    if data.empty:
+    store = store or get_feature_store()
+    store.update(ticker, bars)
+    row = store.feature_row(ticker, bars.index[-1], features)
+    if row is None:
         return None
 
-    prediction = model.predict(data[features])
-    return "Up" if prediction[0] == 1 else "Down"
+    return predict_many(model, row)[0]
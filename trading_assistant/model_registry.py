@@ -0,0 +1,267 @@
+# trading_assistant/model_registry.py
+
+import json
+import os
+import re
+import threading
+import time
+import warnings
+import numpy as np
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import timed
+from trading_assistant.config import MODEL_REGISTRY_DIR, ML_COMPILED_PRECISION
+
+logger = get_logger(__name__)
+
+MODEL_ARTIFACT = "model.joblib"
+COMPILED_ARTIFACT = "forest.npz"
+METADATA_FILE = "metadata.json"
+LATEST_POINTER = "LATEST"
+VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+# Process-wide cache of loaded models, keyed by (registry root, version).
+_model_cache = {}
+_cache_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Versioned store of trained models.
+
+    Each version lives in ``<root>/<version>/`` with the joblib artifact and a metadata.json
+    describing features, training range, tickers and metrics. ``LATEST`` points at the most
+    recently registered version. Loaded models are memory-mapped and cached per process.
+    Forests are also exported as compiled node arrays (forest.npz) for fast inference.
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        # ((LATEST mtime, inode), version): the pointer is only re-read after it changes.
+        self._latest = (None, None)
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def list_versions(self):
+        """Returns registered versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, METADATA_FILE)))
+
+    def latest_version(self):
+        """
+        Returns the version LATEST points to, or None if nothing is registered. The pointer
+        is cached against its modification time, so repeated calls only stat the file.
+        """
+        path = os.path.join(self.root, LATEST_POINTER)
+        try:
+            stat = os.stat(path)
+            # LATEST is replaced atomically, so a new inode also marks a rewrite.
+            mtime = (stat.st_mtime_ns, stat.st_ino)
+        except OSError:
+            mtime = None
+        if mtime is not None:
+            cached_mtime, version = self._latest
+            if cached_mtime == mtime:
+                return version
+            with open(path) as f:
+                version = f.read().strip()
+            if version:
+                self._latest = (mtime, version)
+                return version
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+    def _next_version(self):
+        # Counts directories still being written (no metadata yet), so names are never reused.
+        numbers = [int(m.group(1)) for m in map(VERSION_PATTERN.match, os.listdir(self.root)) if m]
+        return f"v{max(numbers, default=0) + 1:04d}"
+
+    def _create_version_dir(self):
+        """Claims the next version name by creating its directory; mkdir is atomic across processes."""
+        with self._lock:
+            while True:
+                version = self._next_version()
+                try:
+                    os.makedirs(self._version_dir(version))
+                    return version
+                except FileExistsError:
+                    continue
+
+    def register(self, model, features, metadata=None):
+        """
+        Saves a trained model as a new version and makes it the latest.
+
+        Returns the new version string.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        version = self._create_version_dir()
+        version_dir = self._version_dir(version)
+
+        import joblib
+        # Uncompressed so the tree arrays can be memory-mapped on load.
+        joblib.dump(model, os.path.join(version_dir, MODEL_ARTIFACT))
+        record = {
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'model_class': type(model).__name__,
+            'features': list(features),
+            **(metadata or {}),
+        }
+        with open(os.path.join(version_dir, METADATA_FILE), 'w') as f:
+            json.dump(record, f, indent=2, default=str)
+        if hasattr(model, 'estimators_'):
+            self.export_compiled(version, model=model)
+
+        with self._lock:
+            # A concurrent trainer may have registered a newer version in the meantime.
+            latest = self.latest_version()
+            if latest is None or not VERSION_PATTERN.match(latest) or int(latest[1:]) < int(version[1:]):
+                tmp_path = os.path.join(self.root, f"{LATEST_POINTER}.{os.getpid()}.tmp")
+                with open(tmp_path, 'w') as f:
+                    f.write(version)
+                os.replace(tmp_path, os.path.join(self.root, LATEST_POINTER))
+                stat = os.stat(os.path.join(self.root, LATEST_POINTER))
+                self._latest = ((stat.st_mtime_ns, stat.st_ino), version)
+        logger.info(f"Registered model {version} in {self.root}")
+        return version
+
+    def get_metadata(self, version=None):
+        """Returns the metadata dict of a version (latest by default), or None."""
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        path = os.path.join(self._version_dir(version), METADATA_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    @timed('model_load')
+    def load(self, version=None, mmap_mode='r'):
+        """
+        Returns ``(model, metadata)`` for a version (latest by default), or ``(None, None)``.
+
+        Models are memory-mapped and cached per process, so repeated loads are free.
+        """
+        version = version or self.latest_version()
+        if version is None:
+            return None, None
+
+        key = (os.path.abspath(self.root), version)
+        cached = _model_cache.get(key)
+        if cached is not None:
+            return cached
+
+        with _cache_lock:
+            cached = _model_cache.get(key)
+            if cached is not None:
+                return cached
+            path = os.path.join(self._version_dir(version), MODEL_ARTIFACT)
+            if not os.path.exists(path):
+                logger.warning(f"Model artifact for {version} not found in {self.root}")
+                return None, None
+            logger.info(f"Loading model {version} from {path}")
+            import joblib
+            entry = (joblib.load(path, mmap_mode=mmap_mode), self.get_metadata(version))
+            _model_cache[key] = entry
+            return entry
+
+    def export_compiled(self, version=None, precision=None, model=None):
+        """
+        Flattens a version's forest into a CompiledForest saved next to the joblib artifact.
+        Returns the compiled forest, or None when the model cannot be compiled.
+        """
+        from trading_assistant.compiled_forest import CompiledForest
+        version = version or self.latest_version()
+        if model is None:
+            model, _ = self.load(version)
+        try:
+            forest = CompiledForest.from_sklearn(model, precision or ML_COMPILED_PRECISION)
+        except Exception as e:
+            logger.warning(f"Could not compile model {version}: {e}")
+            return None
+        forest.save(os.path.join(self._version_dir(version), COMPILED_ARTIFACT))
+        logger.info(f"Compiled model {version}: {forest.n_trees} trees, {forest.n_nodes} nodes, "
+                    f"{forest.nbytes} bytes ({forest.precision})")
+        with _cache_lock:
+            _model_cache.pop((os.path.abspath(self.root), version, 'compiled'), None)
+        return forest
+
+    @timed('model_load')
+    def load_compiled(self, version=None):
+        """
+        Returns ``(forest, metadata)`` for a version's compiled forest, exporting it from the
+        joblib artifact the first time. ``(None, None)`` when there is no compilable model or
+        the compiled file cannot be read.
+        """
+        from trading_assistant.compiled_forest import CompiledForest
+        version = version or self.latest_version()
+        if version is None:
+            return None, None
+
+        key = (os.path.abspath(self.root), version, 'compiled')
+        cached = _model_cache.get(key)
+        if cached is not None:
+            return cached
+
+        path = os.path.join(self._version_dir(version), COMPILED_ARTIFACT)
+        if os.path.exists(path):
+            try:
+                forest = CompiledForest.load(path)
+            except Exception as e:
+                # Callers fall back to the sklearn model (see ml_model.load_ml_model).
+                logger.warning(f"Could not load compiled model {version}: {e}")
+                return None, None
+        else:
+            forest = self.export_compiled(version)
+            if forest is None:
+                return None, None
+        entry = (forest, self.get_metadata(version))
+        with _cache_lock:
+            _model_cache[key] = entry
+        return entry
+
+    def invalidate(self, version=None):
+        """Drops one version (or every version of this registry) from the process cache."""
+        root = os.path.abspath(self.root)
+        with _cache_lock:
+            for key in list(_model_cache):
+                if key[0] == root and (version is None or key[1] == version):
+                    del _model_cache[key]
+
+
+_default_registry = None
+
+
+def get_model_registry():
+    """Returns the registry at MODEL_REGISTRY_DIR."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+    return _default_registry
+
+
+@timed('model_predict')
+def predict_many(model, features_matrix):
+    """
+    Predicts many rows (e.g. the latest bar of many tickers) in one call.
+
+    ``features_matrix`` is a 2-D NumPy array with columns in the model's feature order.
+    Returns an object array of 'Up'/'Down', with None for rows containing NaNs.
+    """
+    X = np.asarray(features_matrix, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    labels = np.full(X.shape[0], None, dtype=object)
+    valid = ~np.isnan(X).any(axis=1)
+    if model is None or not valid.any():
+        return labels
+    with warnings.catch_warnings():
+        # Models fitted on DataFrames warn about missing feature names; the column order is the contract.
+        warnings.simplefilter('ignore', UserWarning)
+        predictions = model.predict(X[valid])
+    labels[valid] = np.where(predictions == 1, 'Up', 'Down')
+    return labels
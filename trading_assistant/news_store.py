@@ -0,0 +1,210 @@
+# trading_assistant/news_store.py
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import increment
+from trading_assistant.sentiment import headline_key
+from trading_assistant.config import NEWS_STORE_PATH, NEWS_REFRESH_SECONDS, NEWS_LOOKBACK_DAYS
+
+logger = get_logger(__name__)
+
+ARTICLE_FIELDS = ('id', 'datetime', 'headline', 'summary', 'source', 'url', 'category', 'image', 'related')
+
+
+def feed_key(ticker=None, category=None):
+    """Store key of a news feed: the ticker for company news, ``category:<name>`` for general news."""
+    if ticker:
+        return ticker.upper()
+    if category:
+        return f"category:{category}"
+    raise ValueError("A ticker or a category is required")
+
+
+class NewsStore:
+    """
+    Local SQLite store of Finnhub news articles, so refreshes only download what is new.
+
+    Each feed (a ticker's company news or a general news category) remembers the newest
+    article id and time it has seen, which bound the next request. Articles are deduplicated
+    by headline: a syndicated story published under several ids and tickers is stored once
+    and linked to every feed that carried it. Windowed reads ("last N hours for these
+    tickers") are served from an index on (feed, datetime).
+    """
+
+    def __init__(self, path=NEWS_STORE_PATH, refresh_seconds=NEWS_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "id INTEGER PRIMARY KEY, content_key TEXT UNIQUE, datetime INTEGER, headline TEXT, summary TEXT, "
+            "source TEXT, url TEXT, category TEXT, image TEXT, related TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS article_feeds ("
+            "feed TEXT, article_id INTEGER, datetime INTEGER, PRIMARY KEY (feed, article_id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS article_feeds_window ON article_feeds (feed, datetime)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            "feed TEXT PRIMARY KEY, last_id INTEGER, last_datetime INTEGER, fetched_at REAL)"
+        )
+        self._db.commit()
+
+    def _state(self, feed):
+        with self._lock:
+            row = self._db.execute("SELECT last_id, last_datetime, fetched_at FROM feeds WHERE feed = ?",
+                                   (feed,)).fetchone()
+        return row or (None, None, None)
+
+    def is_fresh(self, ticker=None, category=None, now=None):
+        """True when the feed was fetched less than ``refresh_seconds`` ago."""
+        fetched_at = self._state(feed_key(ticker, category))[2]
+        now = time.time() if now is None else now
+        return fetched_at is not None and now - fetched_at < self.refresh_seconds
+
+    def date_range(self, ticker, lookback_days=NEWS_LOOKBACK_DAYS, now=None):
+        """
+        ``(from, to)`` dates for the next company_news request: from the day of the newest
+        stored article (company news is filtered by day), or ``lookback_days`` back.
+        """
+        now = datetime.now() if now is None else now
+        last_datetime = self._state(feed_key(ticker))[1]
+        start = now - timedelta(days=lookback_days)
+        if last_datetime is not None:
+            start = max(start, datetime.fromtimestamp(last_datetime))
+        return start.strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')
+
+    def last_id(self, category):
+        """Newest article id seen in a general news category, for the ``min_id`` parameter."""
+        return self._state(feed_key(category=category))[0] or 0
+
+    def add(self, articles, ticker=None, category=None, now=None):
+        """
+        Stores a feed's fetched articles and advances its since-id/date. Articles older than
+        the feed's newest stored one are skipped without parsing. Returns the number of new
+        articles linked to the feed.
+        """
+        feed = feed_key(ticker, category)
+        last_id, last_datetime, _ = self._state(feed)
+        rows = []
+        for article in articles or []:
+            if not isinstance(article, dict) or not article.get('headline'):
+                continue
+            article_time = int(article.get('datetime') or 0)
+            if last_datetime is not None and article_time < last_datetime:
+                continue
+            if category and last_id is not None and (article.get('id') or 0) <= last_id:
+                continue
+            rows.append((article.get('id'), headline_key(article['headline']), article_time,
+                         *(article.get(field) for field in ARTICLE_FIELDS[2:])))
+
+        with self._lock:
+            before = self._db.total_changes
+            if rows:
+                self._db.executemany(
+                    f"INSERT OR IGNORE INTO articles (id, content_key, {', '.join(ARTICLE_FIELDS[1:])}) "
+                    f"VALUES ({', '.join('?' * (len(ARTICLE_FIELDS) + 1))})", rows
+                )
+                stored = self._db.total_changes - before
+                # Syndicated copies resolve to the article already stored under their headline.
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO article_feeds (feed, article_id, datetime) "
+                    "SELECT ?, id, datetime FROM articles WHERE content_key = ?",
+                    [(feed, row[1]) for row in rows]
+                )
+                linked = self._db.total_changes - before - stored
+            else:
+                stored = linked = 0
+            ids = [row[0] for row in rows if row[0] is not None]
+            times = [row[2] for row in rows]
+            self._db.execute(
+                "INSERT INTO feeds (feed, last_id, last_datetime, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (feed) DO UPDATE SET last_id = max(coalesce(last_id, 0), coalesce(excluded.last_id, 0)), "
+                "last_datetime = max(coalesce(last_datetime, 0), coalesce(excluded.last_datetime, 0)), "
+                "fetched_at = excluded.fetched_at",
+                (feed, max(ids, default=last_id), max(times, default=last_datetime),
+                 time.time() if now is None else now)
+            )
+            self._db.commit()
+        logger.info("Stored %d new articles for %s (%d already stored, %d new headlines)", linked, feed,
+                    len(rows) - linked, stored)
+        increment('news_articles', linked, result='new')
+        increment('news_articles', len(rows) - linked, result='duplicate')
+        return linked
+
+    def window(self, tickers=None, categories=None, start=None, end=None, hours=None, limit=None):
+        """
+        Stored articles per feed published in [start, end) (unix seconds or datetimes), or in
+        the last ``hours``. Returns a dict of ticker (or category) to Finnhub-shaped article
+        dicts, newest first, with at most ``limit`` per feed. Feeds without articles map to [].
+        """
+        if hours is not None:
+            start = time.time() - hours * 3600
+        start = start.timestamp() if isinstance(start, datetime) else start
+        end = end.timestamp() if isinstance(end, datetime) else end
+        names = {feed_key(ticker=t): t for t in tickers or []}
+        names.update({feed_key(category=c): c for c in categories or []})
+        results = {name: [] for name in names.values()}
+        feeds = list(names)
+        columns = ', '.join(f"a.{field}" for field in ARTICLE_FIELDS)
+        with self._lock:
+            for i in range(0, len(feeds), 500):
+                chunk = feeds[i:i + 500]
+                query = (f"SELECT f.feed, {columns} FROM article_feeds f JOIN articles a ON a.id = f.article_id "
+                         f"WHERE f.feed IN ({','.join('?' * len(chunk))})")
+                params = list(chunk)
+                if start is not None:
+                    query += " AND f.datetime >= ?"
+                    params.append(int(start))
+                if end is not None:
+                    query += " AND f.datetime < ?"
+                    params.append(int(end))
+                for feed, *values in self._db.execute(query + " ORDER BY f.feed, f.datetime DESC", params):
+                    articles = results[names[feed]]
+                    if limit is None or len(articles) < limit:
+                        articles.append(dict(zip(ARTICLE_FIELDS, values)))
+        return results
+
+    def recent(self, ticker=None, category=None, days=NEWS_LOOKBACK_DAYS):
+        """One feed's stored articles from the last ``days``, newest first."""
+        name = ticker or category
+        if ticker:
+            return self.window(tickers=[ticker], hours=days * 24)[name]
+        return self.window(categories=[category], hours=days * 24)[name]
+
+    def prune(self, before):
+        """Deletes articles published before ``before`` (unix seconds or a datetime)."""
+        before = int(before.timestamp() if isinstance(before, datetime) else before)
+        with self._lock:
+            self._db.execute("DELETE FROM article_feeds WHERE datetime < ?", (before,))
+            removed = self._db.execute("DELETE FROM articles WHERE datetime < ?", (before,)).rowcount
+            self._db.commit()
+        logger.info(f"Pruned {removed} articles from the news store")
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_news_store():
+    """Returns the process-wide news store."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = NewsStore()
+    return _default_store
@@ -0,0 +1,392 @@
+# trading_assistant/order_execution.py
+
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import span, increment
+from trading_assistant.config import ORDER_JOURNAL_PATH
+
+logger = get_logger(__name__)
+
+# Statuses after which the broker will not change an order again ('failed' is local: never accepted).
+TERMINAL_STATUSES = {'filled', 'canceled', 'expired', 'rejected', 'replaced', 'done_for_day', 'failed'}
+JOURNAL_COLUMNS = ['client_order_id', 'symbol', 'qty', 'side', 'status', 'broker_order_id', 'filled_qty',
+                   'filled_avg_price', 'attempts', 'error', 'created_at', 'submitted_at', 'updated_at']
+
+
+def _value(field):
+    """Enum or plain value from an Alpaca model attribute, as a plain Python value."""
+    return getattr(field, 'value', field)
+
+
+def _float_or_none(value):
+    return float(value) if value not in (None, '') else None
+
+
+class OrderJournal:
+    """
+    Local SQLite record of every order the engine handles, keyed by client order ID.
+
+    The journal is the source of truth for retries: an order whose client order ID is already
+    journaled as submitted is never sent again.
+    """
+
+    def __init__(self, path=ORDER_JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS orders ("
+            "client_order_id TEXT PRIMARY KEY, symbol TEXT, qty REAL, side TEXT, status TEXT, "
+            "broker_order_id TEXT, filled_qty REAL, filled_avg_price REAL, attempts INTEGER DEFAULT 0, "
+            "error TEXT, created_at REAL, submitted_at REAL, updated_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS orders_status ON orders (status)")
+        self._db.commit()
+
+    def record(self, client_order_id, symbol, qty, side):
+        """
+        Journals a queued order. An order that previously ``failed`` (never accepted by the
+        broker) is queued again so it can be retried; any other existing order is left as is.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO orders (client_order_id, symbol, qty, side, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (client_order_id, symbol, qty, side, now, now)
+            )
+            self._db.execute(
+                "UPDATE orders SET status = 'queued', error = NULL, updated_at = ? "
+                "WHERE client_order_id = ? AND status = 'failed'",
+                (now, client_order_id)
+            )
+            self._db.commit()
+
+    def update_many(self, updates):
+        """Applies ``(client_order_id, {column: value})`` updates in one transaction."""
+        if not updates:
+            return
+        now = time.time()
+        with self._lock:
+            for client_order_id, fields in updates:
+                fields = dict(fields, updated_at=now)
+                assignments = ", ".join(f"{name} = ?" for name in fields)
+                self._db.execute(f"UPDATE orders SET {assignments} WHERE client_order_id = ?",
+                                 (*fields.values(), client_order_id))
+            self._db.commit()
+
+    def update(self, client_order_id, **fields):
+        self.update_many([(client_order_id, fields)])
+
+    def get(self, client_order_id):
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM orders WHERE client_order_id = ?",
+                                   (client_order_id,)).fetchone()
+        return dict(zip(JOURNAL_COLUMNS, row)) if row else None
+
+    def orders(self, status=None):
+        """Returns journaled orders (optionally with one status), oldest first."""
+        query = f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM orders"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at", params).fetchall()
+        return [dict(zip(JOURNAL_COLUMNS, row)) for row in rows]
+
+    def open_orders(self):
+        """Orders submitted to the broker that have not reached a terminal status."""
+        placeholders = ",".join("?" * len(TERMINAL_STATUSES))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM orders "
+                f"WHERE status NOT IN ({placeholders}) AND status != 'queued' ORDER BY created_at",
+                tuple(TERMINAL_STATUSES)
+            ).fetchall()
+        return [dict(zip(JOURNAL_COLUMNS, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ExecutionEngine:
+    """
+    Bulk order execution against an Alpaca-compatible trading client.
+
+    Orders are queued with ``enqueue`` (each gets a client order ID up front) and sent by
+    ``submit_pending`` with at most ``max_in_flight`` concurrent submissions. Failed
+    submissions are retried with the same client order ID after checking whether the broker
+    already has the order, so a lost response never produces a duplicate. ``track_fills``
+    follows every open order with a single batched poller instead of per-order polling, and
+    all state is written to the ``OrderJournal``.
+    """
+
+    def __init__(self, trading_client, journal=None, max_in_flight=20, max_retries=3, backoff=0.2,
+                 poll_interval=1.0, client_order_prefix="ta"):
+        self.trading_client = trading_client
+        self.journal = journal if journal is not None else OrderJournal()
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.client_order_prefix = client_order_prefix
+        self._queue = deque()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="order-submit")
+        self.stats = {'submitted': 0, 'failed': 0, 'retries': 0, 'recovered': 0, 'polls': 0}
+        # Submission threads and the event loop all update the counters.
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def new_client_order_id(self):
+        return f"{self.client_order_prefix}-{uuid.uuid4().hex[:24]}"
+
+    def enqueue(self, symbol, qty, side, client_order_id=None):
+        """
+        Queues a market order and journals it. Passing a previously used ``client_order_id``
+        makes the call idempotent, except that an order journaled as failed is retried.
+        Returns the client order ID.
+        """
+        client_order_id = client_order_id or self.new_client_order_id()
+        side = _value(side)
+        self.journal.record(client_order_id, symbol, float(qty), side)
+        self._queue.append(client_order_id)
+        return client_order_id
+
+    def _find_existing(self, client_order_id):
+        try:
+            return self.trading_client.get_order_by_client_id(client_order_id)
+        except Exception:
+            return None
+
+    def _submit_one(self, entry):
+        """Blocking submission of one journaled order, with idempotent retries."""
+        from alpaca.trading.requests import MarketOrderRequest
+        from alpaca.trading.enums import OrderSide, TimeInForce
+        request = MarketOrderRequest(symbol=entry['symbol'], qty=entry['qty'], side=OrderSide(entry['side']),
+                                     time_in_force=TimeInForce.DAY, client_order_id=entry['client_order_id'])
+        error = None
+        for attempt in range(1, self.max_retries + 2):
+            if attempt > 1:
+                # The previous attempt may have reached the broker even though the call failed.
+                existing = self._find_existing(entry['client_order_id'])
+                if existing is not None:
+                    self._count('recovered')
+                    return existing, attempt, None
+                self._count('retries')
+                time.sleep(self.backoff * 2 ** (attempt - 2))
+            try:
+                with span('order_submit'):
+                    return self.trading_client.submit_order(order_data=request), attempt, None
+            except Exception as e:
+                increment('order_submit_failures')
+                error = str(e)
+                logger.warning(f"Order {entry['client_order_id']} for {entry['symbol']} failed "
+                               f"(attempt {attempt}): {e}")
+        # The last attempt's response may have been lost too.
+        existing = self._find_existing(entry['client_order_id'])
+        if existing is not None:
+            self._count('recovered')
+            return existing, self.max_retries + 1, None
+        return None, self.max_retries + 1, error
+
+    @staticmethod
+    def _order_fields(order):
+        submitted_at = getattr(order, 'submitted_at', None)
+        return {
+            'status': _value(order.status),
+            'broker_order_id': str(order.id),
+            'filled_qty': _float_or_none(getattr(order, 'filled_qty', None)),
+            'filled_avg_price': _float_or_none(getattr(order, 'filled_avg_price', None)),
+            'submitted_at': submitted_at.timestamp() if isinstance(submitted_at, datetime) else submitted_at,
+        }
+
+    async def submit_pending(self):
+        """
+        Submits every queued order with a bounded in-flight window. Returns the journal
+        records of the submitted batch.
+        """
+        batch = []
+        while self._queue:
+            batch.append(self._queue.popleft())
+        # An ID enqueued twice must not be sent twice concurrently.
+        batch = list(dict.fromkeys(batch))
+        if not batch:
+            return []
+
+        loop = asyncio.get_running_loop()
+        window = asyncio.Semaphore(self.max_in_flight)
+        started = time.perf_counter()
+
+        async def _send(client_order_id):
+            entry = self.journal.get(client_order_id)
+            if entry is None or entry['status'] != 'queued':
+                return None  # Already sent by an earlier call with the same ID.
+            async with window:
+                order, attempts, error = await loop.run_in_executor(self._executor, self._submit_one, entry)
+            if order is None:
+                self._count('failed')
+                return client_order_id, {'status': 'failed', 'attempts': attempts, 'error': error}
+            self._count('submitted')
+            return client_order_id, {**self._order_fields(order), 'attempts': attempts}
+
+        updates = [u for u in await asyncio.gather(*(_send(c) for c in batch)) if u is not None]
+        self.journal.update_many(updates)
+        logger.info(f"Submitted {len(updates)} orders in {time.perf_counter() - started:.2f}s "
+                    f"({self.stats['failed']} failed so far)")
+        return [self.journal.get(c) for c in batch]
+
+    def _poll_once(self, open_orders):
+        """One batched status query covering every open order. Returns journal updates."""
+        from alpaca.trading.requests import GetOrdersRequest
+        from alpaca.common.enums import Sort
+        from alpaca.trading.enums import QueryOrderStatus
+        wanted = {entry['client_order_id'] for entry in open_orders}
+        since = min(entry['submitted_at'] or entry['created_at'] for entry in open_orders)
+        after = datetime.fromtimestamp(since, tz=timezone.utc) - timedelta(seconds=1)
+        updates = {}
+        seen = set()
+        while True:
+            with span('order_poll'):
+                page = self.trading_client.get_orders(filter=GetOrdersRequest(
+                    status=QueryOrderStatus.ALL, after=after, limit=500, direction=Sort.ASC, nested=False))
+            self._count('polls')
+            new = [order for order in page if str(order.id) not in seen]
+            for order in new:
+                seen.add(str(order.id))
+                if order.client_order_id in wanted:
+                    updates[order.client_order_id] = self._order_fields(order)
+            if len(page) < 500 or not new:
+                return list(updates.items())
+            # ``after`` is strictly after, so pages overlap by a second to keep orders sharing
+            # the boundary timestamp; the ones already seen are skipped.
+            after = page[-1].submitted_at - timedelta(seconds=1)
+
+    async def track_fills(self, timeout=60.0):
+        """
+        Polls until every journaled open order reaches a terminal status or ``timeout``
+        elapses. Returns the orders still open.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        open_orders = self.journal.open_orders()
+        while open_orders and time.monotonic() < deadline:
+            try:
+                updates = await loop.run_in_executor(self._executor, self._poll_once, open_orders)
+                self.journal.update_many(updates)
+            except Exception as e:
+                logger.error(f"Error polling order status: {e}")
+            open_orders = self.journal.open_orders()
+            if open_orders:
+                await asyncio.sleep(self.poll_interval)
+        if open_orders:
+            logger.warning(f"{len(open_orders)} orders still open after {timeout}s")
+        return open_orders
+
+    async def execute_async(self, orders, wait_for_fills=True, timeout=60.0):
+        """Queues ``(symbol, qty, side)`` tuples, submits them and optionally waits for fills."""
+        ids = [self.enqueue(*order) for order in orders]
+        await self.submit_pending()
+        if wait_for_fills:
+            await self.track_fills(timeout)
+        return [self.journal.get(c) for c in ids]
+
+    def execute(self, orders, wait_for_fills=True, timeout=60.0):
+        """Blocking wrapper around execute_async."""
+        return asyncio.run(self.execute_async(orders, wait_for_fills, timeout))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class MockBroker:
+    """
+    In-process Alpaca-compatible broker for testing the execution engine offline.
+
+    Submissions take ``latency`` seconds, fill ``fill_delay`` seconds later at ``price``, and
+    are rejected for symbols in ``reject_symbols``. With ``fail_rate`` a share of calls raise
+    after the order was accepted, which simulates a lost response. Duplicate client order IDs
+    are refused, like the real API.
+    """
+
+    def __init__(self, latency=0.0, fill_delay=0.0, price=100.0, reject_symbols=(), fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fill_delay = fill_delay
+        self.price = price
+        self.reject_symbols = set(reject_symbols)
+        self.fail_rate = fail_rate
+        self.orders = []
+        self._by_client_id = {}
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {'submit_order': 0, 'get_orders': 0, 'get_order_by_client_id': 0}
+
+    def get_account(self):
+        return SimpleNamespace(status='ACTIVE')
+
+    def _refresh(self, order):
+        if order.status == 'new' and time.time() - order.submitted_at.timestamp() >= self.fill_delay:
+            order.status = 'filled'
+            order.filled_qty = str(order.qty)
+            order.filled_avg_price = str(self.price)
+        return order
+
+    def submit_order(self, order_data):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls['submit_order'] += 1
+            client_order_id = order_data.client_order_id or f"mock-{uuid.uuid4().hex}"
+            if client_order_id in self._by_client_id:
+                raise ValueError(f"client_order_id must be unique: {client_order_id}")
+            order = SimpleNamespace(
+                id=f"mock-{next(self._ids)}",
+                client_order_id=client_order_id,
+                symbol=order_data.symbol,
+                qty=order_data.qty,
+                side=_value(order_data.side),
+                status='rejected' if order_data.symbol in self.reject_symbols else 'new',
+                filled_qty='0',
+                filled_avg_price=None,
+                submitted_at=datetime.now(timezone.utc),
+            )
+            self.orders.append(order)
+            self._by_client_id[client_order_id] = order
+            lost = self._random.random() < self.fail_rate
+        if lost:
+            raise ConnectionError("Connection reset before the response was received")
+        return order
+
+    def get_order_by_client_id(self, client_id):
+        with self._lock:
+            self.calls['get_order_by_client_id'] += 1
+            order = self._by_client_id.get(client_id)
+        if order is None:
+            raise LookupError(f"Order {client_id} not found")
+        return self._refresh(order)
+
+    def get_orders(self, filter=None):
+        with self._lock:
+            self.calls['get_orders'] += 1
+            orders = [o for o in self.orders if filter is None or filter.after is None or o.submitted_at > filter.after]
+        limit = filter.limit if filter is not None and filter.limit else len(orders)
+        return [self._refresh(o) for o in orders[:limit]]
@@ -0,0 +1,644 @@
+# trading_assistant/param_sweep.py
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from trading_assistant.backtest import DEFAULT_PARAMS, combine_signal_arrays, simulate_trades, summarize, \
+    technical_signal_arrays, _ohlc_arrays
+from trading_assistant.indicators import macd_arrays, rsi_array, sma_array
+from trading_assistant.ml_model import N_ESTIMATORS
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import increment
+from trading_assistant.config import SWEEP_CACHE_DIR, SWEEP_RESULTS_PATH
+
+logger = get_logger(__name__)
+
+# ML grid parameters on top of backtest.DEFAULT_PARAMS. With use_ml, a forest is trained on the
+# pooled bars before the holdout window and its predictions are merged into the rule signal.
+ML_PARAMS = {
+    'use_ml': False,
+    'n_estimators': N_ESTIMATORS,
+    'max_depth': None,
+}
+SWEEP_PARAMS = {**DEFAULT_PARAMS, **ML_PARAMS}
+INDICATOR_PARAMS = ('rsi_length', 'macd_fast', 'macd_slow', 'macd_signal', 'sma_fast', 'sma_slow')
+STAT_COLUMNS = ('total_return', 'cagr', 'sharpe', 'max_drawdown', 'num_trades', 'win_rate', 'profit_factor',
+                'avg_trade_pnl', 'ml_accuracy')
+DEFAULT_HOLDOUT = 0.3
+RANDOM_STATE = 42
+# A daily bar's sentiment counts the news published before the US close (20:00 UTC in summer).
+BAR_CLOSE_OFFSET = pd.Timedelta(hours=20)
+
+
+def expand_grid(grid):
+    """
+    Every combination of a grid (parameter name to list of values) as full parameter dicts,
+    ordered so points sharing indicator lengths are adjacent and reuse each other's work.
+    """
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    names = list(grid)
+    points = [{**SWEEP_PARAMS, **dict(zip(names, values))}
+              for values in itertools.product(*(grid[name] for name in names))]
+    return sorted(points, key=lambda p: tuple(p[name] for name in INDICATOR_PARAMS))
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def fingerprint(df):
+    """Content hash of an OHLCV history: its timestamps and OHLC values."""
+    digest = hashlib.sha256(pd.DatetimeIndex(df.index).asi8.tobytes())
+    for values in _ohlc_arrays(df):
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+class MemoCache:
+    """
+    Content-addressed memo cache for sweep intermediates.
+
+    Keys are hashes of what an artifact is computed from (the input data's fingerprint and the
+    parameters that matter for that stage), so any grid point that needs the same artifact
+    reuses it. Results are kept in a per-process LRU and, for ``persist=True`` stages
+    (feature matrices, fitted models), in ``root`` so every worker process and later sweeps
+    share them. Files are written atomically, so concurrent workers never read partial files.
+    """
+
+    def __init__(self, root=SWEEP_CACHE_DIR, memory_items=512):
+        self.root = root
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.pkl")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get_or_compute(self, stage, parts, compute, persist=False):
+        """Returns the cached artifact for ``(stage, parts)``, computing and storing it on a miss."""
+        key = _digest([stage, parts])
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._memory[key]
+
+        path = self._path(key) if persist and self.root else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                self.stats['disk_hits'] += 1
+                self._remember(key, value)
+                return value
+            except Exception as e:
+                logger.warning(f"Discarding unreadable sweep cache entry {path}: {e}")
+
+        self.stats['misses'] += 1
+        increment('sweep_cache_misses', stage=stage)
+        value = compute()
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        self._remember(key, value)
+        return value
+
+
+def historical_sentiment(histories, store=None):
+    """
+    Per-bar news sentiment for each ticker from the news store: the score the app would have
+    shown at each daily bar's close. Returns a dict of ticker to arrays aligned with the bars.
+    """
+    from trading_assistant.news_store import get_news_store
+    from trading_assistant.sentiment import ensure_vader_lexicon, sentiment_history
+    from trading_assistant.config import NEWS_LOOKBACK_DAYS
+    store = store or get_news_store()
+    if not ensure_vader_lexicon():
+        logger.error("VADER lexicon unavailable; headlines cannot be scored")
+    sentiment = {}
+    for ticker, df in histories.items():
+        if df is None or df.empty:
+            continue
+        times = (pd.DatetimeIndex(df.index).normalize() + BAR_CLOSE_OFFSET).as_unit('s').asi8.astype(float)
+        articles = store.window(tickers=[ticker], start=times[0] - NEWS_LOOKBACK_DAYS * 86400.0,
+                                end=times[-1])[ticker]
+        if not articles:
+            logger.warning(f"No stored news for {ticker}; its sentiment is neutral on every bar")
+        sentiment[ticker] = sentiment_history(articles, times)
+    return sentiment
+
+
+class SweepData:
+    """
+    The histories of a sweep with their fingerprints and OHLC arrays, prepared once per process.
+
+    ``sentiment`` is one compound score for every bar, or a dict of ticker to per-bar scores
+    aligned with that ticker's bars (see historical_sentiment).
+    """
+
+    def __init__(self, histories, holdout=DEFAULT_HOLDOUT, sentiment=0.0):
+        self.histories = {t: df for t, df in histories.items() if df is not None and not df.empty}
+        self.holdout = holdout
+        self.fingerprints = {t: fingerprint(df) for t, df in self.histories.items()}
+        self.arrays = {t: _ohlc_arrays(df) for t, df in self.histories.items()}
+        if isinstance(sentiment, dict):
+            self.sentiment = {}
+            for ticker, df in self.histories.items():
+                values = np.asarray(sentiment.get(ticker, 0.0), dtype=float)
+                if values.ndim and len(values) != len(df):
+                    raise ValueError(f"Sentiment for {ticker} has {len(values)} values for {len(df)} bars")
+                self.sentiment[ticker] = np.broadcast_to(values, (len(df),))
+        else:
+            self.sentiment = float(sentiment)
+        dates = pd.DatetimeIndex([])
+        for df in self.histories.values():
+            dates = dates.union(pd.DatetimeIndex(df.index))
+        # Every ticker is scored on the same final ``holdout`` share of dates.
+        self.eval_start = dates[int(len(dates) * (1 - holdout))] if holdout > 0 and len(dates) else None
+
+    def eval_row(self, ticker):
+        if self.eval_start is None:
+            return 0
+        return int(self.histories[ticker].index.searchsorted(self.eval_start))
+
+    def sentiment_for(self, ticker, start=0):
+        """The sentiment of a ticker's bars from row ``start`` on (a scalar when constant)."""
+        if isinstance(self.sentiment, dict):
+            return self.sentiment[ticker][start:]
+        return self.sentiment
+
+    @property
+    def constant_sentiment(self):
+        """True when every bar of every ticker has the same sentiment score."""
+        if not isinstance(self.sentiment, dict):
+            return True
+        values = [v for v in self.sentiment.values() if len(v)]
+        return not values or all(np.all(v == values[0][0]) for v in values)
+
+    @property
+    def key(self):
+        if isinstance(self.sentiment, dict):
+            sentiment = sorted((t, hashlib.sha256(np.ascontiguousarray(v).tobytes()).hexdigest())
+                               for t, v in self.sentiment.items())
+        else:
+            sentiment = self.sentiment
+        return [self.holdout, sorted(self.fingerprints.items()), sentiment]
+
+
+def _indicators(cache, data, ticker, p):
+    """The indicator columns of one ticker at a grid point's lengths, each memoized on its own."""
+    fp, close = data.fingerprints[ticker], data.arrays[ticker][3]
+    # Indicators are cheaper to recompute than to read back, so they stay in memory only.
+    rsi = cache.get_or_compute('rsi', [fp, p['rsi_length']], lambda: rsi_array(close, p['rsi_length']))
+    macd, histogram, signal = cache.get_or_compute(
+        'macd', [fp, p['macd_fast'], p['macd_slow'], p['macd_signal']],
+        lambda: macd_arrays(close, p['macd_fast'], p['macd_slow'], p['macd_signal']))
+    sma_fast = cache.get_or_compute('sma', [fp, p['sma_fast']], lambda: sma_array(close, p['sma_fast']))
+    sma_slow = cache.get_or_compute('sma', [fp, p['sma_slow']], lambda: sma_array(close, p['sma_slow']))
+    return rsi, macd, histogram, signal, sma_fast, sma_slow
+
+
+def _feature_matrix(cache, data, ticker, p):
+    """Feature rows (the FEATURES analogues at this point's lengths) and next-bar-up labels."""
+    def compute():
+        rsi, macd, histogram, signal, sma_fast, sma_slow = _indicators(cache, data, ticker, p)
+        X = np.column_stack([rsi, macd, histogram, signal, sma_fast, sma_slow])
+        close = data.arrays[ticker][3]
+        y = np.zeros(len(close), dtype=np.int8)
+        y[:-1] = close[1:] > close[:-1]
+        return X, y
+    return cache.get_or_compute('features', [data.fingerprints[ticker], [p[k] for k in INDICATOR_PARAMS]],
+                                compute, persist=True)
+
+
+def _fitted_model(cache, data, p):
+    """A forest fitted on every ticker's labelled rows before the holdout window."""
+    def compute():
+        from sklearn.ensemble import RandomForestClassifier
+        X_parts, y_parts = [], []
+        for ticker in data.histories:
+            # The last training bar's label looks into the holdout window, so it is purged.
+            end = max(data.eval_row(ticker) - 1, 0)
+            if end == 0:
+                continue  # The ticker's history starts inside the holdout window.
+            X, y = _feature_matrix(cache, data, ticker, p)
+            rows = np.flatnonzero(~np.isnan(X[:end]).any(axis=1))
+            X_parts.append(X[rows])
+            y_parts.append(y[rows])
+        if not X_parts:
+            return None
+        X, y = np.vstack(X_parts), np.concatenate(y_parts)
+        if len(np.unique(y)) < 2:
+            return None
+        model = RandomForestClassifier(n_estimators=p['n_estimators'], max_depth=p['max_depth'],
+                                       random_state=RANDOM_STATE, n_jobs=1)
+        return model.fit(X, y)
+    parts = [data.key, [p[k] for k in INDICATOR_PARAMS], p['n_estimators'], p['max_depth'], RANDOM_STATE]
+    return cache.get_or_compute('model', parts, compute, persist=True)
+
+
+def evaluate_point(point, data, cache, initial_capital=100000.0, allow_short=True):
+    """
+    Backtests one grid point on every ticker over the holdout window, with the sentiment held
+    by ``data``. Returns one stats dict per ticker. Indicators are computed over the full
+    history, so the window starts warmed up.
+    """
+    p = {**SWEEP_PARAMS, **point}
+    model = None
+    if p['use_ml']:
+        if data.eval_start is None:
+            raise ValueError("use_ml needs a holdout window to train before")
+        model = _fitted_model(cache, data, p)
+    results = []
+    for ticker in data.histories:
+        start = data.eval_row(ticker)
+        rsi, macd, _, signal, sma_fast, sma_slow = _indicators(cache, data, ticker, p)
+        tech_buy, tech_sell = technical_signal_arrays(rsi, macd, signal, sma_fast, sma_slow,
+                                                      p['rsi_oversold'], p['rsi_overbought'])
+        tech_buy, tech_sell = tech_buy[start:], tech_sell[start:]
+        ml_prediction = ml_accuracy = None
+        if model is not None:
+            X, y = _feature_matrix(cache, data, ticker, p)
+            X, y = X[start:], y[start:]
+            valid = np.flatnonzero(~np.isnan(X).any(axis=1))
+            ml_prediction = np.zeros(len(X), dtype=np.int8)
+            if len(valid):
+                predicted = model.predict(X[valid])
+                ml_prediction[valid] = np.where(predicted == 1, 1, -1)
+                # The final bar has no next close to score against.
+                scored = valid < len(X) - 1
+                if scored.any():
+                    ml_accuracy = float((predicted[scored] == y[valid[scored]]).mean())
+        decisions = combine_signal_arrays(tech_buy, tech_sell, data.sentiment_for(ticker, start), ml_prediction,
+                                          p['sentiment_threshold'])
+        open_, high, low, close = (a[start:] for a in data.arrays[ticker])
+        equity, trades = simulate_trades(open_, high, low, close, decisions, initial_capital,
+                                         p['risk_percentage'], p['reward_ratio'], allow_short)
+        results.append({'ticker': ticker, **summarize(equity, trades), 'ml_accuracy': ml_accuracy})
+    return results
+
+
+class ResultStore:
+    """
+    SQLite table of sweep results: one row per (sweep, grid point, ticker) with the point's
+    parameters as JSON and one column per statistic, so results can be queried in SQL
+    (``json_extract(params, '$.rsi_length')``) or loaded with ``frame``.
+    """
+
+    def __init__(self, path=SWEEP_RESULTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sweeps (sweep_id TEXT PRIMARY KEY, created_at REAL, grid TEXT, "
+            "tickers TEXT, settings TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sweep_results (sweep_id TEXT, point_id INTEGER, ticker TEXT, params TEXT, "
+            f"{', '.join(f'{column} REAL' for column in STAT_COLUMNS)}, seconds REAL, "
+            "PRIMARY KEY (sweep_id, point_id, ticker))"
+        )
+        self._db.commit()
+
+    def create_sweep(self, sweep_id, grid, tickers, settings):
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO sweeps VALUES (?, ?, ?, ?, ?)",
+                             (sweep_id, time.time(), json.dumps(grid, default=str), json.dumps(list(tickers)),
+                              json.dumps(settings, default=str)))
+            self._db.commit()
+
+    def record(self, sweep_id, point_id, point, results, seconds):
+        params = json.dumps(point, sort_keys=True, default=str)
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO sweep_results VALUES ({', '.join('?' * (len(STAT_COLUMNS) + 5))})",
+                [(sweep_id, point_id, r['ticker'], params, *(r.get(c) for c in STAT_COLUMNS), seconds)
+                 for r in results]
+            )
+            self._db.commit()
+
+    def completed_points(self, sweep_id):
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT point_id FROM sweep_results WHERE sweep_id = ?",
+                                    (sweep_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def sweeps(self):
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM sweeps ORDER BY created_at", self._db)
+
+    def frame(self, sweep_id):
+        """One row per (point, ticker) with a column per parameter and statistic."""
+        with self._lock:
+            df = pd.read_sql_query("SELECT * FROM sweep_results WHERE sweep_id = ? ORDER BY point_id, ticker",
+                                   self._db, params=(sweep_id,))
+        if df.empty:
+            return df
+        params = pd.DataFrame([json.loads(p) for p in df.pop('params')], index=df.index)
+        return pd.concat([df[['sweep_id', 'point_id', 'ticker']], params, df.drop(columns=['sweep_id', 'point_id',
+                                                                                           'ticker'])], axis=1)
+
+    def summary(self, sweep_id, metric='sharpe'):
+        """Statistics averaged over tickers per grid point, best ``metric`` first."""
+        df = self.frame(sweep_id)
+        if df.empty:
+            return df
+        params = [c for c in SWEEP_PARAMS if c in df.columns]
+        stats = [c for c in STAT_COLUMNS if c in df.columns]
+        summary = df.groupby('point_id').agg({**{c: 'first' for c in params}, **{c: 'mean' for c in stats}})
+        return summary.sort_values(metric, ascending=False)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class FileQueue:
+    """
+    A directory-backed task queue shared by local worker processes.
+
+    Each task is a JSON file in ``pending/``. A worker claims one by renaming it into
+    ``claimed/`` with its PID appended; rename is atomic, so exactly one worker wins, and
+    claims whose process has exited can be told apart from ones still being evaluated. The
+    sweep's data and settings are written next to the tasks once. Start workers with
+    ``python -m trading_assistant.param_sweep worker --queue DIR``.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.pending = os.path.join(root, 'pending')
+        self.claimed = os.path.join(root, 'claimed')
+        os.makedirs(self.pending, exist_ok=True)
+        os.makedirs(self.claimed, exist_ok=True)
+
+    def publish(self, sweep_id, histories, settings, tasks):
+        with open(os.path.join(self.root, f"{sweep_id}.pkl"), 'wb') as f:
+            pickle.dump({'histories': histories, 'settings': settings}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for point_id, point in tasks:
+            name = f"{sweep_id}-{point_id:06d}.json"
+            tmp_path = os.path.join(self.root, name + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({'sweep_id': sweep_id, 'point_id': point_id, 'point': point}, f, default=str)
+            os.replace(tmp_path, os.path.join(self.pending, name))
+
+    def claim(self):
+        """Claims the next pending task, returning ``(name, task)``, or None when the queue is empty."""
+        for name in sorted(os.listdir(self.pending)):
+            claimed_name = f"{name}@{os.getpid()}"
+            claimed = os.path.join(self.claimed, claimed_name)
+            try:
+                os.rename(os.path.join(self.pending, name), claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed) as f:
+                return claimed_name, json.load(f)
+        return None
+
+    def done(self, name):
+        os.remove(os.path.join(self.claimed, name))
+
+    def requeue_stale(self):
+        """Moves tasks claimed by processes that are no longer running back to pending."""
+        count = 0
+        for name in os.listdir(self.claimed):
+            task_name, _, owner = name.rpartition('@')
+            if owner.isdigit() and _process_alive(int(owner)):
+                continue
+            try:
+                os.rename(os.path.join(self.claimed, name), os.path.join(self.pending, task_name or name))
+            except FileNotFoundError:
+                continue  # Finished (or requeued by another coordinator) meanwhile.
+            count += 1
+        return count
+
+    def outstanding(self, sweep_id=None):
+        """Pending and claimed tasks, of one sweep or all of them."""
+        names = os.listdir(self.pending) + os.listdir(self.claimed)
+        return sum(1 for name in names if sweep_id is None or name.startswith(f"{sweep_id}-"))
+
+    def sweep_data(self, sweep_id):
+        with open(os.path.join(self.root, f"{sweep_id}.pkl"), 'rb') as f:
+            return pickle.load(f)
+
+    def __len__(self):
+        return self.outstanding()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_worker_state = {}
+
+
+def _init_worker(histories, settings, cache_root):
+    _worker_state['data'] = SweepData(histories, settings['holdout'], settings['sentiment'])
+    _worker_state['settings'] = settings
+    _worker_state['cache'] = MemoCache(cache_root)
+
+
+def _evaluate_chunk(tasks):
+    """Worker entry point: evaluates a list of (point_id, point) pairs."""
+    data, settings, cache = _worker_state['data'], _worker_state['settings'], _worker_state['cache']
+    results = []
+    for point_id, point in tasks:
+        start = time.perf_counter()
+        rows = evaluate_point(point, data, cache, settings['initial_capital'], settings['allow_short'])
+        results.append((point_id, point, rows, time.perf_counter() - start))
+    return results
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_sweep(histories, grid, workers=None, queue_dir=None, results=None, cache_root=SWEEP_CACHE_DIR,
+              holdout=DEFAULT_HOLDOUT, sentiment=0.0, initial_capital=100000.0, allow_short=True, chunk_size=4):
+    """
+    Backtests every point of ``grid`` on every ticker and records the statistics in the
+    results table. Returns ``(sweep_id, summary frame)``.
+
+    ``sentiment`` is a constant compound score or a dict of ticker to per-bar scores (see
+    historical_sentiment). Sweeping ``sentiment_threshold`` needs per-bar sentiment.
+
+    ``workers=0`` runs in this process. Otherwise points are fanned out over a process pool
+    of ``workers`` processes, or through a FileQueue at ``queue_dir`` that this process,
+    ``workers`` spawned worker processes and any others started on the same directory drain.
+    The sweep id is a hash of the grid, the data and the settings. Rerunning a sweep resumes
+    it, and only the points missing from the table are evaluated.
+    """
+    results = results or ResultStore()
+    histories = {t: df for t, df in histories.items() if df is not None and not df.empty}
+    settings = {'holdout': holdout, 'sentiment': sentiment, 'initial_capital': initial_capital,
+                'allow_short': allow_short}
+    points = expand_grid(grid)
+    data = SweepData(histories, holdout, sentiment)
+    if len(set(grid.get('sentiment_threshold', []))) > 1 and data.constant_sentiment:
+        raise ValueError("Sweeping sentiment_threshold needs per-bar sentiment (e.g. historical_sentiment); "
+                         "with one constant score a threshold turns sentiment on or off for every bar at once")
+    # The data key already covers the sentiment, so only its kind is recorded with the settings.
+    sweep_id = _digest([grid, data.key, {k: v for k, v in settings.items() if k != 'sentiment'}])[:16]
+    results.create_sweep(sweep_id, grid, histories,
+                         {**settings, 'sentiment': 'per-bar' if isinstance(sentiment, dict) else sentiment})
+    done = results.completed_points(sweep_id)
+    tasks = [(point_id, point) for point_id, point in enumerate(points) if point_id not in done]
+    logger.info(f"Sweep {sweep_id}: {len(points)} points x {len(histories)} tickers, {len(tasks)} to evaluate")
+    start = time.perf_counter()
+
+    if queue_dir and tasks:
+        queue = FileQueue(queue_dir)
+        queue.publish(sweep_id, histories, settings, tasks)
+        command = [sys.executable, '-m', 'trading_assistant.param_sweep', 'worker', '--queue', queue_dir,
+                   '--results', results.path, '--cache-dir', cache_root or '']
+        processes = [subprocess.Popen(command) for _ in range(workers or 0)]
+        # The coordinator drains the queue alongside its workers (and any started elsewhere).
+        run_worker(queue_dir, results, cache_root)
+        for process in processes:
+            process.wait()
+        while queue.outstanding(sweep_id):
+            requeued = queue.requeue_stale()
+            if requeued:
+                # Tasks left claimed by a worker that died are evaluated here.
+                logger.warning(f"Requeued {requeued} tasks claimed by workers that exited")
+                run_worker(queue_dir, results, cache_root)
+            else:
+                # Workers started elsewhere are still evaluating their claimed points.
+                time.sleep(1.0)
+    elif workers == 0 or len(tasks) <= 1:
+        _init_worker(histories, settings, cache_root)
+        for point_id, point, rows, seconds in _evaluate_chunk(tasks):
+            results.record(sweep_id, point_id, point, rows, seconds)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(histories, settings, cache_root)) as executor:
+            futures = [executor.submit(_evaluate_chunk, chunk) for chunk in _chunks(tasks, max(1, chunk_size))]
+            for future in as_completed(futures):
+                for point_id, point, rows, seconds in future.result():
+                    results.record(sweep_id, point_id, point, rows, seconds)
+
+    logger.info(f"Sweep {sweep_id} finished in {time.perf_counter() - start:.1f}s")
+    return sweep_id, results.summary(sweep_id)
+
+
+def run_worker(queue_dir, results=None, cache_root=SWEEP_CACHE_DIR):
+    """Drains a FileQueue, recording each point's results. Returns the number of points evaluated."""
+    queue = FileQueue(queue_dir)
+    results = results or ResultStore()
+    cache = MemoCache(cache_root)
+    loaded = {}
+    count = 0
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            break
+        name, task = claimed
+        sweep_id = task['sweep_id']
+        if sweep_id not in loaded:
+            payload = queue.sweep_data(sweep_id)
+            settings = payload['settings']
+            loaded[sweep_id] = (SweepData(payload['histories'], settings['holdout'], settings['sentiment']), settings)
+        data, settings = loaded[sweep_id]
+        start = time.perf_counter()
+        rows = evaluate_point(task['point'], data, cache, settings['initial_capital'], settings['allow_short'])
+        results.record(sweep_id, task['point_id'], task['point'], rows, time.perf_counter() - start)
+        queue.done(name)
+        count += 1
+    logger.info(f"Worker {os.getpid()} evaluated {count} points; cache {cache.stats}")
+    return count
+
+
+def _load_histories(args):
+    tickers = [t.strip().upper() for t in args.tickers]
+    if args.replay_dir:
+        from trading_assistant.live_runner import _load_replay_frames
+        return _load_replay_frames(args.replay_dir, tickers)
+    from trading_assistant.data_handler import fetch_historical_data_bulk
+    return fetch_historical_data_bulk(tickers, args.start, args.end or pd.Timestamp.now().strftime('%Y-%m-%d'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parameter sweeps over the trading rules and ML model.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="Run (or resume) a sweep.")
+    run.add_argument('tickers', nargs='+')
+    run.add_argument('--grid', required=True, help="JSON file or string mapping parameter names to value lists.")
+    run.add_argument('--start', default='2018-01-01')
+    run.add_argument('--end')
+    run.add_argument('--replay-dir', help="Read <TICKER>.csv bars from this directory instead of downloading.")
+    run.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (0 runs in-process).")
+    run.add_argument('--queue', help="Distribute through a file queue in this directory instead of a pool.")
+    run.add_argument('--holdout', type=float, default=DEFAULT_HOLDOUT)
+    run.add_argument('--sentiment', default='0',
+                     help="Constant compound score for every bar, or 'news' for per-bar scores from the news store.")
+    run.add_argument('--metric', default='sharpe')
+    worker = commands.add_parser('worker', help="Drain a file queue.")
+    worker.add_argument('--queue', required=True)
+    for command in (run, worker):
+        command.add_argument('--results', default=SWEEP_RESULTS_PATH)
+        command.add_argument('--cache-dir', default=SWEEP_CACHE_DIR)
+    report = commands.add_parser('report', help="Print a sweep's points, best first.")
+    report.add_argument('sweep_id')
+    report.add_argument('--results', default=SWEEP_RESULTS_PATH)
+    report.add_argument('--metric', default='sharpe')
+    report.add_argument('--top', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = ResultStore(args.results)
+    if args.command == 'worker':
+        run_worker(args.queue, results, args.cache_dir or None)
+        return 0
+    if args.command == 'report':
+        print(results.summary(args.sweep_id, args.metric).head(args.top).to_string())
+        return 0
+
+    grid = json.loads(open(args.grid).read() if os.path.exists(args.grid) else args.grid)
+    histories = _load_histories(args)
+    sentiment = historical_sentiment(histories) if args.sentiment == 'news' else float(args.sentiment)
+    try:
+        sweep_id, summary = run_sweep(histories, grid, args.workers, args.queue, results, args.cache_dir or None,
+                                      args.holdout, sentiment)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Sweep {sweep_id}")
+    if not summary.empty:
+        print(summary.sort_values(args.metric, ascending=False).head(20).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
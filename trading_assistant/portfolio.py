@@ -0,0 +1,147 @@
+# trading_assistant/portfolio.py
+
+import numpy as np
+import pandas as pd
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.indicators import atr_array
+from trading_assistant.risk_management import position_sizes, stop_losses, target_profits, atr_stop_losses
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_LIMITS = {
+    'max_position_exposure': 0.10,  # notional of one position / capital
+    'max_sector_exposure': 0.30,    # gross notional of one sector / capital
+    'max_gross_exposure': 1.00,     # gross notional of all positions / capital
+    'max_portfolio_risk': 0.05,     # summed stop-loss risk / capital
+}
+
+
+def volatility_distances(histories, method='atr', length=14):
+    """
+    Latest stop distance in price units for each ticker, from its OHLCV history.
+
+    ``method='atr'`` uses the Average True Range; ``method='std'`` uses the last close times
+    the rolling standard deviation of daily returns. Returns a dict of ticker to distance
+    (NaN when the history is too short).
+    """
+    distances = {}
+    for ticker, df in histories.items():
+        if df is None or len(df) <= length:
+            distances[ticker] = np.nan
+            continue
+        df = flat_ohlcv(df)
+        close = df['Close'].to_numpy(dtype=float)
+        if method == 'atr':
+            distances[ticker] = float(atr_array(df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float),
+                                                close, length)[-1])
+        elif method == 'std':
+            returns = np.diff(close[-(length + 1):]) / close[-(length + 1):-1]
+            distances[ticker] = float(close[-1] * returns.std(ddof=1))
+        else:
+            raise ValueError(f"Unknown volatility method: {method}")
+    return distances
+
+
+def _side_is_long(side):
+    side = np.asarray(side)
+    if side.dtype.kind in 'iuf':
+        return side > 0
+    return np.char.upper(side.astype(str)) == 'BUY'
+
+
+def _scale_groups(notional, groups, cap):
+    """Per-row factors (<= 1) that bring each group's gross notional under ``cap``."""
+    codes, uniques = pd.factorize(groups, use_na_sentinel=False)
+    totals = np.bincount(codes, weights=notional, minlength=len(uniques))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factors = np.where(totals > cap, cap / totals, 1.0)
+    return factors[codes]
+
+
+def allocate(candidates, total_capital, risk_percentage=0.01, reward_ratio=2.0, stop_distances=None,
+             stop_multiplier=2.0, sectors=None, whole_shares=False, **limits):
+    """
+    Sizes every simultaneous signal as one portfolio.
+
+    ``candidates`` is a DataFrame with ``symbol``, ``entry`` and ``side`` ('BUY'/'SELL' or
+    +1/-1) columns, plus optional ``stop`` and ``sector``. Stops come from the ``stop``
+    column, else ``stop_multiplier`` times ``stop_distances[symbol]`` (see
+    volatility_distances), else ``risk_percentage`` of the entry like calculate_stop_loss.
+    Targets sit ``reward_ratio`` stop distances away.
+
+    Each trade first risks ``risk_percentage`` of capital. Quantities are then scaled down
+    (never up) to respect, in order: the per-position cap, the per-sector cap, the gross
+    exposure cap and the total risk budget (see DEFAULT_LIMITS). Returns a copy of
+    ``candidates`` with stop, target, qty, notional, risk and scale columns.
+    """
+    limits = {**DEFAULT_LIMITS, **limits}
+    result = candidates.copy()
+    if result.empty:
+        for column in ('stop', 'target', 'qty', 'notional', 'risk', 'scale'):
+            result[column] = pd.Series(dtype=float)
+        return result
+
+    entry = result['entry'].to_numpy(dtype=float)
+    is_long = _side_is_long(result['side'].to_numpy())
+
+    stop = result['stop'].to_numpy(dtype=float) if 'stop' in result else np.full(len(result), np.nan)
+    if stop_distances is not None:
+        distance = result['symbol'].map(stop_distances).to_numpy(dtype=float)
+        stop = np.where(np.isnan(stop), atr_stop_losses(entry, distance, stop_multiplier, is_long), stop)
+        stop = np.where(stop > 0, stop, np.nan)
+    stop = np.where(np.isnan(stop), stop_losses(entry, risk_percentage, is_long), stop)
+    distance = np.abs(entry - stop)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        target = target_profits(entry, np.where(entry > 0, reward_ratio * distance / entry, 0.0), is_long)
+
+    raw_qty = position_sizes(total_capital, risk_percentage, stop, entry)
+    qty = raw_qty.copy()
+    notional = qty * entry
+
+    position_cap = limits['max_position_exposure'] * total_capital
+    with np.errstate(divide='ignore', invalid='ignore'):
+        qty *= np.where(notional > position_cap, position_cap / notional, 1.0)
+
+    if sectors is not None and 'sector' not in result:
+        result['sector'] = result['symbol'].map(sectors)
+    if 'sector' in result:
+        result['sector'] = result['sector'].fillna('Unknown')
+        qty *= _scale_groups(qty * entry, result['sector'].to_numpy(), limits['max_sector_exposure'] * total_capital)
+
+    gross = float(np.sum(qty * entry))
+    gross_cap = limits['max_gross_exposure'] * total_capital
+    if gross > gross_cap:
+        qty *= gross_cap / gross
+
+    total_risk = float(np.sum(qty * distance))
+    risk_cap = limits['max_portfolio_risk'] * total_capital
+    if total_risk > risk_cap:
+        qty *= risk_cap / total_risk
+
+    if whole_shares:
+        qty = np.floor(qty)
+
+    result['stop'] = stop
+    result['target'] = target
+    result['qty'] = qty
+    result['notional'] = qty * entry
+    result['risk'] = qty * distance
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['scale'] = np.where(raw_qty > 0, qty / raw_qty, 0.0)
+    logger.info(f"Allocated {int(np.count_nonzero(qty))} of {len(result)} trades: "
+                f"gross {result['notional'].sum():,.0f}, risk {result['risk'].sum():,.0f}")
+    return result
+
+
+def exposure_summary(allocation, total_capital):
+    """Gross, net and per-sector exposure of an allocation, as fractions of capital."""
+    signed = np.where(_side_is_long(allocation['side'].to_numpy()), 1.0, -1.0) * allocation['notional'].to_numpy()
+    summary = {
+        'gross': float(np.sum(np.abs(signed)) / total_capital),
+        'net': float(np.sum(signed) / total_capital),
+        'risk': float(allocation['risk'].sum() / total_capital),
+    }
+    if 'sector' in allocation:
+        summary['sectors'] = (allocation.groupby('sector')['notional'].sum() / total_capital).to_dict()
+    return summary
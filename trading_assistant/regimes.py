@@ -0,0 +1,159 @@
+# trading_assistant/regimes.py
+
+import numpy as np
+import pandas as pd
+from trading_assistant.bars import flat_ohlcv
+from trading_assistant.indicators import indicator_arrays
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Category order fixes the int8 codes: 0 Undetermined, 1 Trending Up, 2 Trending Down, 3 Range-Bound.
+REGIMES = ('Undetermined', 'Trending Up', 'Trending Down', 'Range-Bound')
+UNDETERMINED, TRENDING_UP, TRENDING_DOWN, RANGE_BOUND = range(len(REGIMES))
+MISSING = -1  # no bar for that ticker on that date
+REGIME_DTYPE = pd.CategoricalDtype(REGIMES)
+
+RSI_RANGE = (40, 60)
+SMA_RANGE_BAND = 0.02
+PANEL_COLUMNS = ('Close', 'SMA_20', 'SMA_50', 'MACDH_12_26_9', 'RSI_14')
+
+
+def _zero_nan(values):
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), 0.0, values)
+
+
+def classify_regimes(close, sma_fast, sma_slow, macd_hist=None, rsi=None):
+    """
+    Vectorized determine_market_personality: classifies every element of equally shaped (or
+    broadcastable) arrays, e.g. one value per ticker or a (date x ticker) panel.
+
+    Returns int8 codes indexing REGIMES. NaN SMAs count as 0 and a trend needs the MACD
+    histogram to agree when it is given, exactly like the per-ticker function.
+    """
+    close = np.asarray(close, dtype=float)
+    sma_fast = _zero_nan(sma_fast)
+    sma_slow = _zero_nan(sma_slow)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        up = (sma_fast > sma_slow) & (close > sma_fast)
+        down = (sma_fast < sma_slow) & (close < sma_fast)
+        if macd_hist is not None:
+            macd_hist = np.asarray(macd_hist, dtype=float)
+            up &= macd_hist > 0
+            down &= macd_hist < 0
+        ranging = np.zeros(up.shape, dtype=bool)
+        if rsi is not None:
+            rsi = np.asarray(rsi, dtype=float)
+            ranging = (rsi > RSI_RANGE[0]) & (rsi < RSI_RANGE[1]) & \
+                (np.abs(sma_fast - sma_slow) / sma_slow < SMA_RANGE_BAND)
+
+    codes = np.full(up.shape, UNDETERMINED, dtype=np.int8)
+    codes[ranging] = RANGE_BOUND
+    codes[up] = TRENDING_UP
+    codes[down] = TRENDING_DOWN
+    return codes
+
+
+def regime_labels(codes):
+    """Wraps int8 regime codes in a pandas Categorical (MISSING becomes NaN)."""
+    return pd.Categorical.from_codes(np.asarray(codes).ravel(), dtype=REGIME_DTYPE)
+
+
+def _indicator_columns(df, dtype):
+    """The PANEL_COLUMNS of one history, reusing indicator columns already on the frame."""
+    df = flat_ohlcv(df)
+    close = df['Close'].to_numpy(dtype=float)
+    computed = None
+    columns = {}
+    for column in PANEL_COLUMNS:
+        if column in df.columns:
+            columns[column] = df[column].to_numpy(dtype=dtype)
+        else:
+            if computed is None:
+                computed = indicator_arrays(close, dtype=dtype)
+            columns[column] = computed[column]
+    return columns
+
+
+def indicator_panel(histories, dtype=np.float64):
+    """
+    Aligns a dict of ticker to OHLCV (or indicator) frames on the union of their dates.
+
+    Returns ``(dates, tickers, panel)`` where panel maps each of PANEL_COLUMNS to a
+    (date x ticker) array, NaN where a ticker has no bar. ``dtype=np.float32`` halves its size.
+    """
+    histories = {t: df for t, df in histories.items() if df is not None and not df.empty}
+    tickers = list(histories)
+    dates = pd.DatetimeIndex([])
+    for df in histories.values():
+        dates = dates.union(pd.DatetimeIndex(df.index))
+    panel = {column: np.full((len(dates), len(tickers)), np.nan, dtype=dtype) for column in PANEL_COLUMNS}
+    for j, ticker in enumerate(tickers):
+        rows = dates.get_indexer(histories[ticker].index)
+        for column, values in _indicator_columns(histories[ticker], dtype).items():
+            panel[column][rows, j] = values
+    return dates, tickers, panel
+
+
+def _classify_panel(panel):
+    return classify_regimes(panel['Close'], panel['SMA_20'], panel['SMA_50'], panel['MACDH_12_26_9'],
+                            panel['RSI_14'])
+
+
+def latest_regimes(histories):
+    """
+    Market personality of every ticker's final bar in one pass, as a categorical Series
+    indexed by ticker. Matches determine_market_personality ticker by ticker.
+    """
+    tickers, latest = [], {column: [] for column in PANEL_COLUMNS}
+    for ticker, df in histories.items():
+        if df is None or df.empty:
+            continue
+        tickers.append(ticker)
+        for column, values in _indicator_columns(df, np.float64).items():
+            latest[column].append(values[-1])
+    codes = _classify_panel({column: np.array(values, dtype=float) for column, values in latest.items()})
+    return pd.Series(regime_labels(codes), index=pd.Index(tickers, name='ticker'), name='regime')
+
+
+def regime_map(histories, dtype=np.float64):
+    """
+    Daily regime of every ticker: a (date x ticker) DataFrame of categorical columns
+    (one byte per cell). Dates before a ticker's first bar, or missing bars, are NaN.
+    """
+    dates, tickers, panel = indicator_panel(histories, dtype)
+    codes = _classify_panel(panel)
+    codes[np.isnan(panel['Close'])] = MISSING
+    logger.info(f"Classified {codes.size} ticker-days for {len(tickers)} tickers")
+    return pd.DataFrame({ticker: pd.Categorical.from_codes(codes[:, j], dtype=REGIME_DTYPE)
+                         for j, ticker in enumerate(tickers)}, index=dates)
+
+
+def regime_codes(regimes):
+    """The (date x ticker) int8 code array behind a regime_map frame."""
+    if regimes.empty:
+        return np.empty(regimes.shape, dtype=np.int8)
+    return np.column_stack([regimes[column].cat.codes.to_numpy() for column in regimes.columns])
+
+
+def regime_transitions(regimes):
+    """
+    Regime changes in a regime_map frame: one row per (date, ticker) whose regime differs
+    from its previous bar, with ``from`` and ``to`` categorical columns, sorted by date.
+    Missing bars are skipped over rather than reported as transitions.
+    """
+    codes = regime_codes(regimes)
+    # Carry the last known regime across missing bars so gaps don't register as changes.
+    valid = codes != MISSING
+    last_valid = np.where(valid, np.arange(len(codes))[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    filled = np.take_along_axis(codes, last_valid, axis=0)
+    previous = np.vstack([np.full((1, codes.shape[1]), MISSING, dtype=np.int8), filled[:-1]])
+    rows, cols = np.nonzero(valid & (previous != MISSING) & (codes != previous))
+    return pd.DataFrame({
+        'date': regimes.index[rows],
+        'ticker': regimes.columns[cols],
+        'from': pd.Categorical.from_codes(previous[rows, cols], dtype=REGIME_DTYPE),
+        'to': pd.Categorical.from_codes(codes[rows, cols], dtype=REGIME_DTYPE),
+    })
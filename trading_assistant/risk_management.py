@@ -1,5 +1,6 @@
 # trading_assistant/risk_management.py
 
+import numpy as np
 from trading_assistant.utils import get_logger
 
 logger = get_logger(__name__)
@@ -82,3 +83,47 @@ def calculate_target_profit(entry_price: float, target_profit_factor: float, is_
     except Exception as e:
         logger.error(f"Error calculating target profit: {e}")
         return 0
+
+def position_sizes(total_capital, risk_percentage, stop_loss_prices, entry_prices):
+    """
+    Array version of calculate_position_size: shares for many trades in one call.
+
+    ``risk_percentage`` may be a scalar or an array. Trades the scalar function would reject
+    (non-positive prices, stop equal to entry, risk outside (0, 1]) get 0 shares.
+    """
+    stop = np.asarray(stop_loss_prices, dtype=float)
+    entry = np.asarray(entry_prices, dtype=float)
+    risk = np.broadcast_to(np.asarray(risk_percentage, dtype=float), entry.shape)
+    risk_per_share = np.abs(entry - stop)
+    valid = (total_capital > 0) & (risk > 0) & (risk <= 1) & (stop > 0) & (entry > 0) & (risk_per_share > 0)
+    shares = np.zeros(entry.shape)
+    np.divide(total_capital * risk, risk_per_share, out=shares, where=valid)
+    rejected = int(np.size(valid) - np.count_nonzero(valid))
+    if rejected:
+        logger.warning(f"{rejected} of {np.size(valid)} trades could not be sized.")
+    return shares
+
+def stop_losses(entry_prices, risk_tolerance, is_long=True):
+    """
+    Array version of calculate_stop_loss. Tolerances in (0, 1) are fractions of the entry
+    price, others are absolute price distances; invalid inputs give 0.
+    """
+    entry = np.asarray(entry_prices, dtype=float)
+    tolerance = np.broadcast_to(np.asarray(risk_tolerance, dtype=float), entry.shape)
+    direction = np.where(np.broadcast_to(is_long, entry.shape), -1.0, 1.0)
+    distance = np.where((tolerance > 0) & (tolerance < 1), entry * tolerance, tolerance)
+    return np.where((entry > 0) & (tolerance >= 0), entry + direction * distance, 0.0)
+
+def target_profits(entry_prices, target_profit_factor, is_long=True):
+    """Array version of calculate_target_profit; invalid inputs give 0."""
+    entry = np.asarray(entry_prices, dtype=float)
+    factor = np.broadcast_to(np.asarray(target_profit_factor, dtype=float), entry.shape)
+    direction = np.where(np.broadcast_to(is_long, entry.shape), 1.0, -1.0)
+    return np.where((entry > 0) & (factor > 0), entry * (1 + direction * factor), 0.0)
+
+def atr_stop_losses(entry_prices, atr, multiplier=2.0, is_long=True):
+    """Stops placed ``multiplier`` ATRs (or any per-trade volatility distance) away from entry."""
+    entry = np.asarray(entry_prices, dtype=float)
+    distance = multiplier * np.asarray(atr, dtype=float)
+    direction = np.where(np.broadcast_to(is_long, entry.shape), -1.0, 1.0)
+    return np.where((entry > 0) & (distance > 0), entry + direction * distance, 0.0)
@@ -0,0 +1,263 @@
+# trading_assistant/sentiment.py
+
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import timed, increment
+from trading_assistant.config import SENTIMENT_CACHE_PATH, SENTIMENT_CACHE_SIZE, NEWS_LOOKBACK_DAYS
+
+logger = get_logger(__name__)
+
+SCORE_KEYS = ('neg', 'neu', 'pos', 'compound')
+DEFAULT_HALF_LIFE_HOURS = 24.0
+VADER_LEXICON = 'sentiment/vader_lexicon.zip'
+
+
+def ensure_vader_lexicon(download=True):
+    """
+    Makes sure the VADER lexicon is installed, downloading it when ``download`` is True.
+
+    This is the explicit provisioning step (``python -m trading_assistant.sentiment``); nothing
+    downloads at import time. Returns True when the lexicon is available.
+    """
+    import nltk
+    try:
+        nltk.data.find(VADER_LEXICON)
+        return True
+    except LookupError:
+        if not download:
+            return False
+    logger.info("Downloading the VADER lexicon")
+    try:
+        if nltk.download('vader_lexicon', quiet=True):
+            return True
+    except Exception as e:
+        logger.error(f"Failed to download vader_lexicon: {e}")
+        return False
+    logger.error("Failed to download vader_lexicon.")
+    return False
+
+
+def headline_key(headline):
+    """Content hash used to cache a headline's scores."""
+    return hashlib.sha1(" ".join(headline.split()).encode('utf-8')).hexdigest()
+
+
+class SentimentService:
+    """
+    Scores headlines with a single shared VADER analyzer.
+
+    Scores are cached by content hash in an in-memory LRU and, when ``cache_path`` is set,
+    in a SQLite table so repeated wire headlines are only scored once across tickers,
+    refreshes and processes.
+    """
+
+    def __init__(self, cache_size=SENTIMENT_CACHE_SIZE, cache_path=SENTIMENT_CACHE_PATH):
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self._analyzer = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            with self._lock:
+                if self._analyzer is None:
+                    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                    logger.info("Loading VADER sentiment analyzer")
+                    try:
+                        self._analyzer = SentimentIntensityAnalyzer()
+                    except LookupError:
+                        logger.error("VADER lexicon is not installed; run `python -m trading_assistant.sentiment`.")
+                        raise
+        return self._analyzer
+
+    def _connection(self):
+        if self._db is None and self.cache_path:
+            self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS headline_scores "
+                "(key TEXT PRIMARY KEY, neg REAL, neu REAL, pos REAL, compound REAL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key, scores):
+        self._memory[key] = scores
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.cache_size:
+            self._memory.popitem(last=False)
+
+    def _load_from_disk(self, keys):
+        db = self._connection()
+        if db is None or not keys:
+            return {}
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = db.execute(
+                f"SELECT key, neg, neu, pos, compound FROM headline_scores WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, *values in rows:
+                found[key] = dict(zip(SCORE_KEYS, values))
+        return found
+
+    def _store_on_disk(self, scored):
+        db = self._connection()
+        if db is None or not scored:
+            return
+        db.executemany(
+            "INSERT OR REPLACE INTO headline_scores VALUES (?, ?, ?, ?, ?)",
+            [(key, *(scores[k] for k in SCORE_KEYS)) for key, scores in scored.items()],
+        )
+        db.commit()
+
+    @timed('sentiment')
+    def analyze_sentiments(self, headlines):
+        """
+        Scores a batch of headlines, returning one VADER score dict per input in order.
+
+        Invalid headlines get ``{"error": ...}`` like analyze_sentiment.
+        """
+        keys = [headline_key(h) if isinstance(h, str) and h.strip() else None for h in headlines]
+        results = {}
+        with self._lock:
+            for key in keys:
+                if key is not None and key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[key] = self._memory[key]
+
+        missing = {key for key in keys if key is not None and key not in results}
+        if missing:
+            with self._lock:
+                from_disk = self._load_from_disk(missing)
+                for key, scores in from_disk.items():
+                    self._remember(key, scores)
+            results.update(from_disk)
+            missing -= from_disk.keys()
+
+        if missing:
+            scored = {}
+            for headline, key in zip(headlines, keys):
+                if key in missing and key not in scored:
+                    try:
+                        scored[key] = self.analyzer.polarity_scores(headline)
+                    except Exception as e:
+                        logger.error(f"Error analyzing sentiment for headline '{headline}': {e}")
+                        results[key] = {"error": str(e)}
+            with self._lock:
+                for key, scores in scored.items():
+                    self._remember(key, scores)
+                self._store_on_disk(scored)
+            results.update(scored)
+            logger.info("Scored %d new headlines (%d served from cache)", len(scored), len(keys) - len(scored))
+            increment('sentiment_headlines', len(scored), result='scored')
+
+        return [dict(results[key]) if key is not None else {"error": "Invalid input headline"} for key in keys]
+
+    def analyze_sentiment(self, headline):
+        """Scores a single headline."""
+        return self.analyze_sentiments([headline])[0]
+
+    def clear(self):
+        """Empties the in-memory cache."""
+        with self._lock:
+            self._memory.clear()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_sentiment_service():
+    """Returns the process-wide sentiment service."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SentimentService()
+    return _service
+
+
+def analyze_sentiments(headlines):
+    """Scores a batch of headlines with the shared service."""
+    return get_sentiment_service().analyze_sentiments(headlines)
+
+
+def aggregate_sentiment(articles, half_life_hours=DEFAULT_HALF_LIFE_HOURS, now=None):
+    """
+    Time-decayed compound score for a list of Finnhub news articles.
+
+    Each article's weight halves every ``half_life_hours`` since its ``datetime`` (unix seconds).
+    Returns ``{'compound': ..., 'count': ..., 'weight': ...}``; compound is 0 with no articles.
+    """
+    articles = [a for a in articles or [] if isinstance(a, dict) and a.get('headline')]
+    if not articles:
+        return {'compound': 0, 'count': 0, 'weight': 0.0}
+
+    now = time.time() if now is None else now
+    scores = analyze_sentiments([a['headline'] for a in articles])
+    total = weight_sum = 0.0
+    count = 0
+    for article, scores in zip(articles, scores):
+        if 'compound' not in scores:
+            continue
+        age_hours = max(0.0, (now - float(article.get('datetime') or now)) / 3600.0)
+        weight = 0.5 ** (age_hours / half_life_hours)
+        total += weight * scores['compound']
+        weight_sum += weight
+        count += 1
+    return {
+        'compound': total / weight_sum if weight_sum > 0 else 0,
+        'count': count,
+        'weight': weight_sum,
+    }
+
+
+def sentiment_history(articles, times, half_life_hours=DEFAULT_HALF_LIFE_HOURS, lookback_days=NEWS_LOOKBACK_DAYS):
+    """
+    aggregate_sentiment as it stood at each of ``times`` (unix seconds): the time-decayed
+    compound score of the articles published before that time and within ``lookback_days``.
+    Headlines are scored once. Returns a float array, 0 where no articles qualify.
+    """
+    import numpy as np
+    times = np.asarray(times, dtype=float)
+    history = np.zeros(len(times))
+    articles = [a for a in articles or [] if isinstance(a, dict) and a.get('headline') and a.get('datetime')]
+    scored = [(float(a['datetime']), scores['compound'])
+              for a, scores in zip(articles, analyze_sentiments([a['headline'] for a in articles]))
+              if 'compound' in scores]
+    if not scored:
+        return history
+
+    published, compound = (np.array(values) for values in zip(*sorted(scored)))
+    first = np.searchsorted(published, times - lookback_days * 86400.0)
+    last = np.searchsorted(published, times)
+    for i in np.flatnonzero(last > first):
+        window = slice(first[i], last[i])
+        weight = 0.5 ** ((times[i] - published[window]) / 3600.0 / half_life_hours)
+        history[i] = weight @ compound[window] / weight.sum()
+    return history
+
+
+def aggregate_sentiment_by_ticker(news_by_ticker, half_life_hours=DEFAULT_HALF_LIFE_HOURS, now=None):
+    """
+    Time-decayed sentiment per ticker. Headlines shared across tickers are scored once.
+    """
+    all_headlines = [a['headline'] for articles in news_by_ticker.values() for a in articles or []
+                     if isinstance(a, dict) and a.get('headline')]
+    analyze_sentiments(all_headlines)
+    return {ticker: aggregate_sentiment(articles, half_life_hours, now)
+            for ticker, articles in news_by_ticker.items()}
+
+
+if __name__ == "__main__":
+    sys.exit(0 if ensure_vader_lexicon() else 1)
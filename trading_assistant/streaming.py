@@ -0,0 +1,478 @@
+# trading_assistant/streaming.py
+
+import argparse
+import asyncio
+import inspect
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+from trading_assistant.utils import get_logger
+from trading_assistant.instrumentation import increment
+from trading_assistant.config import FINNHUB_API_KEY, FINNHUB_WS_URL
+
+logger = get_logger(__name__)
+
+BAR_FIELDS = ('timestamp', 'Open', 'High', 'Low', 'Close', 'Volume')
+DEFAULT_INTERVALS = (60, 300)
+DROP_POLICIES = ('drop_oldest', 'drop_newest')
+# Trades reach the socket shortly after their timestamp, so bars are closed on the source's
+# clock only this many seconds after their interval ends.
+CLOCK_GRACE = 2.0
+
+
+def parse_trades(message):
+    """
+    Ticks from one Finnhub websocket message as ``(symbol, price, volume, unix_seconds)``
+    tuples. Pings and other message types yield an empty list.
+    """
+    payload = json.loads(message) if isinstance(message, (str, bytes)) else message
+    if payload.get('type') != 'trade':
+        return []
+    return [(trade['s'], float(trade['p']), float(trade.get('v') or 0.0), trade['t'] / 1000.0)
+            for trade in payload.get('data') or []]
+
+
+class BarRing:
+    """
+    Completed bars per symbol in fixed-capacity ring buffers, preallocated as one
+    ``(symbols, capacity, 6)`` array of BAR_FIELDS. The oldest bars are overwritten.
+    """
+
+    def __init__(self, symbols, capacity=1024):
+        self.symbols = list(symbols)
+        self.capacity = capacity
+        self._slots = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._data = np.full((len(self.symbols), capacity, len(BAR_FIELDS)), np.nan)
+        self._counts = np.zeros(len(self.symbols), dtype=np.int64)
+
+    def append(self, symbol, bar):
+        slot = self._slots[symbol]
+        self._data[slot, self._counts[slot] % self.capacity] = bar
+        self._counts[slot] += 1
+
+    def size(self, symbol):
+        return int(min(self._counts[self._slots[symbol]], self.capacity))
+
+    def latest(self, symbol, n=None):
+        """The last ``n`` (default: all retained) bars of a symbol, oldest first, as a copy."""
+        slot = self._slots[symbol]
+        count = int(self._counts[slot])
+        n = self.size(symbol) if n is None else min(n, self.size(symbol))
+        positions = np.arange(count - n, count) % self.capacity
+        return self._data[slot, positions]
+
+    def to_frame(self, symbol, n=None):
+        """The retained bars of a symbol as an OHLCV DataFrame indexed by bar start (UTC)."""
+        bars = self.latest(symbol, n)
+        index = pd.DatetimeIndex(pd.to_datetime(bars[:, 0], unit='s'), name='Date')
+        return pd.DataFrame(bars[:, 1:], index=index, columns=BAR_FIELDS[1:])
+
+
+class BarAggregator:
+    """
+    Builds OHLCV bars of ``interval`` seconds from ticks, in event time.
+
+    A bar completes when a tick for a later interval arrives or when ``flush`` is called with
+    a watermark past its end. Ticks older than the symbol's forming bar, or falling in a bar
+    it already closed, are counted in ``late_ticks`` and dropped.
+    """
+
+    def __init__(self, symbols, interval=60, capacity=1024):
+        self.interval = int(interval)
+        self.ring = BarRing(symbols, capacity)
+        self._forming = {}
+        # Start of the last bar closed per symbol; a closed bar is never reopened.
+        self._closed = {}
+        self._flushed_to = None
+        self.late_ticks = 0
+
+    def add(self, symbol, price, volume, timestamp):
+        """Adds a tick. Returns the bar it completed as a BAR_FIELDS tuple, or None."""
+        start = timestamp - timestamp % self.interval
+        bar = self._forming.get(symbol)
+        if bar is not None and start == bar[0]:
+            if price > bar[2]:
+                bar[2] = price
+            if price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += volume
+            return None
+        if (bar is not None and start < bar[0]) or start <= self._closed.get(symbol, -np.inf):
+            self.late_ticks += 1
+            return None
+        completed = self._close(symbol) if bar is not None else None
+        self._forming[symbol] = [start, price, price, price, price, volume]
+        return completed
+
+    def _close(self, symbol):
+        bar = tuple(self._forming.pop(symbol))
+        self._closed[symbol] = bar[0]
+        self.ring.append(symbol, bar)
+        return bar
+
+    def flush(self, watermark=None):
+        """
+        Completes every forming bar whose interval ended at or before ``watermark`` (unix
+        seconds), or all of them when it is None. Returns ``(symbol, bar)`` pairs.
+        """
+        if watermark is not None:
+            # Bars end on interval boundaries, so nothing new can complete until one is crossed.
+            boundary = watermark - watermark % self.interval
+            if self._flushed_to is not None and boundary <= self._flushed_to:
+                return []
+            self._flushed_to = boundary
+        closing = [symbol for symbol, bar in self._forming.items()
+                   if watermark is None or bar[0] + self.interval <= watermark]
+        return [(symbol, self._close(symbol)) for symbol in closing]
+
+    def forming(self, symbol):
+        bar = self._forming.get(symbol)
+        return tuple(bar) if bar is not None else None
+
+
+class Subscription:
+    """
+    A bar subscriber with its own bounded queue, so a slow consumer never blocks ingestion.
+
+    When the queue is full, ``drop_oldest`` discards the oldest queued bar and ``drop_newest``
+    the incoming one; either way ``dropped`` is incremented.
+    """
+
+    def __init__(self, handler, name=None, intervals=None, maxsize=256, policy='drop_oldest'):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.handler = handler
+        self.name = name or getattr(handler, '__qualname__', repr(handler))
+        self.intervals = set(intervals) if intervals else None
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def wants(self, interval):
+        return self.intervals is None or interval in self.intervals
+
+    def offer(self, bar):
+        try:
+            self.queue.put_nowait(bar)
+            return
+        except asyncio.QueueFull:
+            pass
+        self.dropped += 1
+        increment('stream_bars_dropped', subscriber=self.name)
+        if self.policy == 'drop_oldest':
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.queue.put_nowait(bar)
+
+    async def consume(self):
+        while True:
+            bar = await self.queue.get()
+            try:
+                result = self.handler(bar)
+                if inspect.isawaitable(result):
+                    await result
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Bar subscriber {self.name} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        return {'delivered': self.delivered, 'dropped': self.dropped, 'errors': self.errors,
+                'queued': self.queue.qsize()}
+
+
+class StreamIngestor:
+    """
+    Turns a tick source into completed OHLCV bars for several intervals at once and fans
+    them out to subscribers (indicators, decision logic, UI).
+
+    ``source`` is an async iterable of tick batches, e.g. FinnhubTradeStream or
+    ReplayTickStream. Bars are published as dicts with ``symbol``, ``interval`` and
+    BAR_FIELDS, and the last ``capacity`` bars per symbol stay available through ``bars``.
+    """
+
+    def __init__(self, symbols, source, intervals=DEFAULT_INTERVALS, capacity=1024):
+        self.symbols = list(symbols)
+        self.source = source
+        self.aggregators = {int(interval): BarAggregator(self.symbols, interval, capacity) for interval in intervals}
+        self.subscriptions = []
+        self.watermark = None
+        self._known = set(self.symbols)
+        self.stats = {'ticks': 0, 'unknown_ticks': 0, 'bars': 0}
+
+    def subscribe(self, handler, intervals=None, maxsize=256, policy='drop_oldest', name=None):
+        """Registers ``handler(bar)`` (sync or async) for bars of ``intervals`` (default: all)."""
+        subscription = Subscription(handler, name, intervals, maxsize, policy)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def bars(self, symbol, interval=None, n=None):
+        """Completed bars of a symbol as an OHLCV DataFrame (default: the shortest interval)."""
+        interval = min(self.aggregators) if interval is None else interval
+        return self.aggregators[interval].ring.to_frame(symbol, n)
+
+    def _publish(self, symbol, interval, bar):
+        self.stats['bars'] += 1
+        event = None
+        for subscription in self.subscriptions:
+            if subscription.wants(interval):
+                if event is None:
+                    event = dict(zip(BAR_FIELDS, bar), symbol=symbol, interval=interval)
+                    event['timestamp'] = pd.Timestamp(bar[0], unit='s')
+                subscription.offer(event)
+
+    def ingest(self, ticks):
+        """Aggregates a batch of ``(symbol, price, volume, unix_seconds)`` ticks."""
+        for symbol, price, volume, timestamp in ticks:
+            if symbol not in self._known:
+                self.stats['unknown_ticks'] += 1
+                continue
+            self.stats['ticks'] += 1
+            if self.watermark is None or timestamp > self.watermark:
+                self.watermark = timestamp
+            for interval, aggregator in self.aggregators.items():
+                completed = aggregator.add(symbol, price, volume, timestamp)
+                if completed is not None:
+                    self._publish(symbol, interval, completed)
+        increment('stream_ticks', len(ticks))
+
+    def flush(self, watermark=None):
+        """Completes bars whose interval ended before ``watermark`` (all bars when None)."""
+        for interval, aggregator in self.aggregators.items():
+            for symbol, bar in aggregator.flush(watermark):
+                self._publish(symbol, interval, bar)
+
+    async def _consume(self, until):
+        async for ticks in self.source:
+            self.ingest(ticks)
+            # Quiet symbols still get their bars closed once the stream moves past them; the
+            # watermark is shared across symbols, so other symbols' trades get the same grace.
+            if self.watermark is not None:
+                self.flush(self.watermark - CLOCK_GRACE)
+            # Let subscribers run between batches.
+            await asyncio.sleep(0)
+            if until is not None and until():
+                return
+
+    async def _timer(self, until, tick):
+        clock = getattr(self.source, 'clock', None)
+        while True:
+            await asyncio.sleep(tick)
+            now = clock() if clock is not None else None
+            if now is not None:
+                self.flush(now - CLOCK_GRACE)
+            if until is not None and until():
+                return
+
+    async def run(self, until=None, tick=1.0):
+        """
+        Consumes the source until it ends or ``until()`` returns True, then completes the
+        forming bars and waits for subscribers to drain their queues. Returns ``metrics()``.
+
+        A timer also checks ``until`` every ``tick`` seconds and closes bars whose interval
+        has passed on the source's ``clock()`` (when it has one), so deadlines and bar
+        closes do not wait for the next trade on a quiet socket.
+        """
+        tasks = [asyncio.create_task(subscription.consume()) for subscription in self.subscriptions]
+        consumer = asyncio.create_task(self._consume(until))
+        timer = asyncio.create_task(self._timer(until, tick))
+        try:
+            await asyncio.wait((consumer, timer), return_when=asyncio.FIRST_COMPLETED)
+            for task in (consumer, timer):
+                task.cancel()
+            await asyncio.gather(consumer, timer, return_exceptions=True)
+            for task in (consumer, timer):
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+            self.flush()
+            for subscription in self.subscriptions:
+                await subscription.queue.join()
+        finally:
+            tasks += [consumer, timer]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self.metrics()
+
+    def metrics(self):
+        return {
+            **self.stats,
+            'late_ticks': sum(a.late_ticks for a in self.aggregators.values()),
+            'subscribers': {s.name: s.stats() for s in self.subscriptions},
+        }
+
+
+class FinnhubTradeStream:
+    """
+    Finnhub's trade websocket as an async iterable of tick batches.
+
+    Subscribes to every symbol on connect and reconnects with exponential backoff when the
+    connection drops. With ``record_path`` set, raw messages are appended to a JSONL file
+    that ReplayTickStream.from_jsonl can replay.
+    """
+
+    def __init__(self, symbols, api_key=FINNHUB_API_KEY, url=FINNHUB_WS_URL, record_path=None,
+                 backoff=1.0, max_backoff=60.0):
+        self.symbols = list(symbols)
+        self.api_key = api_key
+        self.url = url
+        self.record_path = record_path
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reconnects = 0
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def clock(self):
+        """Current event time: trade timestamps are wall-clock time."""
+        return time.time()
+
+    async def __aiter__(self):
+        import aiohttp
+        record = open(self.record_path, 'a') if self.record_path else None
+        attempt = 0
+        try:
+            while not self.closed:
+                try:
+                    async with aiohttp.ClientSession() as session:
+                        async with session.ws_connect(f"{self.url}?token={self.api_key or ''}", heartbeat=30) as ws:
+                            for symbol in self.symbols:
+                                await ws.send_json({'type': 'subscribe', 'symbol': symbol})
+                            logger.info(f"Subscribed to trades for {len(self.symbols)} symbols")
+                            attempt = 0
+                            async for message in ws:
+                                if message.type != aiohttp.WSMsgType.TEXT:
+                                    if message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                        break
+                                    continue
+                                if record is not None:
+                                    record.write(message.data.rstrip('\n') + '\n')
+                                ticks = parse_trades(message.data)
+                                if ticks:
+                                    yield ticks
+                                if self.closed:
+                                    return
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Finnhub websocket error: {e}")
+                if self.closed:
+                    return
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                attempt += 1
+                self.reconnects += 1
+                increment('stream_reconnects')
+                logger.warning(f"Finnhub websocket disconnected; reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        finally:
+            if record is not None:
+                record.close()
+
+
+class ReplayTickStream:
+    """
+    Local stand-in for FinnhubTradeStream: replays tick batches, as fast as possible or
+    paced by their timestamps at ``speed`` times real time.
+    """
+
+    def __init__(self, batches, speed=None):
+        self.batches = batches
+        self.speed = speed
+        self._replayed = None
+
+    def clock(self):
+        """
+        Current event time of a paced replay (the last replayed tick plus scaled elapsed
+        time), or None when replaying as fast as possible.
+        """
+        if not self.speed or self._replayed is None:
+            return None
+        timestamp, yielded_at = self._replayed
+        return timestamp + (time.monotonic() - yielded_at) * self.speed
+
+    @classmethod
+    def from_jsonl(cls, path, speed=None):
+        """Replays websocket messages recorded by FinnhubTradeStream(record_path=...)."""
+        with open(path) as f:
+            batches = [ticks for ticks in (parse_trades(line) for line in f if line.strip()) if ticks]
+        return cls(batches, speed)
+
+    @classmethod
+    def from_frames(cls, frames, ticks_per_bar=4, batch_size=1, speed=None):
+        """
+        Synthesizes ticks from OHLCV frames: each bar becomes Open, High, Low, Close ticks
+        (extra ticks repeat the close) spread across the bar, with its volume split evenly.
+        Symbols are interleaved in time order.
+        """
+        ticks = []
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+            starts = pd.DatetimeIndex(df.index).as_unit('s').asi8.astype(float)
+            width = float(np.median(np.diff(starts))) if len(starts) > 1 else 60.0
+            prices = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)
+            prices = np.hstack([prices, np.repeat(prices[:, 3:], max(0, ticks_per_bar - 4), axis=1)])[:, :ticks_per_bar]
+            volume = df['Volume'].to_numpy(dtype=float) / ticks_per_bar
+            offsets = np.arange(ticks_per_bar) * width / ticks_per_bar
+            for start, row, vol in zip(starts, prices, volume):
+                ticks.extend((symbol, float(price), float(vol), float(start + offset)) for price, offset in zip(row, offsets))
+        ticks.sort(key=lambda tick: tick[3])
+        return cls([ticks[i:i + batch_size] for i in range(0, len(ticks), batch_size)], speed)
+
+    async def __aiter__(self):
+        previous = None
+        for ticks in self.batches:
+            if self.speed and previous is not None:
+                await asyncio.sleep(max(0.0, (ticks[0][3] - previous) / self.speed))
+            previous = ticks[0][3]
+            self._replayed = (ticks[-1][3], time.monotonic())
+            yield ticks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream trades and print completed bars as JSON lines.")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--intervals', type=int, nargs='+', default=list(DEFAULT_INTERVALS),
+                        help="Bar sizes in seconds.")
+    parser.add_argument('--duration', type=float, help="Stop after this many seconds.")
+    parser.add_argument('--record', help="Append raw websocket messages to this JSONL file.")
+    parser.add_argument('--replay', help="Replay a recorded JSONL file instead of connecting.")
+    parser.add_argument('--speed', type=float, help="Replay pacing, as a multiple of real time.")
+    args = parser.parse_args(argv)
+    symbols = [s.upper() for s in args.symbols]
+
+    if args.replay:
+        source = ReplayTickStream.from_jsonl(args.replay, speed=args.speed)
+    else:
+        source = FinnhubTradeStream(symbols, record_path=args.record)
+    ingestor = StreamIngestor(symbols, source, intervals=args.intervals)
+
+    def print_bar(bar):
+        print(json.dumps({**bar, 'timestamp': bar['timestamp'].isoformat()}), flush=True)
+    ingestor.subscribe(print_bar, name='stdout')
+
+    async def _run():
+        if args.duration:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + args.duration
+            return await ingestor.run(until=lambda: loop.time() >= deadline)
+        return await ingestor.run()
+
+    try:
+        metrics = asyncio.run(_run())
+    except KeyboardInterrupt:
+        # asyncio.run cancels the loop on Ctrl-C and discards its result.
+        metrics = ingestor.metrics()
+    print(json.dumps(metrics), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,21 +2,36 @@
 
 import pandas as pd
 from trading_assistant.utils import get_logger
-from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest
-from alpaca.trading.enums import OrderSide, TimeInForce
+from trading_assistant.instrumentation import timed
 
 logger = get_logger(__name__)
 
+_trading_clients = {}
+
+# Signal rule defaults; backtests and parameter sweeps override them per call.
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+SENTIMENT_THRESHOLD = 0.1
+
 def initialize_alpaca_api(api_key, api_secret):
     """Initializes the Alpaca API client."""
     try:
+        from alpaca.trading.client import TradingClient
         trading_client = TradingClient(api_key, api_secret, paper=True)
         return trading_client
     except Exception as e:
         logger.error(f"Error initializing Alpaca API: {e}")
         return None
 
+def get_trading_client(api_key, api_secret):
+    """Returns a shared Alpaca client for these credentials, initializing it on first use."""
+    client = _trading_clients.get(api_key)
+    if client is None:
+        client = initialize_alpaca_api(api_key, api_secret)
+        if client is not None:
+            _trading_clients[api_key] = client
+    return client
+
 def check_alpaca_connection(trading_client):
     """Checks the connection to the Alpaca API."""
     try:
@@ -27,9 +42,12 @@ def check_alpaca_connection(trading_client):
         logger.error(f"Error checking Alpaca connection: {e}")
         return False
 
+@timed('order_submit')
 def place_order(trading_client, symbol, qty, side):
     """Places a market order."""
     try:
+        from alpaca.trading.requests import MarketOrderRequest
+        from alpaca.trading.enums import TimeInForce
         market_order_data = MarketOrderRequest(
             symbol=symbol,
             qty=qty,
@@ -43,7 +61,8 @@ def place_order(trading_client, symbol, qty, side):
         logger.error(f"Error placing order for {symbol}: {e}")
         return None
 
-def generate_trading_signal(technical_data: pd.DataFrame, sentiment_scores: dict) -> str:
+def generate_trading_signal(technical_data: pd.DataFrame, sentiment_scores: dict, rsi_oversold=RSI_OVERSOLD,
+                            rsi_overbought=RSI_OVERBOUGHT, sentiment_threshold=SENTIMENT_THRESHOLD) -> str:
     """
     Generates a trading signal (BUY, SELL, HOLD) based on technical indicators
     and sentiment analysis results.
@@ -67,22 +86,22 @@ def generate_trading_signal(technical_data: pd.DataFrame, sentiment_scores: dict
     if technical_data.shape[0] >= 2:
         if technical_data['SMA_20'].iloc[-2] <= technical_data['SMA_50'].iloc[-2] and latest_data['SMA_20'] > latest_data['SMA_50']:
             tech_buy_signal = True
-        if latest_data['RSI_14'] < 30:
+        if latest_data['RSI_14'] < rsi_oversold:
              if technical_data['RSI_14'].iloc[-2] <= latest_data['RSI_14']:
                  tech_buy_signal = True
         if technical_data['MACD_12_26_9'].iloc[-2] <= technical_data['MACDS_12_26_9'].iloc[-2] and latest_data['MACD_12_26_9'] > latest_data['MACDS_12_26_9']:
              tech_buy_signal = True
         if technical_data['SMA_20'].iloc[-2] >= technical_data['SMA_50'].iloc[-2] and latest_data['SMA_20'] < latest_data['SMA_50']:
             tech_sell_signal = True
-        if latest_data['RSI_14'] > 70:
+        if latest_data['RSI_14'] > rsi_overbought:
              if technical_data['RSI_14'].iloc[-2] >= latest_data['RSI_14']:
                  tech_sell_signal = True
         if technical_data['MACD_12_26_9'].iloc[-2] >= technical_data['MACDS_12_26_9'].iloc[-2] and latest_data['MACD_12_26_9'] < latest_data['MACDS_12_26_9']:
              tech_sell_signal = True
 
     sentiment_compound_score = sentiment_scores.get('compound', 0)
-    sentiment_positive = sentiment_compound_score > 0.1
-    sentiment_negative = sentiment_compound_score < -0.1
+    sentiment_positive = sentiment_compound_score > sentiment_threshold
+    sentiment_negative = sentiment_compound_score < -sentiment_threshold
 
     if tech_buy_signal and sentiment_positive:
         return 'BUY'
@@ -95,13 +114,18 @@ def generate_trading_signal(technical_data: pd.DataFrame, sentiment_scores: dict
     else:
         return 'HOLD'
 
-def make_trading_decision(technical_data: pd.DataFrame, sentiment_scores: dict, ml_prediction: str = None) -> str:
+@timed('decision')
+def make_trading_decision(technical_data: pd.DataFrame, sentiment_scores: dict, ml_prediction: str = None,
+                          **signal_params) -> str:
     """
     Combines rule-based trading signals and ML model predictions to make a final trading decision.
+
+    ``signal_params`` (rsi_oversold, rsi_overbought, sentiment_threshold) are passed to
+    generate_trading_signal.
     """
     logger.info("Making trading decision...")
-    rule_based_signal = generate_trading_signal(technical_data, sentiment_scores)
-    logger.info(f"Rule-based signal: {rule_based_signal}")
+    rule_based_signal = generate_trading_signal(technical_data, sentiment_scores, **signal_params)
+    logger.info("Rule-based signal: %s", rule_based_signal)
 
     final_signal = 'UNDETERMINED'
 
@@ -109,7 +133,7 @@ def make_trading_decision(technical_data: pd.DataFrame, sentiment_scores: dict,
         logger.warning("ML prediction not available. Relying solely on rule-based signal.")
         final_signal = rule_based_signal
     else:
-        logger.info(f"ML prediction available: {ml_prediction}")
+        logger.info("ML prediction available: %s", ml_prediction)
         if rule_based_signal == 'BUY' and ml_prediction == 'Up':
             final_signal = 'BUY'
         elif rule_based_signal == 'SELL' and ml_prediction == 'Down':
@@ -126,5 +150,5 @@ def make_trading_decision(technical_data: pd.DataFrame, sentiment_scores: dict,
             final_signal = 'HOLD'
             logger.info("ML prediction contradicts rule-based signal or rules are not met. Defaulting to HOLD.")
 
-    logger.info(f"Final combined trading signal: {final_signal}")
+    logger.info("Final combined trading signal: %s", final_signal, extra={'signal': final_signal})
     return final_signal
@@ -1,22 +1,290 @@
 # trading_assistant/utils.py
 
+import json
 import logging
-import sys
+import logging.handlers
 import os
+import queue
+import sys
+import threading
+import time
+from trading_assistant.config import LOG_DIR, LOG_LEVEL, LOG_LEVELS, LOG_JSON, LOG_STDOUT, LOG_MAX_BYTES, \
+    LOG_BACKUP_COUNT, LOG_RATE_LIMIT, LOG_RATE_BURST, LOG_QUEUE_SIZE, LOG_SUPPRESSED_INTERVAL
+
+LOG_FILE = os.path.join(LOG_DIR, 'trading_assistant.jsonl' if LOG_JSON else 'trading_assistant.log')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Standard LogRecord attributes; anything else on a record was passed with ``extra=``.
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_logging_configured = False
+
+
+def process_log_file(path, pid=None):
+    """The log file a worker process writes: ``trading_assistant.<pid>.jsonl`` next to ``path``."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def _is_worker_process():
+    mp = sys.modules.get('multiprocessing')
+    # A spawned child imports its modules before parent_process() is set, but after it is named.
+    return mp is not None and (mp.parent_process() is not None or mp.current_process().name != 'MainProcess')
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: time, level, logger, message and call site, plus any fields
+    passed with ``extra=`` (e.g. ``logger.info("Fetched %s", ticker, extra={'ticker': ticker})``).
+    """
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site for high-frequency records.
+
+    Each logging call site may emit ``burst`` records at once and ``rate`` per second after
+    that; records beyond it are dropped. The next record let through from that call site
+    carries the number dropped as ``suppressed``; counts still pending when a burst ends are
+    reported by ``pending()``. Records above ``max_level`` (warnings and errors by default)
+    always pass.
+    """
+
+    def __init__(self, rate=LOG_RATE_LIMIT, burst=LOG_RATE_BURST, max_level=logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            # [tokens, last refill time, records dropped since the last report, logger, level]
+            bucket = self._buckets.setdefault(key, [self.burst, record.created, 0, record.name, record.levelno])
+            tokens = min(self.burst, bucket[0] + (record.created - bucket[1]) * self.rate)
+            bucket[1] = record.created
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                bucket[3], bucket[4] = record.name, record.levelno
+                return False
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def pending(self):
+        """
+        One summary record per call site with drops no record has reported yet, carrying the
+        count as ``suppressed``. Resets the counts.
+        """
+        with self._lock:
+            dropped = [(key, bucket[2], bucket[3], bucket[4]) for key, bucket in self._buckets.items() if bucket[2]]
+            for key, *_ in dropped:
+                self._buckets[key][2] = 0
+        records = []
+        for (pathname, lineno), count, name, levelno in dropped:
+            record = logging.LogRecord(name, levelno, pathname, lineno, "Rate limit suppressed %d records",
+                                       (count,), None)
+            record.suppressed = count
+            records.append(record)
+        return records
+
+    def reset(self):
+        """Forgets every call site, e.g. in a forked child that must not report its parent's drops."""
+        with self._lock:
+            self._buckets.clear()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def __init__(self, queue, handlers, pending=None, interval=LOG_SUPPRESSED_INTERVAL):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        # Called every ``interval`` seconds and on stop for summary records to write.
+        self.pending = pending
+        self.interval = interval
+        self._next_flush = time.monotonic() + interval
+
+    def dequeue(self, block):
+        if self.pending is None or self.interval <= 0:
+            return self.queue.get(block)
+        while True:
+            timeout = self._next_flush - time.monotonic()
+            if timeout <= 0:
+                self.flush_pending()
+                self._next_flush = time.monotonic() + self.interval
+                continue
+            try:
+                return self.queue.get(block, timeout=timeout)
+            except queue.Empty:
+                continue
+
+    def flush_pending(self):
+        if self.pending is not None:
+            for record in self.pending():
+                self.handle(record)
+
+    def enqueue_sentinel(self):
+        # Blocks rather than failing when the queue is full; the writer thread is draining it.
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+            # Drops at the end of a burst have no later record to report them.
+            self.flush_pending()
+
+
+class _RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self.configured_filename = self.baseFilename
+
+    def _open(self):
+        # The log directory is created by the writer thread on the first record, not on import.
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+    def use_process_file(self, pid=None):
+        """
+        Writes to this process's own file from the next record on. Two processes rotating one
+        file rename it under each other and overwrite each other's backups.
+        """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.baseFilename = process_log_file(self.configured_filename, pid)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a writer thread that formats them and writes them to ``handlers``.
+
+    Records are queued with their message template and arguments, so the message string is
+    only built by the writer thread. Callers never block on I/O: when the bounded queue is
+    full, records are dropped, and the next queued record carries the count as ``dropped``.
+    A forked child starts its own writer thread on its first record and writes its own file
+    (see process_log_file).
+    """
+
+    def __init__(self, handlers, maxsize=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = list(handlers)
+        self.dropped = 0
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self.listener = _Listener(self.queue, self.handlers, pending=self._pending)
+        self.listener.start()
+        # Pool workers leave through os._exit, which skips logging.shutdown but runs these.
+        util = sys.modules.get('multiprocessing.util')
+        if util is not None:
+            util.Finalize(None, self.listener.stop, exitpriority=0)
+
+    def _pending(self):
+        return [record for f in self.filters if isinstance(f, RateLimitFilter) for record in f.pending()]
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            for handler in self.handlers:
+                if isinstance(handler, _RotatingFileHandler):
+                    handler.use_process_file()
+            for f in self.filters:
+                if isinstance(f, RateLimitFilter):
+                    f.reset()
+            self.queue = queue.Queue(self.queue.maxsize)
+            self._start()
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1 + getattr(record, 'dropped', 0)
+
+    def close(self):
+        """Writes out every queued record and stops the writer thread."""
+        if self._pid == os.getpid():
+            self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+def set_log_levels(levels):
+    """
+    Sets per-logger levels from a dict or a ``name=LEVEL`` list separated by commas, e.g.
+    ``"trading_assistant.analysis=WARNING,trading_assistant.bar_cache=DEBUG"``.
+    """
+    if isinstance(levels, str):
+        levels = dict(item.split('=', 1) for item in levels.replace(';', ',').split(',') if '=' in item)
+    for name, level in levels.items():
+        logging.getLogger(name.strip()).setLevel(level.strip().upper() if isinstance(level, str) else level)
+
+
+def configure_logging(level=None, levels=None):
+    """
+    Configures the root logger once per process: one non-blocking handler feeding a writer
+    thread, which writes JSONL (or text, with LOG_JSON=0) to a size-bounded rotating file
+    and text to stdout. INFO and DEBUG records are rate limited per call site. Worker processes
+    write their own file (see process_log_file).
+
+    Like logging.basicConfig, it adds no handlers when the root logger already has some.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    set_log_levels(LOG_LEVELS if levels is None else levels)
+    if root.handlers:
+        return
+
+    file_handler = _RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True)
+    if _is_worker_process():
+        file_handler.use_process_file()
+    file_handler.setFormatter(JsonFormatter() if LOG_JSON else logging.Formatter(TEXT_FORMAT))
+    handlers = [file_handler]
+    if LOG_STDOUT:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream_handler)
+    handler = BackgroundHandler(handlers)
+    if LOG_RATE_LIMIT > 0:
+        handler.addFilter(RateLimitFilter())
+    root.addHandler(handler)
+
 
 def get_logger(name):
     """
     Configures and returns a logger.
     """
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("logs/trading_assistant.log"),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    configure_logging()
     return logging.getLogger(name)
@@ -0,0 +1,243 @@
+# trading_assistant/walk_forward.py
+
+import copy
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from trading_assistant.ml_model import FEATURES, N_ESTIMATORS, prepare_data_for_ml
+from trading_assistant.model_registry import get_model_registry
+from trading_assistant.feature_store import get_feature_store
+from trading_assistant.utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_N_SPLITS = 5
+DEFAULT_N_ESTIMATORS = N_ESTIMATORS
+# Warm starts stop growing the forest past this many trees; update_model refits from scratch instead.
+MAX_ESTIMATORS = 3 * N_ESTIMATORS
+
+
+def walk_forward_splits(dates, n_splits=DEFAULT_N_SPLITS, min_train_dates=None, purge=1, embargo=0):
+    """
+    Expanding-window walk-forward splits over a (possibly repeated) date index.
+
+    Every row sharing a date lands on the same side of a split, so pooled multi-ticker data
+    never trains on a day it tests on. The last ``purge`` dates before each test block are
+    dropped from training because their labels look into the test period, and ``embargo``
+    dates are skipped at the start of each test block. Yields (train_rows, test_rows) arrays.
+    """
+    dates = pd.DatetimeIndex(dates)
+    unique_dates = dates.unique().sort_values()
+    n_dates = len(unique_dates)
+    min_train_dates = min_train_dates or n_dates // (n_splits + 1)
+    test_size = (n_dates - min_train_dates) // n_splits
+    if test_size <= purge + embargo:
+        raise ValueError(f"Not enough dates ({n_dates}) for {n_splits} walk-forward splits")
+
+    date_pos = unique_dates.get_indexer(dates)
+    for k in range(n_splits):
+        test_start = min_train_dates + k * test_size
+        test_end = n_dates if k == n_splits - 1 else test_start + test_size
+        train_rows = np.flatnonzero(date_pos < test_start - purge)
+        test_rows = np.flatnonzero((date_pos >= test_start + embargo) & (date_pos < test_end))
+        yield train_rows, test_rows
+
+
+def _labelled(df_with_indicators, features):
+    """Adds the Target column and drops rows whose features or label are unknown."""
+    df = prepare_data_for_ml(df_with_indicators)
+    # The final bar has no next close, so its label would silently default to 0.
+    df = df.iloc[:-1]
+    return df.dropna(subset=features + ['Target'])
+
+
+def pool_training_data(histories, features=FEATURES):
+    """
+    Builds one labelled frame from a DataFrame or a dict of ticker to indicator frames,
+    sorted by date with a ``Ticker`` column.
+    """
+    if isinstance(histories, pd.DataFrame):
+        histories = {None: histories}
+    frames = []
+    for ticker, df in histories.items():
+        if df is None or df.empty:
+            continue
+        labelled = _labelled(df, list(features))
+        labelled['Ticker'] = ticker
+        frames.append(labelled)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames).sort_index(kind='stable')
+
+
+def training_arrays(histories, features=FEATURES, store=None):
+    """
+    Labelled training rows ``(X, y, dates, tickers)`` as NumPy arrays sorted by date.
+
+    A list of tickers is read straight from the feature store. A dict of ticker to daily bars
+    is appended to the store first, computing features only for bars it has not seen, and the
+    stored rows within each ticker's date range are read back, so training uses the rows
+    inference reads. A bare frame names no ticker and is labelled in memory.
+    """
+    features = list(features)
+    store = store or get_feature_store()
+    if isinstance(histories, pd.DataFrame) or not set(features) <= set(store.features):
+        data = pool_training_data(histories, features)
+        if data.empty:
+            return (np.empty((0, len(features))), np.empty(0, dtype=np.int64),
+                    np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=object))
+        return (data[features].to_numpy(dtype=np.float64), data['Target'].to_numpy(),
+                data.index.to_numpy(dtype='datetime64[ns]'), data['Ticker'].to_numpy(dtype=object))
+    if not isinstance(histories, dict):
+        return store.training_matrix(list(histories), features)
+    parts = []
+    for ticker, df in histories.items():
+        if df is None or df.empty:
+            continue
+        store.update(ticker, df)
+        # The store may hold more history than was passed in; train on the requested range only.
+        index = pd.DatetimeIndex(df.index)
+        parts.append(store.training_matrix([ticker], features, start=index[0], end=index[-1] + pd.Timedelta(1, 'ns')))
+    if not parts:
+        return store.training_matrix([], features)
+    X, y, dates, names = (np.concatenate(arrays) for arrays in zip(*parts))
+    order = np.argsort(dates, kind='stable')
+    return X[order], y[order], dates[order], names[order]
+
+
+def _fit_fold(fold, X, y, train_rows, test_rows, n_estimators, max_depth, random_state):
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=random_state,
+                                   n_jobs=1)
+    model.fit(X[train_rows], y[train_rows])
+    y_pred = model.predict(X[test_rows])
+    y_test = y[test_rows]
+    return {
+        'fold': fold,
+        'n_train': int(len(train_rows)),
+        'n_test': int(len(test_rows)),
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_test, y_pred, zero_division=0)),
+        'f1': float(f1_score(y_test, y_pred, zero_division=0)),
+    }
+
+
+def train_walk_forward(histories, features=FEATURES, n_splits=DEFAULT_N_SPLITS, n_estimators=DEFAULT_N_ESTIMATORS,
+                       purge=1, embargo=0, n_jobs=-1, random_state=42, register=True, max_depth=None):
+    """
+    Evaluates the RandomForest with purged walk-forward CV, fitting folds in parallel, then
+    fits the final model on all data and registers it.
+
+    ``histories`` is a frame with indicator columns, a dict of ticker to daily bars or a list
+    of tickers already in the feature store (pooled training; see training_arrays).
+    Returns ``(model, features, fold_metrics)`` or ``(None, None, None)``.
+    """
+    features = list(features)
+    X, y, dates, names = training_arrays(histories, features)
+    if len(y) == 0:
+        logger.error("No labelled rows available. Cannot train ML model.")
+        return None, None, None
+
+    dates = pd.DatetimeIndex(dates)
+    try:
+        splits = list(walk_forward_splits(dates, n_splits, purge=purge, embargo=embargo))
+    except ValueError as e:
+        logger.error(f"Cannot run walk-forward CV: {e}")
+        return None, None, None
+
+    logger.info(f"Fitting {len(splits)} walk-forward folds on {len(y)} rows")
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(k, X, y, train_rows, test_rows, n_estimators, max_depth, random_state)
+        for k, (train_rows, test_rows) in enumerate(splits)
+    )
+    for result, (train_rows, test_rows) in zip(fold_results, splits):
+        result['train_end'] = str(dates[train_rows[-1]].date())
+        result['test_start'] = str(dates[test_rows[0]].date())
+        result['test_end'] = str(dates[test_rows[-1]].date())
+    fold_metrics = pd.DataFrame(fold_results)
+    for result in fold_results:
+        logger.info(f"Fold {result['fold']}: accuracy {result['accuracy']:.3f}, f1 {result['f1']:.3f} "
+                    f"({result['test_start']} to {result['test_end']})")
+
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=random_state,
+                                   n_jobs=n_jobs)
+    model.fit(X, y)
+
+    if register:
+        tickers = sorted({t for t in names if t is not None})
+        get_model_registry().register(model, features, {
+            'tickers': tickers,
+            'training_start': str(dates[0]),
+            'training_end': str(dates[-1]),
+            'n_samples': int(len(y)),
+            'training_method': 'walk_forward',
+            'metrics': {
+                'cv_accuracy_mean': float(fold_metrics['accuracy'].mean()),
+                'cv_f1_mean': float(fold_metrics['f1'].mean()),
+                'folds': fold_results,
+            },
+        })
+    return model, features, fold_metrics
+
+
+def extend_model(model, histories, since, features=FEATURES, n_new_estimators=20, lookback=250,
+                 parent_version=None, register=True):
+    """
+    Grows an existing forest with ``n_new_estimators`` trees fitted on bars after ``since``
+    (plus ``lookback`` earlier rows for context) instead of retraining from scratch.
+
+    Returns the extended model, or the original model when no new labelled bars exist.
+    """
+    features = list(features)
+    X, y, dates, names = training_arrays(histories, features)
+    dates = pd.DatetimeIndex(dates)
+    since = pd.Timestamp(since)
+    new_rows = np.flatnonzero(dates > since)
+    if new_rows.size == 0:
+        logger.info(f"No new bars since {since.date()}; keeping the current model.")
+        return model
+
+    start = max(0, new_rows[0] - lookback)
+    extended = copy.deepcopy(model)
+    extended.set_params(warm_start=True, n_estimators=extended.n_estimators + n_new_estimators)
+    extended.fit(X[start:], y[start:])
+    logger.info(f"Extended model with {n_new_estimators} trees on {len(y) - start} rows ({new_rows.size} new)")
+
+    if register:
+        get_model_registry().register(extended, features, {
+            'tickers': sorted({t for t in names if t is not None}),
+            'training_start': str(dates[0]),
+            'training_end': str(dates[-1]),
+            'n_samples': int(len(y) - start),
+            'training_method': 'warm_start',
+            'parent_version': parent_version,
+        })
+    return extended
+
+
+def update_model(histories, features=FEATURES, n_new_estimators=20, max_estimators=MAX_ESTIMATORS, **kwargs):
+    """
+    Retrains incrementally when possible: warm-starts the latest registered model with the
+    bars that arrived since its training end. Runs full walk-forward training instead when
+    no compatible model exists (same features, trained on every ticker in ``histories``), or
+    when another warm start would grow the forest past ``max_estimators`` trees.
+
+    ``histories`` must be a dict of ticker to frame or a list of stored tickers for a warm
+    start, since a bare frame does not say which tickers it holds. Returns ``(model, features, fold_metrics or None)``.
+    """
+    registry = get_model_registry()
+    model, metadata = registry.load()
+    tickers = set(histories) if isinstance(histories, (dict, list, tuple)) else set()
+    compatible = model is not None and metadata and metadata.get('features') == list(features) \
+        and metadata.get('training_end') and hasattr(model, 'estimators_') \
+        and tickers and tickers <= set(metadata.get('tickers') or [])
+    if compatible and model.n_estimators + n_new_estimators > max_estimators:
+        logger.info(f"Model {metadata.get('version')} has {model.n_estimators} trees; refitting from scratch "
+                    f"instead of growing past {max_estimators}")
+    elif compatible:
+        extended = extend_model(model, histories, metadata['training_end'], features, n_new_estimators,
+                                parent_version=metadata.get('version'))
+        return extended, list(features), None
+    return train_walk_forward(histories, features, **kwargs)